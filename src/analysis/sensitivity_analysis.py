@@ -7,19 +7,16 @@ Generate heatmaps showing how CAGR varies with:
 - Trim size (10%, 15%, 20%, 25%, 30%)
 """
 
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import sys
+import itertools
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("="*80)
-print("SENSITIVITY ANALYSIS: TRIM THRESHOLD vs TRIM SIZE")
-print("="*80)
+from backtest.engine import as_price_matrix, run_threshold_batch
+from backtest.price_store import open_price_store
 
 # Configuration
 START_DATE = '2015-01-01'
@@ -44,166 +41,138 @@ PORTFOLIO_CONFIG = {
 TICKERS = list(PORTFOLIO_CONFIG.keys())
 DATA_DIR = 'data'
 
-print(f"\n📊 Testing parameter grid:")
-print(f"  Trim thresholds: {[f'{t*100:.0f}%' for t in TRIM_THRESHOLDS]}")
-print(f"  Trim sizes: {[f'{s*100:.0f}%' for s in TRIM_SIZES]}")
-print(f"  Reinvestment modes: {REINVEST_MODES}")
-print(f"  Total combinations: {len(TRIM_THRESHOLDS)} × {len(TRIM_SIZES)} × {len(REINVEST_MODES)} = {len(TRIM_THRESHOLDS) * len(TRIM_SIZES) * len(REINVEST_MODES)}")
-
-# Load data
-print(f"\n📂 Loading data from {DATA_DIR}/...")
-all_data = {}
-for ticker in TICKERS:
-    csv_file = f"{DATA_DIR}/{ticker}.csv"
-    try:
-        df = pd.read_csv(csv_file)
-        df['Date'] = pd.to_datetime(df['Date'], utc=True).dt.tz_localize(None)
-        df.set_index('Date', inplace=True)
-        start_dt = pd.to_datetime(START_DATE)
-        end_dt = pd.to_datetime(END_DATE)
-        ticker_data = df['Close'][(df.index >= start_dt) & (df.index <= end_dt)]
-        all_data[ticker] = ticker_data
-        print(f"  ✓ {ticker}: {len(ticker_data)} days")
-    except Exception as e:
-        print(f"  ✗ {ticker}: {str(e)[:50]}")
-
-price_df = pd.DataFrame(all_data).ffill().dropna()
-dates = price_df.index
-valid_tickers = list(price_df.columns)
-
-print(f"\n✓ Loaded {len(valid_tickers)} tickers, {len(dates)} trading days")
-
-# Calculate initial positions
-initial_shares = {}
-for ticker in valid_tickers:
-    allocation = INITIAL_CASH * PORTFOLIO_CONFIG.get(ticker, 1.0/len(valid_tickers))
-    initial_shares[ticker] = allocation / price_df[ticker].iloc[0]
-
-# Helper function
-def run_threshold_strategy(threshold, trim_size, reinvest_mode):
-    """Run a single threshold-based strategy"""
-    holdings = {ticker: initial_shares[ticker] for ticker in valid_tickers}
-    cost_basis = {ticker: price_df[ticker].iloc[0] for ticker in valid_tickers}
-    cash = 0.0
-    num_trims = 0
-
-    for i, date in enumerate(dates):
-        # Trim logic
-        for ticker in valid_tickers:
-            if holdings[ticker] <= 0:
-                continue
-
-            current_price = price_df[ticker].iloc[i]
-            gain = (current_price - cost_basis[ticker]) / cost_basis[ticker]
-
-            if gain >= threshold:
-                shares_to_sell = holdings[ticker] * trim_size
-                proceeds = shares_to_sell * current_price
-                holdings[ticker] -= shares_to_sell
-                num_trims += 1
-
-                # Reinvest
-                if reinvest_mode == 'cash':
-                    cash += proceeds
-                elif reinvest_mode == 'spy' and 'SPY' in valid_tickers:
-                    holdings['SPY'] += proceeds / price_df['SPY'].iloc[i]
-                elif reinvest_mode == 'pro_rata':
-                    total_value = sum(holdings[t] * price_df[t].iloc[i] for t in valid_tickers)
-                    for t in valid_tickers:
-                        weight = (holdings[t] * price_df[t].iloc[i]) / total_value if total_value > 0 else 1.0/len(valid_tickers)
-                        holdings[t] += (proceeds * weight) / price_df[t].iloc[i]
-
-                cost_basis[ticker] = current_price * 1.05
-
-    # Calculate final value
-    final_value = sum(holdings[t] * price_df[t].iloc[-1] for t in valid_tickers) + cash
+
+def plot_heatmaps(results):
+    """Save one CAGR heatmap (trim size x threshold) per reinvestment mode"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    os.makedirs('visualizations', exist_ok=True)
+
+    # Set style
+    sns.set_style('whitegrid')
+    sns.set_palette('RdYlGn')
+    plt.rcParams['figure.dpi'] = 300
+    plt.rcParams['savefig.dpi'] = 300
+
+    for mode, data in results.items():
+        fig, ax = plt.subplots(figsize=(12, 8))
+
+        # Create heatmap
+        sns.heatmap(
+            data * 100,  # Convert to percentage
+            xticklabels=[f'{t*100:.0f}%' for t in TRIM_THRESHOLDS],
+            yticklabels=[f'{s*100:.0f}%' for s in TRIM_SIZES],
+            annot=True,
+            fmt='.1f',
+            cmap='RdYlGn',
+            center=21.69,  # Center on buy-and-hold CAGR
+            cbar_kws={'label': 'CAGR (%)'},
+            ax=ax
+        )
+
+        ax.set_title(f'Sensitivity Analysis: Trim Threshold vs Trim Size\nReinvestment: {mode.upper()}',
+                     fontsize=14, fontweight='bold', pad=20)
+        ax.set_xlabel('Trim Threshold (Gain %)', fontsize=12, fontweight='bold')
+        ax.set_ylabel('Trim Size (% of Position)', fontsize=12, fontweight='bold')
+
+        # Add reference line for buy-and-hold CAGR
+        ax.text(0.5, -0.15, 'Buy-and-Hold CAGR: 21.69%',
+                transform=ax.transAxes, ha='center', fontsize=10, style='italic')
+
+        plt.tight_layout()
+        filename = f'visualizations/sensitivity_heatmap_{mode}.png'
+        plt.savefig(filename, bbox_inches='tight')
+        print(f"  ✓ Saved: {filename}")
+        plt.close()
+
+
+def main():
+    print("="*80)
+    print("SENSITIVITY ANALYSIS: TRIM THRESHOLD vs TRIM SIZE")
+    print("="*80)
+
+    print(f"\n📊 Testing parameter grid:")
+    print(f"  Trim thresholds: {[f'{t*100:.0f}%' for t in TRIM_THRESHOLDS]}")
+    print(f"  Trim sizes: {[f'{s*100:.0f}%' for s in TRIM_SIZES]}")
+    print(f"  Reinvestment modes: {REINVEST_MODES}")
+    print(f"  Total combinations: {len(TRIM_THRESHOLDS)} × {len(TRIM_SIZES)} × {len(REINVEST_MODES)} = {len(TRIM_THRESHOLDS) * len(TRIM_SIZES) * len(REINVEST_MODES)}")
+
+    # Load data
+    print(f"\n📂 Loading data from {DATA_DIR}/...")
+    store = open_price_store(DATA_DIR)
+    price_df = store.load(TICKERS, START_DATE, END_DATE)
+    for ticker in TICKERS:
+        if ticker in price_df.columns:
+            print(f"  ✓ {ticker}")
+        else:
+            print(f"  ✗ {ticker}: not in {DATA_DIR}/")
+
+    dates = price_df.index
+    valid_tickers = list(price_df.columns)
+
+    print(f"\n✓ Loaded {len(valid_tickers)} tickers, {len(dates)} trading days")
+
+    # Calculate initial positions
+    initial_shares = {}
+    for ticker in valid_tickers:
+        allocation = INITIAL_CASH * PORTFOLIO_CONFIG.get(ticker, 1.0/len(valid_tickers))
+        initial_shares[ticker] = allocation / price_df[ticker].iloc[0]
+
+    # Run sensitivity analysis
+    print("\n🔄 Running sensitivity analysis...")
+
+    # One batched pass: every (mode, trim size, threshold) combination is a row of
+    # the engine's state arrays, so the price matrix is walked once
+    grid = list(itertools.product(REINVEST_MODES, TRIM_SIZES, TRIM_THRESHOLDS))
+    batch = run_threshold_batch(
+        prices=as_price_matrix(price_df),
+        tickers=valid_tickers,
+        initial_shares=initial_shares,
+        thresholds=[threshold for _, _, threshold in grid],
+        trim_sizes=[trim_size for _, trim_size, _ in grid],
+        reinvest_modes=[mode for mode, _, _ in grid]
+    )
 
     # Calculate CAGR
     years = len(dates) / 252
-    cagr = (final_value / INITIAL_CASH) ** (1 / years) - 1
-
-    return {'final_value': final_value, 'cagr': cagr, 'num_trims': num_trims}
-
-# Run sensitivity analysis
-print("\n🔄 Running sensitivity analysis...")
-results = {}
+    cagrs = np.array([(final_value / INITIAL_CASH) ** (1 / years) - 1
+                      for final_value in batch['final_value'].tolist()])
 
-total_runs = len(TRIM_THRESHOLDS) * len(TRIM_SIZES) * len(REINVEST_MODES)
-run_count = 0
+    print(f"  ✓ {len(grid)} combinations in one pass")
 
-for mode in REINVEST_MODES:
-    mode_results = np.zeros((len(TRIM_SIZES), len(TRIM_THRESHOLDS)))
+    results = {}
+    cagr_grid = cagrs.reshape(len(REINVEST_MODES), len(TRIM_SIZES), len(TRIM_THRESHOLDS))
+    for m, mode in enumerate(REINVEST_MODES):
+        results[mode] = cagr_grid[m]
 
-    for i, trim_size in enumerate(TRIM_SIZES):
-        for j, threshold in enumerate(TRIM_THRESHOLDS):
-            run_count += 1
-            metrics = run_threshold_strategy(threshold, trim_size, mode)
-            mode_results[i, j] = metrics['cagr']
+    print("\n✓ Sensitivity analysis complete!")
 
-            if run_count % 6 == 0 or run_count == total_runs:
-                print(f"  Progress: {run_count}/{total_runs} ({run_count/total_runs*100:.0f}%)")
+    # Generate heatmaps
+    print("\n📊 Generating heatmaps...")
 
-    results[mode] = mode_results
+    plot_heatmaps(results)
 
-print("\n✓ Sensitivity analysis complete!")
+    # Find optimal parameters
+    print("\n🏆 Optimal Parameter Combinations:\n")
+    for mode, data in results.items():
+        max_idx = np.unravel_index(np.argmax(data), data.shape)
+        optimal_size = TRIM_SIZES[max_idx[0]]
+        optimal_threshold = TRIM_THRESHOLDS[max_idx[1]]
+        optimal_cagr = data[max_idx]
 
-# Generate heatmaps
-print("\n📊 Generating heatmaps...")
+        print(f"{mode.upper()}:")
+        print(f"  Optimal threshold: {optimal_threshold*100:.0f}%")
+        print(f"  Optimal trim size: {optimal_size*100:.0f}%")
+        print(f"  CAGR: {optimal_cagr*100:.2f}%")
+        print(f"  vs Buy-and-Hold: {(optimal_cagr - 0.2169)*100:+.2f}%")
+        print()
 
-os.makedirs('visualizations', exist_ok=True)
+    print("="*80)
+    print("✅ SENSITIVITY ANALYSIS COMPLETE")
+    print("="*80)
+    return 0
 
-# Set style
-sns.set_style('whitegrid')
-sns.set_palette('RdYlGn')
-plt.rcParams['figure.dpi'] = 300
-plt.rcParams['savefig.dpi'] = 300
-
-for mode, data in results.items():
-    fig, ax = plt.subplots(figsize=(12, 8))
-
-    # Create heatmap
-    sns.heatmap(
-        data * 100,  # Convert to percentage
-        xticklabels=[f'{t*100:.0f}%' for t in TRIM_THRESHOLDS],
-        yticklabels=[f'{s*100:.0f}%' for s in TRIM_SIZES],
-        annot=True,
-        fmt='.1f',
-        cmap='RdYlGn',
-        center=21.69,  # Center on buy-and-hold CAGR
-        cbar_kws={'label': 'CAGR (%)'},
-        ax=ax
-    )
 
-    ax.set_title(f'Sensitivity Analysis: Trim Threshold vs Trim Size\nReinvestment: {mode.upper()}',
-                 fontsize=14, fontweight='bold', pad=20)
-    ax.set_xlabel('Trim Threshold (Gain %)', fontsize=12, fontweight='bold')
-    ax.set_ylabel('Trim Size (% of Position)', fontsize=12, fontweight='bold')
-
-    # Add reference line for buy-and-hold CAGR
-    ax.text(0.5, -0.15, 'Buy-and-Hold CAGR: 21.69%',
-            transform=ax.transAxes, ha='center', fontsize=10, style='italic')
-
-    plt.tight_layout()
-    filename = f'visualizations/sensitivity_heatmap_{mode}.png'
-    plt.savefig(filename, bbox_inches='tight')
-    print(f"  ✓ Saved: {filename}")
-    plt.close()
-
-# Find optimal parameters
-print("\n🏆 Optimal Parameter Combinations:\n")
-for mode, data in results.items():
-    max_idx = np.unravel_index(np.argmax(data), data.shape)
-    optimal_size = TRIM_SIZES[max_idx[0]]
-    optimal_threshold = TRIM_THRESHOLDS[max_idx[1]]
-    optimal_cagr = data[max_idx]
-
-    print(f"{mode.upper()}:")
-    print(f"  Optimal threshold: {optimal_threshold*100:.0f}%")
-    print(f"  Optimal trim size: {optimal_size*100:.0f}%")
-    print(f"  CAGR: {optimal_cagr*100:.2f}%")
-    print(f"  vs Buy-and-Hold: {(optimal_cagr - 0.2169)*100:+.2f}%")
-    print()
-
-print("="*80)
-print("✅ SENSITIVITY ANALYSIS COMPLETE")
-print("="*80)
+if __name__ == "__main__":
+    exit(main())
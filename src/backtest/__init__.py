@@ -0,0 +1,60 @@
+"""
+Portfolio trimming backtest package
+
+    engine       NumPy simulation kernels (run_strategy_kernel, run_threshold_batch)
+    data         price loading, initial allocation, synthetic price paths
+    metrics      performance metrics (CAGR, Sharpe, drawdowns, rolling, bootstrap CIs)
+    io           per-strategy result files and comparison tables
+    results_store  columnar store of a run's per-strategy results
+    trade_log    structured-array trade log
+    incremental  checkpointed daily updates of the index-focus strategies
+    price_store  memory-mapped columnar price store
+    fetch        cached, rate-limited concurrent downloads into a price store
+    indicators   shared indicator cache
+    parallel     process-pool runner
+    profiling    opt-in stage timers, counters and per-strategy cProfile
+    cli          `python src/backtest/cli.py <command>` entry point
+
+Importing the package (or backtest.engine) does not import pandas or any of
+the optional plotting/download libraries; names below are resolved from their
+submodules on first access.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'run_strategy_kernel': 'engine',
+    'run_threshold_batch': 'engine',
+    'KernelState': 'engine',
+    'as_price_matrix': 'engine',
+    'execute_trims': 'engine',
+    'load_price_data': 'data',
+    'allocate_initial_shares': 'data',
+    'generate_price_paths': 'data',
+    'generate_price_panel': 'data',
+    'calculate_metrics': 'metrics',
+    'calculate_batch_metrics': 'metrics',
+    'metrics_table': 'metrics',
+    'MetricsAccumulator': 'metrics',
+    'save_strategy_files': 'io',
+    'save_comparison': 'io',
+    'ResultsStore': 'results_store',
+    'ResultsWriter': 'results_store',
+    'load_strategy': 'results_store',
+    'TradeLog': 'trade_log',
+    'PriceStore': 'price_store',
+    'open_price_store': 'price_store',
+    'fetch_prices': 'fetch',
+    'IndicatorCache': 'indicators',
+    'run_parallel': 'parallel',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'{__name__}.{_EXPORTS[name]}'), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Command-line entry point for the backtest scripts
+
+Each command imports one script module and calls its main(), so running
+
+    python src/backtest/cli.py index-focus
+
+does exactly what `python src/backtest/run_backtest_index_focus.py` does.
+Scripts are only imported when their command is chosen, so heavy optional
+dependencies (vectorbt, yfinance, matplotlib, seaborn) are never loaded for
+commands that do not use them. Arguments after the command are passed
+through as the script's sys.argv.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Command -> (module with a main() function, description)
+COMMANDS = {
+    'index-focus': ('backtest.run_backtest_index_focus', 'Realistic index-focused portfolio from data/*.csv'),
+    'update': ('backtest.incremental', 'Advance the index-focus strategies from their checkpoint'),
+    'manual-data': ('backtest.run_backtest_manual_data', 'Equal-weight portfolio from manual_data/*.csv'),
+    'with-dip': ('backtest.run_backtest_with_dip', 'Synthetic prices, including the 5% dip-buy mode'),
+    'yfinance': ('backtest.run_backtest', 'Yahoo Finance download with validator exports'),
+    'sensitivity': ('analysis.sensitivity_analysis', 'Trim threshold vs trim size heatmaps'),
+    'fetch': ('backtest.fetch', 'Download missing days into a price store (cached, rate-limited)'),
+    'build-store': ('backtest.price_store', 'Ingest a CSV directory into the price store'),
+    'bench': ('benchmarks.suite', 'Time each hot path and compare to the stored baseline'),
+    'bench-scaling': ('benchmarks.scaling', 'Engine scaling on synthetic universes (up to 5,000 tickers)'),
+    'validate': ('validation.validate_backtest', 'Validate the trim_50pct_spy export'),
+    'validate-dip': ('validation.validate_dip_buy_strategy', 'Validate the trim_50pct_dip_buy_5pct export'),
+    'validate-all': ('validation.validate_all', 'Validate every strategy of one or more runs in parallel'),
+    'check-metrics': ('validation.comprehensive_validation', 'Sanity-check index-focus metrics'),
+    'validation-report': ('validation.final_validation_report', 'Summarize validation across strategies'),
+}
+
+
+def main(argv=None):
+    """Run one command; returns its exit code"""
+    parser = argparse.ArgumentParser(
+        prog='backtest',
+        description='Portfolio trimming backtests',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f"  {name:<18} {description}"
+                                         for name, (_, description) in COMMANDS.items())
+    )
+    parser.add_argument('command', choices=COMMANDS, metavar='command', help='see below')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='arguments for the command')
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    sys.argv = [module.__file__] + args.args
+    return module.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""
+Price data loading and portfolio setup shared by the backtest scripts
+
+- load_price_data: aligned close prices from Yahoo CSVs (via the price store)
+- allocate_initial_shares: shares bought on day one for a target allocation
+- generate_price_paths: seeded synthetic prices for offline runs
+- generate_price_panel: the same price model for thousands of tickers at once
+"""
+
+import os
+
+import numpy as np
+
+from backtest.price_store import open_price_store
+
+
+def load_price_data(data_dir, tickers, start_date, end_date):
+    """
+    Load historical price data from manually downloaded Yahoo Finance CSVs
+
+    Args:
+        data_dir: directory with one <TICKER>.csv per ticker
+        tickers: tickers to load (missing ones are reported and skipped)
+        start_date, end_date: inclusive date range
+
+    Returns:
+        (price_df, valid_tickers), or (None, []) if nothing could be loaded
+    """
+    print(f"\n📂 Loading CSV files from: {data_dir}/")
+
+    if not os.path.exists(data_dir):
+        print(f"\n❌ ERROR: Directory '{data_dir}/' not found!")
+        return None, []
+
+    # Parsed once into <data_dir>/price_store/ (rebuilt automatically when a CSV changes)
+    store = open_price_store(data_dir)
+    price_df = store.load(tickers, start_date, end_date)
+
+    failed_tickers = []
+    for ticker in tickers:
+        print(f"  Loading {ticker}...", end='')
+        if ticker not in store.ticker_index:
+            print(f" ✗ (file not found: {data_dir}/{ticker}.csv)")
+            failed_tickers.append(ticker)
+        elif ticker not in price_df.columns:
+            print(f" ✗ (no data in date range)")
+            failed_tickers.append(ticker)
+        else:
+            print(f" ✓")
+
+    if price_df.empty:
+        print(f"\n❌ No data loaded! Check that CSV files exist in {data_dir}/")
+        return None, []
+
+    valid_tickers = list(price_df.columns)
+
+    print(f"\n✓ Data Loading Complete")
+    print(f"  Valid tickers: {len(valid_tickers)}")
+    print(f"  Failed tickers: {len(failed_tickers)}")
+    print(f"  Trading days: {len(price_df):,}")
+    print(f"  Date range: {price_df.index[0].date()} to {price_df.index[-1].date()}")
+
+    if failed_tickers:
+        print(f"\n⚠️  Failed to load: {', '.join(failed_tickers)}")
+
+    # Show price ranges
+    print(f"\n📈 Price Ranges:")
+    for ticker in valid_tickers:
+        start_price = price_df[ticker].iloc[0]
+        end_price = price_df[ticker].iloc[-1]
+        total_return = (end_price / start_price - 1) * 100
+        print(f"  {ticker}: ${start_price:.2f} → ${end_price:.2f} ({total_return:+.1f}%)")
+
+    return price_df, valid_tickers
+
+
+def allocate_initial_shares(price_df, tickers, initial_cash, weights=None):
+    """
+    Shares bought at the first day's close for a target allocation
+
+    Args:
+        price_df: aligned close prices
+        tickers: tickers to buy
+        initial_cash: capital to allocate
+        weights: dict of ticker -> portfolio weight; tickers without a weight
+                 (or all of them, if None) get an equal share
+
+    Returns:
+        dict of ticker -> shares
+    """
+    initial_shares = {}
+    for ticker in tickers:
+        if weights is not None and ticker in weights:
+            allocation = initial_cash * weights[ticker]
+        else:
+            allocation = initial_cash / len(tickers)
+        initial_shares[ticker] = allocation / price_df[ticker].iloc[0]
+    return initial_shares
+
+
+def generate_price_paths(tickers, dates, base_prices, drift, volatility, seed=42, max_daily_drop=0.05):
+    """
+    Generate seeded synthetic daily prices (random walk with drift)
+
+    Each day's price is prev * (1 + drift + N(0, volatility)), floored at a
+    max_daily_drop fall. Draws come from the legacy global NumPy RNG seeded
+    once, ticker by ticker, so a seed always reproduces the same paths.
+
+    Args:
+        tickers: tickers to generate
+        dates: DatetimeIndex of trading days
+        base_prices, drift, volatility: dicts of ticker -> starting price,
+            daily drift and daily volatility
+
+    Returns:
+        DataFrame of prices (dates x tickers)
+    """
+    import pandas as pd
+
+    np.random.seed(seed)
+    num_days = len(dates)
+
+    price_data = {}
+    for ticker in tickers:
+        prices = [base_prices[ticker]]
+        for _ in range(num_days - 1):
+            shock = np.random.normal(0, volatility[ticker])
+            new_price = prices[-1] * (1 + drift[ticker] + shock)
+            prices.append(max(new_price, prices[-1] * (1 - max_daily_drop)))
+        price_data[ticker] = prices
+
+    return pd.DataFrame(price_data, index=dates)
+
+
+def generate_price_panel(num_tickers, num_days, seed=42, start_date='1995-01-02',
+                         base_price_range=(10.0, 500.0), drift_range=(0.0001, 0.0006),
+                         volatility_range=(0.008, 0.030), max_daily_drop=0.05,
+                         index_tickers=('SPY', 'QQQ')):
+    """
+    Generate a seeded synthetic price panel of any size
+
+    Same model as generate_price_paths (daily growth 1 + drift + N(0, vol),
+    floored at a max_daily_drop fall), with each ticker's base price, drift
+    and volatility drawn uniformly from the given ranges. All draws come from
+    one np.random.Generator and the paths are a cumulative product over the
+    whole (days x tickers) matrix, so a 5,000 ticker x 30 year panel takes
+    seconds. The first columns are named after index_tickers (so SPY-based
+    reinvestment modes work); the rest are T00002, T00003, ...
+
+    Args:
+        num_tickers: number of columns
+        num_days: number of business days, starting at start_date
+        seed: seed for np.random.default_rng
+
+    Returns:
+        DataFrame of float64 prices (dates x tickers)
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    base_prices = rng.uniform(*base_price_range, size=num_tickers)
+    drift = rng.uniform(*drift_range, size=num_tickers)
+    volatility = rng.uniform(*volatility_range, size=num_tickers)
+
+    growth = rng.standard_normal((num_days, num_tickers))
+    growth *= volatility
+    growth += 1 + drift
+    np.maximum(growth, 1 - max_daily_drop, out=growth)
+    growth[0] = base_prices
+    prices = np.cumprod(growth, axis=0, out=growth)
+
+    names = list(index_tickers[:num_tickers])
+    names += [f"T{k:05d}" for k in range(len(names), num_tickers)]
+    dates = pd.bdate_range(start=start_date, periods=num_days)
+    return pd.DataFrame(prices, index=dates, columns=names, copy=False)
@@ -0,0 +1,926 @@
+#!/usr/bin/env python
+"""
+Array Backtest Engine
+
+NumPy kernel behind run_single_strategy() in run_backtest_index_focus.py.
+
+Prices and indicators come in as contiguous float64 matrices (dates x tickers).
+Holdings, cost basis and cash live in ndarrays. Trim conditions only depend on
+prices, indicators and each ticker's own trim history, so they are evaluated
+for every ticker and day as array operations up front; the daily loop then
+only visits days where something can happen. Trims that fire on the same day
+are executed in ticker order, exactly like the original per-ticker loop, so
+the holdings history, trades and Total_Value match the pandas version
+bit-for-bit.
+
+execute_trims() / reinvest() are the shared trade-and-reinvest step (pro-rata,
+SPY or fixed-basket buys as vector operations on the holdings array), used by
+the kernel and by the per-day loops in the other backtest scripts.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtest import profiling
+from backtest.trade_log import BUY, SELL, TradeLog
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+# last_trim_ns for a ticker that has never been trimmed
+NO_TRIM = np.iinfo(np.int64).min
+
+TRIM_STRATEGIES = ('threshold', 'momentum', 'volatility')
+REINVEST_MODES = ('pro_rata', 'spy', 'basket', 'cash', 'dip_buy_5pct', 'drip', 'yield_volatility')
+
+# Modes whose reinvestment rules look at the market every day, not just on trim days
+DAILY_REINVEST_MODES = ('dip_buy_5pct', 'drip', 'yield_volatility')
+
+# Days of SPY volatility averaged by the volatility-aware reinvestment rules
+REINVEST_VOL_MEAN_WINDOWS = {'drip': 63, 'yield_volatility': 20}
+
+
+def as_price_matrix(df):
+    """Return a DataFrame's values as a C-contiguous float64 (dates x tickers) matrix"""
+    return np.ascontiguousarray(df.to_numpy(dtype=np.float64))
+
+
+def _sequential_sum(values):
+    """Left-to-right sum, matching Python's sum() over tickers to the last bit"""
+    return np.cumsum(values)[-1]
+
+
+def trailing_window_mean(values, window):
+    """
+    Mean of the `window` values before each day, ignoring NaN
+
+    out[i] equals pandas' values.iloc[i-window:i].mean() (same summation
+    order, so the results are identical); the first `window` days are NaN.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) <= window:
+        return out
+
+    windows = sliding_window_view(values, window)[:-1]
+    valid = ~np.isnan(windows)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, windows, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[window:] = np.where(counts > 0, sums / counts, np.nan)
+    return out
+
+
+def threshold_schedule(prices, threshold, held, chunk=256, cost_basis=None):
+    """
+    Days on which the threshold strategy trims each ticker
+
+    After a trim the cost basis resets to 1.05x the trim price, so the search
+    for the next trigger restarts from the following day with the new basis.
+    cost_basis gives each ticker's basis going into the first row (default:
+    the first row's prices).
+    """
+    num_days, num_tickers = prices.shape
+    schedule = np.zeros((num_days, num_tickers), dtype=bool)
+    starting_basis = prices[0] if cost_basis is None else cost_basis
+
+    for j in np.flatnonzero(held):
+        column = prices[:, j]
+        cost_basis = starting_basis[j]
+        start = 0
+        while start < num_days:
+            # Look a chunk ahead first; trims usually cluster
+            stop = min(start + chunk, num_days)
+            hits = np.flatnonzero((column[start:stop] - cost_basis) / cost_basis >= threshold)
+            if not hits.size and stop < num_days:
+                hits = np.flatnonzero((column[stop:] - cost_basis) / cost_basis >= threshold)
+                if hits.size:
+                    hits = hits + (stop - start)
+            if not hits.size:
+                break
+            k = start + hits[0]
+            schedule[k, j] = True
+            cost_basis = column[k] * 1.05
+            start = k + 1
+
+    return schedule
+
+
+def momentum_schedule(prices, ma_200, momentum_20, held, momentum_threshold=1.30, start_day=0):
+    """
+    Days on which the momentum strategy trims (price > 1.3x MA200 and 20-day momentum < 0)
+
+    start_day is the position of the first row in the full history.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        schedule = (prices / ma_200 > momentum_threshold) & (momentum_20 < 0)
+    schedule[:max(200 - start_day, 0)] = False  # Need 200 days for MA
+    return schedule & held
+
+
+def volatility_schedule(volatility_30, volatility_252_median, vol_threshold, date_ns, held,
+                        cooldown_days=10, hysteresis=0.9,
+                        start_day=0, active=None, last_trim_ns=None, return_active=False):
+    """
+    Days on which the volatility strategy trims each ticker
+
+    The hysteresis state is the sign of the most recent entry/exit event, so it
+    is a forward fill over the event matrix. The cooldown is then applied per
+    ticker by jumping from each trim to the first active day at least
+    `cooldown_days` calendar days later.
+
+    To continue an earlier run, pass the position of the first row in the
+    full history (start_day), each ticker's hysteresis state going in
+    (active) and the date of its last trim (last_trim_ns, NO_TRIM if none).
+    With return_active, returns (schedule, hysteresis state after the last row).
+    """
+    num_days, num_tickers = volatility_30.shape
+    exit_threshold = vol_threshold * hysteresis
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        check = (~np.isnan(volatility_30) & ~np.isnan(volatility_252_median)
+                 & (volatility_252_median > 0) & held)
+        ratio = volatility_30 / volatility_252_median
+    check[:max(252 - start_day, 0)] = False  # Need 252 days for median volatility
+
+    # Row 0 carries the state going in; days are rows 1..num_days
+    events = np.zeros((num_days + 1, num_tickers), dtype=np.int8)
+    events[0] = -1 if active is None else np.where(active, 1, -1)
+    events[1:][check & (ratio > vol_threshold)] = 1
+    events[1:][check & (ratio < exit_threshold)] = -1
+
+    rows = np.arange(num_days + 1)[:, None]
+    last_event = np.maximum.accumulate(np.where(events != 0, rows, 0), axis=0)
+    trim_active = np.take_along_axis(events, last_event, axis=0) > 0
+
+    candidates = check & trim_active[1:]
+    schedule = np.zeros((num_days, num_tickers), dtype=bool)
+    cooldown_ns = cooldown_days * NS_PER_DAY
+
+    for j in range(num_tickers):
+        days = np.flatnonzero(candidates[:, j])
+        if not days.size:
+            continue
+        days_ns = date_ns[days]
+        k = 0
+        if last_trim_ns is not None and last_trim_ns[j] != NO_TRIM:
+            k = np.searchsorted(days_ns, last_trim_ns[j] + cooldown_ns, side='left')
+        while k < len(days):
+            schedule[days[k], j] = True
+            # Timedelta.days < cooldown  <=>  elapsed ns < cooldown * NS_PER_DAY
+            k = np.searchsorted(days_ns, days_ns[k] + cooldown_ns, side='left')
+
+    if return_active:
+        return schedule, trim_active[-1]
+    return schedule
+
+
+@dataclass
+class KernelState:
+    """
+    What run_strategy_kernel carries from one day to the next
+
+    Every kernel run returns its state after the last row; passing it back
+    as `state` with the following price rows continues the run exactly as if
+    both ranges had been run in one call (given the same indicator values).
+
+    Attributes:
+        day: rows processed so far (position of the next row in the full history)
+        last_date_ns: date of the last processed row (datetime64[ns] as int)
+        holdings, cost_basis: float64 ndarrays (tickers,)
+        cash, cash_waiting_for_dip, drip_cash, treasury_cash: cash buckets
+        spy_recent_high, buy_index: dip-buy tracking (SPY high, next of SPY/QQQ)
+        trim_active: bool ndarray (tickers,), volatility hysteresis state
+        last_trim_ns: int64 ndarray (tickers,), date of each ticker's last
+            trim (NO_TRIM if none); drives the volatility cooldown
+    """
+    day: int
+    last_date_ns: int
+    holdings: np.ndarray
+    cost_basis: np.ndarray
+    cash: float = 0.0
+    cash_waiting_for_dip: float = 0.0
+    drip_cash: float = 0.0
+    treasury_cash: float = 0.0
+    spy_recent_high: float = 0.0
+    buy_index: int = 0
+    trim_active: np.ndarray = None
+    last_trim_ns: np.ndarray = None
+
+    def __post_init__(self):
+        self.holdings = np.array(self.holdings, dtype=np.float64)
+        self.cost_basis = np.array(self.cost_basis, dtype=np.float64)
+        num_tickers = len(self.holdings)
+        if self.trim_active is None:
+            self.trim_active = np.zeros(num_tickers, dtype=bool)
+        if self.last_trim_ns is None:
+            self.last_trim_ns = np.full(num_tickers, NO_TRIM, dtype=np.int64)
+        self.trim_active = np.array(self.trim_active, dtype=bool)
+        self.last_trim_ns = np.array(self.last_trim_ns, dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    """
+    Everything one backtest run produced, frozen
+
+    The arrays are made read-only, so a result can be exported, summarized
+    and cached without anyone (including a later run of the same strategy)
+    changing it underneath.
+
+    Attributes:
+        dates: DatetimeIndex of the rows
+        tickers: tuple of ticker symbols (columns of holdings)
+        holdings: float64 ndarray (dates x tickers), shares held at each close
+        cash: float64 ndarray (dates,), the strategy's cash bucket at each close
+        total_value: float64 ndarray (dates,), portfolio value at each close
+        trades: frozen TradeLog in execution order (empty if None)
+    """
+    dates: object
+    tickers: tuple
+    holdings: np.ndarray
+    cash: np.ndarray
+    total_value: np.ndarray
+    trades: TradeLog = None
+
+    def __post_init__(self):
+        # Takes over the run's buffers (no copy) and freezes them
+        for name in ('holdings', 'cash', 'total_value'):
+            array = np.asarray(getattr(self, name), dtype=np.float64)
+            array.setflags(write=False)
+            object.__setattr__(self, name, array)
+        object.__setattr__(self, 'tickers', tuple(self.tickers))
+        trades = self.trades if self.trades is not None else TradeLog(self.dates, self.tickers)
+        object.__setattr__(self, 'trades', trades.freeze())
+
+    @property
+    def final_cash(self):
+        return float(self.cash[-1])
+
+    def holdings_frame(self, every=1, changed_only=False):
+        """Holdings as a DataFrame (dates x tickers); see history_frame for the options"""
+        return history_frame(self.holdings, self.dates, self.tickers,
+                             every=every, changed_only=changed_only)
+
+    def portfolio_frame(self, every=1, changed_only=False):
+        """Holdings plus Cash and Total_Value columns; see history_frame for the options"""
+        return history_frame(self.holdings, self.dates, self.tickers, cash=self.cash,
+                             total_value=self.total_value, every=every, changed_only=changed_only)
+
+    def value_series(self):
+        """Portfolio value as a Series indexed by date"""
+        import pandas as pd
+        return pd.Series(self.total_value, index=self.dates)
+
+    def trades_frame(self):
+        """Trade log as a DataFrame (see TradeLog.to_frame)"""
+        return self.trades.to_frame()
+
+
+def history_rows(holdings, every=1, changed_only=False, cash=None):
+    """
+    Row indices to keep when thinning a (dates x tickers) history
+
+    Args:
+        holdings: float64 ndarray (dates x tickers)
+        every: keep every Nth row
+        changed_only: keep only rows where holdings (or cash, if given)
+                      differ from the previous row
+        cash: optional (dates,) cash history for the change test
+
+    Returns:
+        int ndarray of row indices; the first and last rows are always kept
+    """
+    num_days = len(holdings)
+    keep = np.zeros(num_days, dtype=bool)
+    keep[::max(int(every), 1)] = True
+    if changed_only and num_days > 1:
+        changed = np.ones(num_days, dtype=bool)
+        changed[1:] = (holdings[1:] != holdings[:-1]).any(axis=1)
+        if cash is not None and np.ndim(cash) == 1:
+            changed[1:] |= cash[1:] != cash[:-1]
+        keep &= changed
+    if num_days:
+        keep[0] = keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+def history_frame(holdings, dates, tickers, cash=None, total_value=None,
+                  every=1, changed_only=False):
+    """
+    Build the portfolio frame (tickers, Cash, Total_Value) from history arrays
+
+    With the defaults every row is kept and the holdings array is wrapped
+    without copying (a DataFrame view over the engine's buffer). every /
+    changed_only thin the rows first, for runs that keep many frames
+    around (see history_rows); metrics should still be computed from the
+    full value array.
+
+    Args:
+        holdings: float64 ndarray (dates x tickers)
+        dates: DatetimeIndex matching the rows
+        tickers: column labels for holdings
+        cash: scalar or (dates,) array for the Cash column (None = omit)
+        total_value: (dates,) array for the Total_Value column (None = omit)
+        every, changed_only: row thinning options
+
+    Returns:
+        DataFrame indexed by date
+    """
+    import pandas as pd
+
+    if every > 1 or changed_only:
+        rows = history_rows(holdings, every, changed_only, cash)
+        holdings = holdings[rows]
+        dates = dates[rows]
+        if np.ndim(cash) == 1:
+            cash = cash[rows]
+        if total_value is not None:
+            total_value = total_value[rows]
+
+    frame = pd.DataFrame(holdings, index=dates, columns=list(tickers), copy=False)
+    if cash is not None:
+        frame['Cash'] = cash
+    if total_value is not None:
+        frame['Total_Value'] = total_value
+    return frame
+
+
+def value_holdings(holdings, prices, init_cash, fees=0.0, cash_sharing=True):
+    """
+    Value a holdings history traded as daily target-share orders
+
+    Day 0 buys holdings[0] out of init_cash; every later day trades the change
+    in holdings at that day's close. Each trade pays `fees` times its notional.
+
+    With cash_sharing, all positions share one init_cash balance, which may go
+    negative (buying the full initial allocation leaves the day-0 fees
+    unfunded). Without it, every ticker is its own account starting with
+    init_cash (vectorbt's from_orders with group_by=True and no cash_sharing):
+    a buy the ticker's cash cannot fund is filled partially, and cash and value
+    are summed over tickers, so the total starts at tickers x init_cash.
+
+    Args:
+        holdings: float64 ndarray (dates x tickers) of target shares
+        prices: float64 ndarray (dates x tickers)
+        init_cash: starting cash (per ticker without cash_sharing)
+        fees: fee rate on traded notional (0.001 = 0.1%)
+        cash_sharing: one cash balance for all tickers
+
+    Returns:
+        (cash, total_value): float64 ndarrays (dates,)
+    """
+    holdings = np.asarray(holdings, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    if not cash_sharing:
+        return _value_per_ticker(holdings, prices, init_cash, fees)
+
+    orders = np.diff(holdings, axis=0, prepend=0.0)
+    notional = orders * prices
+    cash_flow = -(notional + np.abs(notional) * fees).sum(axis=1)
+    cash = init_cash + np.cumsum(cash_flow)
+    total_value = cash + (holdings * prices).sum(axis=1)
+    return cash, total_value
+
+
+def _value_per_ticker(holdings, prices, init_cash, fees):
+    """value_holdings() without cash sharing: one account per ticker, buys capped by its cash"""
+    num_days, num_tickers = holdings.shape
+    position = np.zeros(num_tickers)
+    cash = np.full(num_tickers, float(init_cash))
+    cash_total = np.empty(num_days)
+    total_value = np.empty(num_days)
+
+    for day in range(num_days):
+        row = prices[day]
+        orders = holdings[day] - position
+        # Partial fill: spend what the account has left, fees included
+        unfunded = (orders > 0) & (orders * row * (1 + fees) > cash)
+        if unfunded.any():
+            orders[unfunded] = np.maximum(cash[unfunded], 0.0) / (row[unfunded] * (1 + fees))
+        notional = orders * row
+        cash -= notional + np.abs(notional) * fees
+        position += orders
+        cash_total[day] = cash.sum()
+        total_value[day] = cash_total[day] + (position * row).sum()
+    return cash_total, total_value
+
+
+def reinvest(holdings, row, amount, reinvest_mode, spy=None, basket_weights=None):
+    """
+    Buy into the portfolio with `amount` of cash, in place on holdings
+
+    - pro_rata: the current position weights (equal weights if the portfolio
+      is worth nothing), one vector operation over all tickers
+    - spy: everything into SPY (column `spy`; nothing is bought without one)
+    - basket: fixed target weights (basket_weights, one per ticker, sum 1)
+
+    Args:
+        holdings: float64 ndarray (tickers,), updated in place
+        row: float64 ndarray (tickers,) of today's prices
+        amount: cash to invest (after any buy-side costs)
+        reinvest_mode: 'pro_rata', 'spy' or 'basket'
+
+    Returns:
+        True if the amount was invested, False if the mode does not buy
+    """
+    if reinvest_mode == 'pro_rata':
+        position_values = holdings * row
+        total_value = _sequential_sum(position_values)
+        if total_value > 0:
+            weights = position_values / total_value
+        else:
+            weights = np.full(len(holdings), 1.0 / len(holdings))
+        holdings += (amount * weights) / row
+    elif reinvest_mode == 'spy' and spy is not None:
+        holdings[spy] += amount / row[spy]
+    elif reinvest_mode == 'basket':
+        holdings += (amount * basket_weights) / row
+    else:
+        return False
+    return True
+
+
+def execute_trims(holdings, row, trimmed, trim_fraction, reinvest_mode,
+                  cost_basis=None, spy=None, basket_weights=None,
+                  transaction_cost_pct=0.0, capital_gains_tax_rate=0.0, sequential=False):
+    """
+    Execute one day's trims and reinvest their proceeds, in place on holdings
+
+    By default every trim sells from the day's opening holdings as one vector
+    operation, and the pooled net proceeds are reinvested once (TrimStrategy
+    in run_backtest.py works this way). With sequential=True each trim's
+    proceeds are reinvested before the next trim runs, so a later trim also
+    sells part of what earlier ones bought; this is how the array kernel and
+    the with-dip / manual-data scripts trade, and reproduces them exactly.
+    Either way a day costs O(trims x tickers) vector work, not Python loops
+    over tickers.
+
+    Proceeds of modes that do not buy ('cash', 'dip_buy_5pct', 'drip',
+    'yield_volatility') are left for the caller to book.
+
+    Args:
+        holdings: float64 ndarray (tickers,), updated in place
+        row: float64 ndarray (tickers,) of today's prices
+        trimmed: column indices of the tickers trimmed today, in execution order
+        trim_fraction: fraction of each trimmed position sold
+        reinvest_mode: see reinvest(); other modes keep the proceeds as cash
+        cost_basis: float64 ndarray (tickers,), needed for capital gains tax
+        spy, basket_weights: see reinvest()
+        transaction_cost_pct: cost rate on each sale and on each reinvestment
+        capital_gains_tax_rate: tax rate on (positive) realized gains
+        sequential: reinvest after each trim instead of once for the day
+
+    Returns:
+        dict of float64 ndarrays, one entry per trimmed ticker: 'shares',
+        'gross_proceeds', 'transaction_cost', 'capital_gains_tax',
+        'net_proceeds', plus 'total_net_proceeds' (their sum in execution
+        order) and 'reinvested' (bool, whether the mode bought)
+    """
+    trimmed = np.asarray(trimmed, dtype=np.intp)
+    if cost_basis is None:
+        cost_basis = row
+    profiling.count('trims', len(trimmed))
+
+    reinvested = False
+    if sequential:
+        fills = np.empty((5, len(trimmed)))
+        for k, j in enumerate(trimmed.tolist()):
+            current_price = row[j]
+            shares_to_sell = holdings[j] * trim_fraction
+            gross_proceeds = shares_to_sell * current_price
+
+            transaction_cost = gross_proceeds * transaction_cost_pct
+            proceeds_after_cost = gross_proceeds - transaction_cost
+
+            capital_gain = proceeds_after_cost - shares_to_sell * cost_basis[j]
+            capital_gains_tax = max(0, capital_gain * capital_gains_tax_rate)
+            net_proceeds = proceeds_after_cost - capital_gains_tax
+
+            holdings[j] -= shares_to_sell
+            with profiling.stage('reinvest'):
+                reinvested = reinvest(holdings, row, net_proceeds * (1 - transaction_cost_pct),
+                                      reinvest_mode, spy, basket_weights)
+            fills[:, k] = (shares_to_sell, gross_proceeds, transaction_cost,
+                           capital_gains_tax, net_proceeds)
+        shares, gross, cost, tax, net = fills
+        total_net = _sequential_sum(net) if len(trimmed) else 0.0
+    else:
+        prices = row[trimmed]
+        shares = holdings[trimmed] * trim_fraction
+        gross = shares * prices
+        cost = gross * transaction_cost_pct
+        after_cost = gross - cost
+        tax = np.maximum(0, (after_cost - shares * cost_basis[trimmed]) * capital_gains_tax_rate)
+        net = after_cost - tax
+
+        holdings[trimmed] -= shares
+        total_net = _sequential_sum(net) if len(trimmed) else 0.0
+        if len(trimmed):
+            with profiling.stage('reinvest'):
+                reinvested = reinvest(holdings, row, total_net * (1 - transaction_cost_pct),
+                                      reinvest_mode, spy, basket_weights)
+
+    return {
+        'shares': shares,
+        'gross_proceeds': gross,
+        'transaction_cost': cost,
+        'capital_gains_tax': tax,
+        'net_proceeds': net,
+        'total_net_proceeds': total_net,
+        'reinvested': reinvested
+    }
+
+
+def run_strategy_kernel(strategy_type, threshold, reinvest_mode,
+                        prices, dates, tickers, initial_shares,
+                        ma_200=None, momentum_20=None,
+                        volatility_30=None, volatility_252_median=None,
+                        spy_vol_avg=None,
+                        trim_percentage=0.20,
+                        transaction_cost_pct=0.0,
+                        capital_gains_tax_rate=0.0,
+                        momentum_threshold=1.30,
+                        volatility_cooldown_days=10,
+                        volatility_hysteresis=0.9,
+                        basket_weights=None,
+                        state=None):
+    """
+    Run a single backtest strategy on array inputs
+
+    Positions never reach zero (a trim sells a fraction of the shares), so the
+    set of tradable tickers is fixed by the starting holdings.
+
+    With `state` (the KernelState returned by an earlier run), the run picks
+    up where that one stopped: prices, dates and indicators then hold only the
+    new rows, initial_shares is ignored, and spy_vol_avg must be given for
+    the drip / yield_volatility modes (its lookback reaches into the old rows).
+
+    Args:
+        strategy_type: 'threshold', 'momentum', or 'volatility'
+        threshold: gain threshold (threshold) or vol multiplier (volatility); ignored for momentum
+        reinvest_mode: 'pro_rata', 'spy', 'basket', 'cash', 'dip_buy_5pct', 'drip', 'yield_volatility'
+        prices: float64 ndarray (dates x tickers)
+        dates: DatetimeIndex matching the rows of prices
+        tickers: list of ticker symbols matching the columns of prices
+        initial_shares: float64 ndarray (tickers,) or dict of ticker -> shares
+        ma_200, momentum_20, volatility_30, volatility_252_median: indicator
+            matrices shaped like prices (only the ones the strategy uses are required)
+        spy_vol_avg: optional precomputed trailing mean of SPY's volatility_30 over
+            REINVEST_VOL_MEAN_WINDOWS[reinvest_mode] days (computed here if omitted)
+        basket_weights: target weights for 'basket' reinvestment, ndarray
+            (tickers,) or dict of ticker -> weight (missing tickers get 0)
+        state: KernelState to continue from (None = start a new run)
+
+    Returns:
+        dict with 'holdings' (dates x tickers), 'cash' (final cash balance),
+        'cash_history' (dates,), 'total_value' (dates,), 'trades' (trims),
+        'dip_buys' (TradeLogs) and 'state' (KernelState after the last row)
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    num_days, num_tickers = prices.shape
+    tickers = list(tickers)
+    date_ns = np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+
+    if state is None:
+        if isinstance(initial_shares, dict):
+            initial_shares = [initial_shares[t] for t in tickers]
+        spy_start = prices[0, tickers.index('SPY')] if 'SPY' in tickers else 0
+        state = KernelState(day=0, last_date_ns=NO_TRIM, holdings=initial_shares,
+                            cost_basis=prices[0], spy_recent_high=spy_start)
+    elif len(state.holdings) != num_tickers:
+        raise ValueError(f"State has {len(state.holdings)} tickers, prices have {num_tickers}")
+    start_day = state.day
+
+    # Working copies; the state passed in is left unchanged
+    holdings = state.holdings.copy()
+    held = holdings > 0
+    cost_basis = state.cost_basis.copy()
+    cash = state.cash
+    trades = TradeLog(dates, tickers)
+    dip_buys = TradeLog(dates, tickers)
+
+    spy = tickers.index('SPY') if 'SPY' in tickers else None
+    if isinstance(basket_weights, dict):
+        basket_weights = np.array([basket_weights.get(t, 0.0) for t in tickers], dtype=np.float64)
+    if reinvest_mode == 'basket' and basket_weights is None:
+        raise ValueError("basket reinvestment needs basket_weights")
+
+    # === TRIM CONDITIONS (all tickers, all days) ===
+    trim_active = state.trim_active
+    if strategy_type == 'threshold':
+        schedule = threshold_schedule(prices, threshold, held, cost_basis=cost_basis)
+    elif strategy_type == 'momentum':
+        schedule = momentum_schedule(prices, ma_200, momentum_20, held, momentum_threshold, start_day)
+    elif strategy_type == 'volatility':
+        schedule, trim_active = volatility_schedule(
+            volatility_30, volatility_252_median, threshold, date_ns, held,
+            volatility_cooldown_days, volatility_hysteresis,
+            start_day=start_day, active=state.trim_active, last_trim_ns=state.last_trim_ns,
+            return_active=True)
+    else:
+        schedule = np.zeros((num_days, num_tickers), dtype=bool)
+    trim_days = schedule.any(axis=1)
+
+    # Mode-specific state
+    cash_waiting_for_dip = state.cash_waiting_for_dip
+    spy_recent_high = state.spy_recent_high
+    buy_queue = [tickers.index(t) if t in tickers else None for t in ('SPY', 'QQQ')]
+    buy_index = state.buy_index
+    drip_cash = state.drip_cash
+    treasury_cash = state.treasury_cash
+
+    if reinvest_mode in ('drip', 'yield_volatility') and spy is not None:
+        spy_vol_30 = volatility_30[:, spy]
+        if spy_vol_avg is None:
+            if start_day:
+                raise ValueError("spy_vol_avg is required to continue a drip/yield_volatility run")
+            spy_vol_avg = trailing_window_mean(spy_vol_30, REINVEST_VOL_MEAN_WINDOWS[reinvest_mode])
+    if reinvest_mode == 'dip_buy_5pct' and spy is not None:
+        spy_prices = prices[:, spy].tolist()
+
+    if reinvest_mode in DAILY_REINVEST_MODES:
+        days_to_visit = range(num_days)
+    else:
+        days_to_visit = np.flatnonzero(trim_days).tolist()
+
+    # Rows [filled, i) still hold the current holdings and cash; written just
+    # before they change (only one cash bucket is ever non-zero per mode)
+    holdings_history = np.empty((num_days, num_tickers), dtype=np.float64)
+    cash_history = np.empty(num_days, dtype=np.float64)
+    filled = 0
+
+    for i in days_to_visit:
+        row = prices[i]
+
+        # === REINVESTMENT LOGIC (before trimming) ===
+
+        # Dip-buy reinvestment
+        if reinvest_mode == 'dip_buy_5pct' and spy is not None:
+            current_spy = spy_prices[i]
+            if current_spy > spy_recent_high:
+                spy_recent_high = current_spy
+
+            current_drop = (spy_recent_high - current_spy) / spy_recent_high
+
+            if current_drop >= 0.05 and cash_waiting_for_dip > 0:
+                next_buy = buy_queue[buy_index]
+                if next_buy is not None:
+                    holdings_history[filled:i] = holdings
+                    cash_history[filled:i] = cash + cash_waiting_for_dip + drip_cash + treasury_cash
+                    filled = i
+
+                    amount_after_buy_cost = cash_waiting_for_dip * (1 - transaction_cost_pct)
+                    holdings[next_buy] += amount_after_buy_cost / row[next_buy]
+
+                    dip_buys.append(i, next_buy, BUY, 'dip_buy',
+                                    amount_after_buy_cost / row[next_buy], row[next_buy],
+                                    -cash_waiting_for_dip, -cash_waiting_for_dip,
+                                    transaction_cost=cash_waiting_for_dip - amount_after_buy_cost,
+                                    signal=current_drop)
+
+                    cash_waiting_for_dip = 0
+                    buy_index = (buy_index + 1) % 2
+                    spy_recent_high = current_spy
+
+        # Drip reinvestment (25% per week = 5 trading days)
+        if reinvest_mode == 'drip' and drip_cash > 0:
+            # Check if volatility has normalized (vol < 1.2x 3-month avg)
+            volatility_normalized = False
+            if start_day + i >= 63 and spy is not None:
+                vol_30_spy = spy_vol_30[i]
+                vol_63_avg = spy_vol_avg[i]
+                if not np.isnan(vol_30_spy) and not np.isnan(vol_63_avg) and vol_63_avg > 0:
+                    volatility_normalized = vol_30_spy < 1.2 * vol_63_avg
+
+            if (start_day + i) % 5 == 0 or volatility_normalized:
+                holdings_history[filled:i] = holdings
+                cash_history[filled:i] = cash + cash_waiting_for_dip + drip_cash + treasury_cash
+                filled = i
+
+                amount_to_reinvest = drip_cash if volatility_normalized else drip_cash * 0.25
+                reinvest(holdings, row, amount_to_reinvest * (1 - transaction_cost_pct), 'pro_rata')
+                drip_cash -= amount_to_reinvest
+
+        # Yield/volatility-based reinvestment (GRADUAL to avoid spikes)
+        if reinvest_mode == 'yield_volatility' and treasury_cash > 0 and spy is not None:
+            volatility_normalized = False
+            if start_day + i >= 63:
+                vol_30_spy = spy_vol_30[i]
+                vol_20_avg = spy_vol_avg[i]
+                if not np.isnan(vol_30_spy) and not np.isnan(vol_20_avg) and vol_20_avg > 0:
+                    volatility_normalized = vol_30_spy < vol_20_avg
+
+            if volatility_normalized and treasury_cash > 100:
+                holdings_history[filled:i] = holdings
+                cash_history[filled:i] = cash + cash_waiting_for_dip + drip_cash + treasury_cash
+                filled = i
+
+                amount_to_reinvest = treasury_cash * 0.20
+                reinvest(holdings, row, amount_to_reinvest * (1 - transaction_cost_pct), 'spy', spy)
+                treasury_cash -= amount_to_reinvest
+
+        # === TRIM LOGIC ===
+        if not trim_days[i]:
+            continue
+
+        holdings_history[filled:i] = holdings
+        cash_history[filled:i] = cash + cash_waiting_for_dip + drip_cash + treasury_cash
+        filled = i
+
+        # Execute in ticker order: reinvesting one trim changes the
+        # holdings (and so the share count) of the trims that follow
+        trimmed = np.flatnonzero(schedule[i])
+        fills = execute_trims(holdings, row, trimmed, trim_percentage, reinvest_mode,
+                              cost_basis=cost_basis, spy=spy, basket_weights=basket_weights,
+                              transaction_cost_pct=transaction_cost_pct,
+                              capital_gains_tax_rate=capital_gains_tax_rate, sequential=True)
+
+        for k, j in enumerate(trimmed.tolist()):
+            net_proceeds = fills['net_proceeds'][k]
+            trades.append(i, j, SELL, strategy_type, fills['shares'][k], row[j],
+                          fills['gross_proceeds'][k], net_proceeds,
+                          fills['transaction_cost'][k], fills['capital_gains_tax'][k],
+                          signal=(row[j] - cost_basis[j]) / cost_basis[j])
+
+            # Proceeds the reinvestment mode holds back as cash
+            if reinvest_mode == 'cash':
+                cash += net_proceeds
+            elif reinvest_mode == 'dip_buy_5pct':
+                cash_waiting_for_dip += net_proceeds
+            elif reinvest_mode == 'drip':
+                drip_cash += net_proceeds
+            elif reinvest_mode == 'yield_volatility':
+                treasury_cash += net_proceeds
+
+        # Reset cost basis for threshold strategies
+        if strategy_type == 'threshold':
+            cost_basis[trimmed] = row[trimmed] * 1.05
+
+    holdings_history[filled:] = holdings
+    cash_history[filled:] = cash + cash_waiting_for_dip + drip_cash + treasury_cash
+
+    last_trim_ns = state.last_trim_ns.copy()
+    traded = schedule.any(axis=0)
+    last_trim_ns[traded] = date_ns[num_days - 1 - np.argmax(schedule[::-1, traded], axis=0)]
+    state = KernelState(
+        day=start_day + num_days,
+        last_date_ns=int(date_ns[-1]) if num_days else state.last_date_ns,
+        holdings=holdings, cost_basis=cost_basis, cash=cash,
+        cash_waiting_for_dip=cash_waiting_for_dip, drip_cash=drip_cash,
+        treasury_cash=treasury_cash, spy_recent_high=spy_recent_high,
+        buy_index=buy_index, trim_active=trim_active, last_trim_ns=last_trim_ns)
+
+    # Cash column holds the final balance of the mode's cash bucket
+    if reinvest_mode == 'dip_buy_5pct':
+        cash = cash_waiting_for_dip
+    elif reinvest_mode == 'drip':
+        cash = drip_cash
+    elif reinvest_mode == 'yield_volatility':
+        cash = treasury_cash
+
+    total_value = np.cumsum(holdings_history * prices, axis=1)[:, -1] + cash
+    profiling.count('kernel_days', num_days)
+    profiling.count('dip_buys', len(dip_buys))
+
+    return {
+        'holdings': holdings_history,
+        'cash': cash,
+        'cash_history': cash_history,
+        'total_value': total_value,
+        'trades': trades.freeze(),
+        'dip_buys': dip_buys.freeze(),
+        'state': state
+    }
+
+
+def run_threshold_batch(prices, tickers, initial_shares, thresholds, trim_sizes, reinvest_modes,
+                        transaction_cost_pct=0.0, capital_gains_tax_rate=0.0,
+                        record_values=False, metrics=None, metrics_chunk=256):
+    """
+    Run many threshold strategies in one pass over the price matrix
+
+    Each parameter set (threshold, trim size, reinvest mode) is a row of the
+    state arrays, so holdings and cost basis are (parameter sets x tickers) and
+    every day's price row is loaded once for all of them. Final holdings and
+    values match run_strategy_kernel('threshold', ...) for each parameter set
+    bit-for-bit; recorded daily values use the running cash balance.
+
+    Args:
+        prices: float64 ndarray (dates x tickers)
+        tickers: list of ticker symbols matching the columns of prices
+        initial_shares: float64 ndarray (tickers,) or dict of ticker -> shares
+        thresholds, trim_sizes, reinvest_modes: one entry per parameter set;
+            reinvest modes must be 'pro_rata', 'spy' or 'cash'
+        metrics: optional MetricsAccumulator (one series per parameter set)
+            fed the daily values as the run goes, metrics_chunk days at a
+            time, so long runs get metrics without recording values
+
+    Returns:
+        dict with 'final_value', 'cash' and 'num_trims' (parameter sets,),
+        'holdings' (parameter sets x tickers) and, if record_values is set,
+        'total_value' (dates x parameter sets)
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    num_days, num_tickers = prices.shape
+    tickers = list(tickers)
+
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    trim_sizes = np.asarray(trim_sizes, dtype=np.float64)
+    reinvest_modes = np.asarray(reinvest_modes)
+    num_sets = len(thresholds)
+    if not (len(trim_sizes) == len(reinvest_modes) == num_sets):
+        raise ValueError("thresholds, trim_sizes and reinvest_modes must have the same length")
+    unsupported = set(reinvest_modes.tolist()) - {'pro_rata', 'spy', 'cash'}
+    if unsupported:
+        raise ValueError(f"Batched runs support pro_rata, spy and cash reinvestment, not {sorted(unsupported)}")
+
+    if isinstance(initial_shares, dict):
+        initial_shares = [initial_shares[t] for t in tickers]
+    holdings = np.tile(np.asarray(initial_shares, dtype=np.float64), (num_sets, 1))
+    cost_basis = np.tile(prices[0], (num_sets, 1))
+    cash = np.zeros(num_sets)
+    num_trims = np.zeros(num_sets, dtype=np.int64)
+
+    spy = tickers.index('SPY') if 'SPY' in tickers else None
+    is_cash = reinvest_modes == 'cash'
+    is_spy = (reinvest_modes == 'spy') & (spy is not None)
+    is_pro_rata = reinvest_modes == 'pro_rata'
+    threshold_column = thresholds[:, None]
+
+    if record_values:
+        total_value = np.empty((num_days, num_sets), dtype=np.float64)
+    if metrics is not None:
+        pending = np.empty((min(metrics_chunk, num_days), num_sets), dtype=np.float64)
+        num_pending = 0
+
+    for i in range(num_days):
+        row = prices[i]
+
+        # Trim condition for every parameter set and ticker at once
+        should_trim = (holdings > 0) & ((row - cost_basis) / cost_basis >= threshold_column)
+
+        if should_trim.any():
+            # Tickers in order, parameter sets in parallel
+            for j in np.flatnonzero(should_trim.any(axis=0)):
+                rows = np.flatnonzero(should_trim[:, j])
+                current_price = row[j]
+                shares_to_sell = holdings[rows, j] * trim_sizes[rows]
+                gross_proceeds = shares_to_sell * current_price
+
+                transaction_cost = gross_proceeds * transaction_cost_pct
+                proceeds_after_cost = gross_proceeds - transaction_cost
+                capital_gain = proceeds_after_cost - shares_to_sell * cost_basis[rows, j]
+                capital_gains_tax = np.maximum(0, capital_gain * capital_gains_tax_rate)
+                net_proceeds = proceeds_after_cost - capital_gains_tax
+
+                holdings[rows, j] -= shares_to_sell
+                num_trims[rows] += 1
+
+                to_cash = is_cash[rows]
+                cash[rows[to_cash]] += net_proceeds[to_cash]
+
+                to_spy = is_spy[rows]
+                if to_spy.any():
+                    amount_after_buy_cost = net_proceeds[to_spy] * (1 - transaction_cost_pct)
+                    holdings[rows[to_spy], spy] += amount_after_buy_cost / row[spy]
+
+                to_pro_rata = is_pro_rata[rows]
+                if to_pro_rata.any():
+                    target = rows[to_pro_rata]
+                    amount_after_buy_cost = net_proceeds[to_pro_rata] * (1 - transaction_cost_pct)
+                    position_values = holdings[target] * row
+                    portfolio_value = np.cumsum(position_values, axis=1)[:, -1:]
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        weights = np.where(portfolio_value > 0, position_values / portfolio_value,
+                                           1.0 / num_tickers)
+                    holdings[target] += (amount_after_buy_cost[:, None] * weights) / row
+
+                cost_basis[rows, j] = current_price * 1.05
+
+        if record_values or metrics is not None:
+            value = np.cumsum(holdings * row, axis=1)[:, -1] + cash
+            if record_values:
+                total_value[i] = value
+            if metrics is not None:
+                pending[num_pending] = value
+                num_pending += 1
+                if num_pending == len(pending):
+                    metrics.update_block(pending)
+                    num_pending = 0
+
+    if metrics is not None and num_pending:
+        metrics.update_block(pending[:num_pending])
+
+    final_value = np.cumsum(holdings * prices[-1], axis=1)[:, -1] + cash
+
+    result = {
+        'final_value': final_value,
+        'cash': cash,
+        'num_trims': num_trims,
+        'holdings': holdings
+    }
+    if record_values:
+        result['total_value'] = total_value
+    return result
@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+"""
+Cached, concurrent price downloads into the columnar price store
+
+Replaces one-ticker-at-a-time download loops with fixed sleeps:
+
+- the store records which dates of each ticker were already fetched
+  (coverage.json next to its manifest), so only the missing date ranges are
+  requested; refreshing a universe costs just the new days
+- tickers are fetched by a bounded thread pool, paced by a token-bucket rate
+  limiter, with exponential backoff on errors
+- everything fetched is merged into the store in one write
+
+Sources (pluggable, see SOURCES):
+    yfinance         Yahoo Finance via yfinance
+    yfinance_cache   Yahoo Finance via yfinance_cache
+    directory        <TICKER>.csv files in a local directory (offline stand-in)
+
+Dates are inclusive calendar days, and every source's timestamps are
+normalized to midnight dates before they reach the store (Yahoo CSVs carry
+05:00 UTC stamps, yfinance midnight ones). Days from today on are never
+marked as fetched, so an intraday price is replaced by the close on the next
+refresh.
+
+Closes are split/dividend adjusted, and a split or dividend re-adjusts the
+whole history. Each update therefore fetches one stored bar next to the new
+days again; if its close moved, the ticker's full history is fetched on the
+new basis and replaces the stored one (report['reloaded']).
+
+Usage:
+    store, report = fetch_prices(['SPY', 'QQQ'], '2015-01-01', '2024-11-05')
+    price_df = store.load(['SPY', 'QQQ'], '2015-01-01', '2024-11-05')
+
+    python src/backtest/fetch.py SPY QQQ AAPL --start 2015-01-01
+    python src/backtest/fetch.py SPY QQQ --source directory --source-dir data --store /tmp/store
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.price_store import PriceStore, read_yahoo_close
+
+# Configuration
+DEFAULT_STORE_DIR = 'price_store'
+COVERAGE_FILE = 'coverage.json'
+MAX_WORKERS = 4
+RATE_PER_SECOND = 2.0     # Sustained requests per second across all workers
+BURST = 4                 # Requests allowed back-to-back before pacing kicks in
+RETRIES = 3               # Extra attempts after a failed request
+BACKOFF_SECONDS = 1.0     # First retry delay; doubles each attempt (plus jitter)
+MAX_BACKOFF_SECONDS = 30.0
+ADJUSTMENT_TOLERANCE = 1e-6  # Relative change of the re-fetched bar that means the history was re-adjusted
+
+
+# ============================================================================
+# SOURCES (fetch(ticker, start, end) -> Close series on midnight dates, inclusive)
+# ============================================================================
+
+def _to_days(series):
+    """Series re-keyed on midnight dates (the last row wins if two stamps share a day)"""
+    series = series.copy()
+    series.index = pd.DatetimeIndex(series.index).normalize()
+    return series[~series.index.duplicated(keep='last')]
+
+
+def _close_series(frame):
+    """Close column of a Yahoo frame as a float series on midnight exchange dates"""
+    if frame is None or len(frame) == 0:
+        return pd.Series(dtype=np.float64)
+    close = frame['Close']
+    if isinstance(close, pd.DataFrame):  # yf.download's (field, ticker) columns
+        close = close.iloc[:, 0]
+    index = pd.DatetimeIndex(close.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)  # same dates as yf.download
+    return _to_days(pd.Series(close.to_numpy(dtype=np.float64), index=index, name='Close').dropna())
+
+
+class YFinanceSource:
+    """Yahoo Finance through yfinance (errors are raised, not swallowed)"""
+
+    name = 'yfinance'
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+
+        # history() takes an exclusive end date
+        frame = yf.Ticker(ticker).history(start=str(start), end=str(end + timedelta(days=1)),
+                                          auto_adjust=True, raise_errors=True)
+        return _close_series(frame)
+
+
+class YFinanceCacheSource:
+    """Yahoo Finance through yfinance_cache (keeps its own request cache)"""
+
+    name = 'yfinance_cache'
+
+    def fetch(self, ticker, start, end):
+        import yfinance_cache as yfc
+
+        frame = yfc.download(ticker, start=str(start), end=str(end + timedelta(days=1)), progress=False)
+        return _close_series(frame)
+
+
+class DirectorySource:
+    """<TICKER>.csv files in a local directory, served like a download"""
+
+    name = 'directory'
+
+    def __init__(self, csv_dir='data'):
+        self.csv_dir = csv_dir
+
+    def fetch(self, ticker, start, end):
+        path = os.path.join(self.csv_dir, f"{ticker}.csv")
+        if not os.path.exists(path):
+            return pd.Series(dtype=np.float64)
+        series = _to_days(read_yahoo_close(path))  # CSV stamps are 05:00 UTC
+        return series[(series.index >= pd.Timestamp(start)) & (series.index <= pd.Timestamp(end))]
+
+
+SOURCES = {
+    'yfinance': YFinanceSource,
+    'yfinance_cache': YFinanceCacheSource,
+    'directory': DirectorySource,
+}
+
+
+def make_source(source='yfinance', **kwargs):
+    """Source instance from a SOURCES name (objects with a fetch() method pass through)"""
+    if not isinstance(source, str):
+        return source
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source: {source} (choose from {', '.join(SOURCES)})")
+    return SOURCES[source](**kwargs)
+
+
+# ============================================================================
+# RATE LIMITING & RETRIES
+# ============================================================================
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, up to capacity saved up"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_with_retry(source, ticker, start, end, limiter=None, retries=RETRIES,
+                     backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+    """source.fetch() behind the rate limiter, retried with exponential backoff and jitter"""
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return source.fetch(ticker, start, end)
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = min(max_backoff, backoff * 2 ** attempt)
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+
+# ============================================================================
+# COVERAGE (fetched date ranges per ticker)
+# ============================================================================
+
+def _to_date(value):
+    return pd.Timestamp(value).date()
+
+
+def load_coverage(store_dir):
+    """{ticker: [(start, end), ...]} of inclusive date ranges already fetched"""
+    path = os.path.join(store_dir, COVERAGE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        raw = json.load(f)
+    return {ticker: [(_to_date(s), _to_date(e)) for s, e in ranges] for ticker, ranges in raw.items()}
+
+
+def save_coverage(store_dir, coverage):
+    path = os.path.join(store_dir, COVERAGE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({ticker: [[str(s), str(e)] for s, e in ranges]
+                   for ticker, ranges in sorted(coverage.items())}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def add_range(ranges, start, end):
+    """Insert an inclusive range, merging overlapping and adjacent ones"""
+    merged = []
+    for s, e in sorted(list(ranges) + [(start, end)]):
+        if merged and s <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+def missing_ranges(ranges, start, end):
+    """Parts of [start, end] not covered by ranges"""
+    missing = []
+    cursor = start
+    for s, e in sorted(ranges):
+        if e < cursor:
+            continue
+        if s > end:
+            break
+        if s > cursor:
+            missing.append((cursor, s - timedelta(days=1)))
+        cursor = max(cursor, e + timedelta(days=1))
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+# ============================================================================
+# FETCH
+# ============================================================================
+
+def with_overlap(ranges, stored_dates):
+    """
+    Extend the missing ranges to re-fetch one stored bar next to the new days
+
+    Args:
+        ranges: missing inclusive date ranges
+        stored_dates: sorted dates the store already has for the ticker
+
+    Returns:
+        (ranges, overlap date or None): the last stored bar before the newest
+        missing range (an update), else the first one after the oldest (a backfill)
+    """
+    if not len(stored_dates) or not ranges:
+        return ranges, None
+    ranges = sorted(ranges)
+    last_start, last_end = ranges[-1]
+    before = [d for d in stored_dates if d < last_start]
+    if before:
+        return ranges[:-1] + [(before[-1], last_end)], before[-1]
+    first_start, first_end = ranges[0]
+    after = [d for d in stored_dates if d > first_end]
+    if after:
+        return [(first_start, after[0])] + ranges[1:], after[0]
+    return ranges, None
+
+
+def _fetch_ticker(source, ticker, ranges, limiter, retries, stored=None, overlap=None, full_range=None):
+    """
+    Fetch the missing ranges of one ticker
+
+    Returns:
+        (Close series on midnight dates, True if the stored history was on a
+        different adjustment basis and the series is the full re-fetched history)
+    """
+    pieces = [fetch_with_retry(source, ticker, s, e, limiter, retries) for s, e in ranges]
+    pieces = [p for p in pieces if len(p)]
+    series = _to_days(pd.concat(pieces).sort_index()) if pieces else pd.Series(dtype=np.float64)
+
+    if overlap is not None:
+        day = pd.Timestamp(overlap)
+        old = stored.get(day)
+        new = series.get(day)
+        if new is None or abs(new / old - 1) > ADJUSTMENT_TOLERANCE:
+            full = fetch_with_retry(source, ticker, full_range[0], full_range[1], limiter, retries)
+            return _to_days(full.sort_index()), True
+    return series, False
+
+
+def _stored_series(store, ticker):
+    """Stored closes of one ticker on midnight dates (empty if the store lacks it)"""
+    if store is None or ticker not in store.ticker_index:
+        return pd.Series(dtype=np.float64)
+    return _to_days(store.load_unaligned([ticker])[ticker].dropna())
+
+
+def fetch_prices(tickers, start, end=None, source='yfinance', store_dir=DEFAULT_STORE_DIR,
+                 max_workers=MAX_WORKERS, rate=RATE_PER_SECOND, burst=BURST, retries=RETRIES,
+                 verbose=True):
+    """
+    Bring the store up to date for tickers over [start, end], fetching only missing days
+
+    Args:
+        tickers: tickers to fetch
+        start, end: inclusive date range (end None = today)
+        source: SOURCES name or an object with fetch(ticker, start, end)
+        store_dir: price store directory to merge into (created if needed)
+        max_workers: concurrent requests
+        rate, burst: token-bucket limit (requests per second, bucket size)
+        retries: extra attempts per request before the ticker is reported failed
+        verbose: print one line per ticker
+
+    Returns:
+        (PriceStore or None if the store is still empty, report dict with
+        'fetched' {ticker: new rows}, 'cached' [tickers], 'reloaded' [tickers
+        whose history was re-fetched on a new adjustment basis], 'failed'
+        {ticker: error, including fetches that returned no rows})
+    """
+    source = make_source(source)
+    start = _to_date(start)
+    end = _to_date(end) if end is not None else date.today()
+    today = date.today()
+
+    os.makedirs(store_dir, exist_ok=True)
+    coverage = load_coverage(store_dir)
+    has_store = os.path.exists(os.path.join(store_dir, 'manifest.json'))
+    existing = PriceStore(store_dir) if has_store else None
+    report = {'fetched': {}, 'cached': [], 'reloaded': [], 'failed': {}}
+
+    todo = {}
+    for ticker in dict.fromkeys(tickers):
+        ranges = missing_ranges(coverage.get(ticker, []), start, end)
+        if ranges:
+            todo[ticker] = ranges
+        else:
+            report['cached'].append(ticker)
+            if verbose:
+                print(f"  ✓ {ticker} (cached)")
+
+    fetched = {}
+    if todo:
+        limiter = TokenBucket(rate, burst)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo)))) as executor:
+            futures = {}
+            for ticker, ranges in todo.items():
+                stored = _stored_series(existing, ticker)
+                request, overlap = with_overlap(ranges, [d.date() for d in stored.index])
+                covered = coverage.get(ticker, [])
+                full_range = (min([start] + [s for s, _ in covered]), max([end] + [e for _, e in covered]))
+                future = executor.submit(_fetch_ticker, source, ticker, request, limiter, retries,
+                                         stored, overlap, full_range)
+                futures[future] = (ticker, overlap, full_range)
+
+            for future in as_completed(futures):
+                ticker, overlap, full_range = futures[future]
+                try:
+                    series, reloaded = future.result()
+                    # Nothing to store, and marking the range fetched would skip it for good
+                    if not len(series):
+                        raise ValueError("no rows returned")
+                except Exception as e:
+                    report['failed'][ticker] = str(e)[:200]
+                    if verbose:
+                        print(f"  ✗ {ticker} ({str(e)[:50]})")
+                    continue
+
+                fetched[ticker] = series
+                # The re-fetched overlap bar is already in the store
+                new_rows = len(series) - (overlap is not None and not reloaded)
+                report['fetched'][ticker] = new_rows
+                # Today's (possibly intraday) price is fetched again next time
+                if reloaded:
+                    report['reloaded'].append(ticker)
+                    coverage[ticker] = []
+                    fetched_ranges = [full_range]
+                else:
+                    fetched_ranges = todo[ticker]
+                for s, e in fetched_ranges:
+                    if s < today:
+                        coverage[ticker] = add_range(coverage.get(ticker, []), s, min(e, today - timedelta(days=1)))
+                if verbose:
+                    note = "rows, history reloaded on a new adjustment basis" if reloaded else "new rows"
+                    print(f"  ✓ {ticker} ({new_rows:,} {note})")
+
+    if fetched:
+        store = PriceStore.write(store_dir, fetched, merge=True, replace=report['reloaded'])
+        save_coverage(store_dir, coverage)
+    else:
+        store = existing
+
+    return store, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch missing daily closes into a price store')
+    parser.add_argument('tickers', nargs='+', help='tickers to fetch')
+    parser.add_argument('--start', default='2015-01-01', help='first date (default: %(default)s)')
+    parser.add_argument('--end', default=None, help='last date, inclusive (default: today)')
+    parser.add_argument('--source', default='yfinance', choices=SOURCES, help='data source (default: %(default)s)')
+    parser.add_argument('--source-dir', default='data', help="CSV directory for --source directory (default: %(default)s)")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help='price store directory (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='concurrent requests (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=RATE_PER_SECOND, help='requests per second (default: %(default)s)')
+    args = parser.parse_args()
+
+    source = make_source(args.source, **({'csv_dir': args.source_dir} if args.source == 'directory' else {}))
+
+    print("="*80)
+    print("FETCHING PRICES")
+    print("="*80)
+    print(f"\n  Tickers: {len(args.tickers)}, source: {source.name}, store: {args.store}/")
+    print(f"  Range: {args.start} to {args.end or 'today'}\n")
+
+    started = time.perf_counter()
+    store, report = fetch_prices(args.tickers, args.start, args.end, source=source, store_dir=args.store,
+                                 max_workers=args.workers, rate=args.rate)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✓ Fetch complete in {elapsed:.1f}s")
+    print(f"  Fetched: {len(report['fetched'])} ({sum(report['fetched'].values()):,} new rows)")
+    print(f"  Already cached: {len(report['cached'])}")
+    if report['failed']:
+        print(f"\n⚠️  Failed: {', '.join(report['failed'])}")
+        return 1
+    if store is not None:
+        print(f"  Store: {len(store.tickers)} tickers, {store.manifest['num_days']:,} days")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+"""
+Incremental Daily Backtest
+
+Keeps the index-focus strategies (run_backtest_index_focus.py) up to date
+without replaying their history. The first run backtests the full history
+and writes a checkpoint; every later run loads it, reads only the price rows
+after the checkpoint's last date from the price store and advances each
+strategy's KernelState over them.
+
+A checkpoint (one .npz file) holds:
+
+- each strategy's KernelState: holdings, cost basis, cash buckets, SPY's
+  recent high, volatility hysteresis state and last trim dates
+- the daily portfolio values so far (dates x strategies)
+- a MetricsAccumulator per strategy, so metrics update in O(1) per day
+- the last TAIL_ROWS price rows, the lookback of the slowest indicator
+
+Indicators for the new rows (ma_200, momentum_20, volatility_30,
+volatility_252_median and the trailing SPY volatility means) are computed
+over the price tail plus the new rows, so an update costs the same however
+long the history is. pandas accumulates rolling means and standard deviations
+along the frame, so these can differ from a full recompute in the last bits;
+the state itself carries over exactly (a run split at any date ends with the
+same state as one unbroken run).
+
+Portfolio values use each day's running cash balance. (The index-focus
+script's Total_Value adds the final cash balance to every day instead.)
+
+Usage:
+    python src/backtest/incremental.py                     # build or update
+    python src/backtest/incremental.py --end 2024-06-28    # stop at a date
+    python src/backtest/incremental.py --rebuild           # replay full history
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import run_backtest_index_focus as index_focus
+from backtest.data import allocate_initial_shares, load_price_data
+from backtest.engine import REINVEST_VOL_MEAN_WINDOWS, KernelState, as_price_matrix, run_strategy_kernel
+from backtest.indicators import LOOKBACK, IndicatorCache
+from backtest.io import save_comparison
+from backtest.metrics import MetricsAccumulator
+from backtest.price_store import open_price_store
+
+CHECKPOINT_VERSION = 2
+CHECKPOINT_PATH = os.path.join(index_focus.RESULTS_DIR, 'checkpoint.npz')
+
+# Price rows kept for the indicators of the next update
+TAIL_ROWS = max(
+    LOOKBACK['sma'](200),
+    LOOKBACK['momentum'](index_focus.MOMENTUM_LOOKBACK),
+    LOOKBACK['volatility'](30) + max(REINVEST_VOL_MEAN_WINDOWS.values()),
+    LOOKBACK['volatility_median'](252),
+)
+
+# Checkpoint config entries passed straight to run_strategy_kernel
+KERNEL_SETTINGS = ('trim_percentage', 'transaction_cost_pct', 'capital_gains_tax_rate',
+                   'momentum_threshold', 'volatility_cooldown_days', 'volatility_hysteresis')
+
+
+@dataclass
+class Checkpoint:
+    """
+    Strategy states and history after the last processed day
+
+    Attributes:
+        config: settings the strategies run with (kept from the first run)
+        tickers: column order of every per-ticker array
+        strategies: (strategy_name, strategy_type, param, reinvest_mode) jobs
+        states: KernelState per strategy (None before the first day)
+        dates: datetime64[ns] ndarray (days,)
+        values: float64 ndarray (days x strategies), portfolio value at each close
+        price_tail: float64 ndarray (up to TAIL_ROWS x tickers), the last price rows
+        metrics: MetricsAccumulator over values (one series per strategy)
+    """
+    config: dict
+    tickers: list
+    strategies: list
+    states: list
+    dates: np.ndarray
+    values: np.ndarray
+    price_tail: np.ndarray
+    metrics: MetricsAccumulator
+
+    @classmethod
+    def empty(cls, config, tickers, strategies):
+        return cls(config, list(tickers), [tuple(job) for job in strategies],
+                   [None] * len(strategies),
+                   np.array([], dtype='datetime64[ns]'),
+                   np.empty((0, len(strategies))),
+                   np.empty((0, len(tickers))),
+                   MetricsAccumulator(config['initial_cash'], num_series=len(strategies)))
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+
+
+def index_focus_config(initial_shares, tickers):
+    """Settings of the index-focus script, as stored in a new checkpoint"""
+    return {
+        'data_dir': index_focus.MANUAL_DATA_DIR,
+        'start_date': index_focus.START_DATE,
+        'initial_cash': index_focus.INITIAL_CASH,
+        'initial_shares': [initial_shares[t] for t in tickers],
+        'momentum_lookback': index_focus.MOMENTUM_LOOKBACK,
+        'trim_percentage': index_focus.TRIM_PERCENTAGE,
+        'transaction_cost_pct': index_focus.TRANSACTION_COST_PCT,
+        'capital_gains_tax_rate': index_focus.CAPITAL_GAINS_TAX_RATE,
+        'momentum_threshold': index_focus.MOMENTUM_THRESHOLD,
+        'volatility_cooldown_days': index_focus.VOLATILITY_COOLDOWN_DAYS,
+        'volatility_hysteresis': index_focus.VOLATILITY_HYSTERESIS,
+    }
+
+
+def save_checkpoint(path, checkpoint):
+    """Write a checkpoint atomically (to a temporary file, then renamed)"""
+    if any(state is None for state in checkpoint.states):
+        raise ValueError("Checkpoint has strategies that have not run yet")
+
+    meta = {
+        'version': CHECKPOINT_VERSION,
+        'config': checkpoint.config,
+        'tickers': checkpoint.tickers,
+        'strategies': checkpoint.strategies,
+    }
+    arrays = {
+        f'state_{field.name}': np.array([getattr(state, field.name) for state in checkpoint.states])
+        for field in fields(KernelState)
+    }
+    arrays.update({f'metrics_{name}': value for name, value in checkpoint.metrics.state().items()})
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), dates=checkpoint.dates,
+                 values=checkpoint.values, price_tail=checkpoint.price_tail, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """Read a checkpoint written by save_checkpoint"""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {path}")
+
+        state_arrays = {field.name: data[f'state_{field.name}'] for field in fields(KernelState)}
+        states = []
+        for k in range(len(meta['strategies'])):
+            values = {name: array[k] for name, array in state_arrays.items()}
+            states.append(KernelState(**{name: value.item() if value.ndim == 0 else value
+                                         for name, value in values.items()}))
+
+        return Checkpoint(
+            config=meta['config'],
+            tickers=meta['tickers'],
+            strategies=[tuple(job) for job in meta['strategies']],
+            states=states,
+            dates=data['dates'],
+            values=data['values'],
+            price_tail=data['price_tail'],
+            metrics=MetricsAccumulator.from_state(
+                {name: data[f'metrics_{name}'] for name in MetricsAccumulator.STATE_FIELDS},
+                meta['config']['initial_cash']),
+        )
+
+
+def advance(checkpoint, new_prices, store=None):
+    """
+    Run every strategy in a checkpoint over the price rows that follow it
+
+    Args:
+        checkpoint: Checkpoint to update in place
+        new_prices: DataFrame (new dates x checkpoint.tickers), all after
+                    checkpoint.last_date
+        store: PriceStore the prices came from (scopes the on-disk indicator
+               cache; only worth passing for a full-history build)
+
+    Returns:
+        float64 ndarray (new dates x strategies) of portfolio values
+    """
+    config = checkpoint.config
+    tickers = checkpoint.tickers
+    num_new = len(new_prices)
+
+    tail = pd.DataFrame(checkpoint.price_tail, columns=tickers,
+                        index=pd.DatetimeIndex(checkpoint.dates[len(checkpoint.dates) - len(checkpoint.price_tail):]))
+    frame = pd.concat([tail, new_prices[tickers]]) if len(tail) else new_prices[tickers]
+
+    # Indicators over tail + new rows, keeping the new rows
+    indicators = IndicatorCache(frame, store)
+    inputs = {
+        'ma_200': indicators.get('sma', 200)[-num_new:],
+        'momentum_20': indicators.get('momentum', config['momentum_lookback'])[-num_new:],
+        'volatility_30': indicators.get('volatility', 30)[-num_new:],
+        'volatility_252_median': indicators.get('volatility_median', 252)[-num_new:],
+    }
+    spy_vol_avg = {}
+    if 'SPY' in tickers:
+        for mode, mean_window in REINVEST_VOL_MEAN_WINDOWS.items():
+            spy_vol_avg[mode] = indicators.trailing_mean('volatility', 30, 'SPY', mean_window)[-num_new:]
+
+    prices = as_price_matrix(new_prices[tickers])
+    dates = new_prices.index
+    settings = {name: config[name] for name in KERNEL_SETTINGS}
+
+    values = np.empty((num_new, len(checkpoint.strategies)))
+    for k, (strategy_name, strategy_type, param, mode) in enumerate(checkpoint.strategies):
+        result = run_strategy_kernel(
+            strategy_type, param, mode, prices, dates, tickers, config['initial_shares'],
+            spy_vol_avg=spy_vol_avg.get(mode), state=checkpoint.states[k], **inputs, **settings)
+        checkpoint.states[k] = result['state']
+        # Left-to-right row sums like run_strategy_kernel's Total_Value (.sum(axis=1) is pairwise)
+        values[:, k] = np.cumsum(result['holdings'] * prices, axis=1)[:, -1] + result['cash_history']
+
+    checkpoint.dates = np.concatenate([checkpoint.dates, np.asarray(dates, dtype='datetime64[ns]')])
+    checkpoint.values = np.vstack([checkpoint.values, values])
+    checkpoint.metrics.update_block(values)
+    checkpoint.price_tail = as_price_matrix(frame)[-TAIL_ROWS:]
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Advance the index-focus strategies to the latest prices')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help='checkpoint file (default: %(default)s)')
+    parser.add_argument('--end', default=None, help='last date to process (default: all stored prices)')
+    parser.add_argument('--rebuild', action='store_true', help='replay the full history into a new checkpoint')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("INCREMENTAL DAILY BACKTEST - INDEX-FOCUSED PORTFOLIO")
+    print("="*80)
+
+    if not os.path.exists(index_focus.MANUAL_DATA_DIR):
+        print(f"\n❌ ERROR: Directory '{index_focus.MANUAL_DATA_DIR}/' not found!")
+        return 1
+    store = open_price_store(index_focus.MANUAL_DATA_DIR)
+
+    if args.rebuild or not os.path.exists(args.checkpoint):
+        print(f"\n🔄 Building checkpoint from the full history...")
+        price_df, valid_tickers = load_price_data(index_focus.MANUAL_DATA_DIR, index_focus.TICKERS,
+                                                  index_focus.START_DATE, args.end)
+        if price_df is None:
+            return 1
+        initial_shares = allocate_initial_shares(price_df, valid_tickers, index_focus.INITIAL_CASH,
+                                                 index_focus.PORTFOLIO_CONFIG)
+        checkpoint = Checkpoint.empty(index_focus_config(initial_shares, valid_tickers),
+                                      valid_tickers, index_focus.build_jobs())
+        new_prices = price_df
+        indicator_store = store
+    else:
+        checkpoint = load_checkpoint(args.checkpoint)
+        last_date = checkpoint.last_date
+        print(f"\n📂 Checkpoint: {args.checkpoint}")
+        print(f"  Strategies: {len(checkpoint.strategies)}")
+        print(f"  Last day: {last_date.date()} (day {len(checkpoint.dates):,})")
+
+        # Starts at the last processed day so gaps on the first new day are forward-filled
+        price_df = store.load(checkpoint.tickers, last_date, args.end)
+        if list(price_df.columns) != checkpoint.tickers:
+            print(f"\n❌ Price store is missing tickers: "
+                  f"{', '.join(sorted(set(checkpoint.tickers) - set(price_df.columns)))}")
+            return 1
+        new_prices = price_df[price_df.index > last_date]
+        indicator_store = None
+
+    if new_prices.empty:
+        print(f"\n✓ Already up to date")
+        return 0
+
+    start = time.perf_counter()
+    advance(checkpoint, new_prices, indicator_store)
+    elapsed = time.perf_counter() - start
+    save_checkpoint(args.checkpoint, checkpoint)
+
+    print(f"\n✓ Processed {len(new_prices):,} new day(s): "
+          f"{new_prices.index[0].date()} to {new_prices.index[-1].date()}")
+    print(f"  {len(checkpoint.strategies)} strategies in {elapsed * 1000:.1f} ms")
+    print(f"  Checkpoint saved to: {args.checkpoint}")
+
+    # Summary from the running metrics (no pass over the value history)
+    stats = checkpoint.metrics.finalize()
+    all_results = {
+        job[0]: {name: stats[name][k] for name in ('final_value', 'cagr', 'sharpe_ratio', 'max_drawdown')}
+        for k, job in enumerate(checkpoint.strategies)
+    }
+    results_path = os.path.join(os.path.dirname(args.checkpoint), 'incremental_results.csv')
+    comparison_df = save_comparison(all_results, results_path)
+
+    print(f"\n🏆 TOP 5 STRATEGIES (as of {checkpoint.last_date.date()}):\n")
+    print(comparison_df.head(5).to_string())
+    print(f"\n✓ Results saved to: {results_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
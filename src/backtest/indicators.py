@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Technical Indicator Cache
+
+Computes the indicators the trim and reinvestment rules need once per
+(indicator, window, ticker set, date range) and keeps them as float64
+(dates x tickers) ndarrays:
+
+- in the cache instance, so every strategy in a run (and every forked worker)
+  shares them; the memo goes away with the instance, so long-lived processes
+  that build a cache per frame (incremental updates, benchmarks) do not
+  accumulate matrices
+- on disk next to the price store, so repeated runs and later instances over
+  the same frame skip the computation
+
+Disk entries live under a directory named after the price store's content
+hash; when the underlying prices change the hash changes and old entries are
+never read again (and are pruned on the next write).
+
+Usage:
+    indicators = IndicatorCache(price_df, store)
+    ma_200 = indicators.get('sma', 200)
+    spy_vol_avg = indicators.trailing_mean('volatility', 30, 'SPY', 63)
+"""
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import trailing_window_mean
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Indicator name -> function(price_df, window) returning a DataFrame
+INDICATORS = {
+    # Simple moving average of the price
+    'sma': lambda prices, window: prices.rolling(window=window).mean(),
+    # Percentage change over `window` days
+    'momentum': lambda prices, window: prices.pct_change(periods=window),
+    # Annualized realized volatility of daily returns
+    'volatility': lambda prices, window: (
+        prices.pct_change().rolling(window=window).std() * np.sqrt(TRADING_DAYS_PER_YEAR)),
+    # Rolling median of the rolling volatility (both over `window` days), annualized
+    'volatility_median': lambda prices, window: (
+        prices.pct_change().rolling(window=window).std().rolling(window=window).median()
+        * np.sqrt(TRADING_DAYS_PER_YEAR)),
+}
+
+# Indicator name -> rows of history a value needs before its own row
+# (indicators over a frame that starts this many rows earlier are complete)
+LOOKBACK = {
+    'sma': lambda window: window - 1,
+    'momentum': lambda window: window,
+    'volatility': lambda window: window,
+    'volatility_median': lambda window: 2 * window - 1,
+}
+
+class IndicatorCache:
+    """Memoized indicator matrices for one aligned price DataFrame"""
+
+    def __init__(self, price_df, store=None, cache_dir=None):
+        """
+        Args:
+            price_df: aligned close prices (dates x tickers), e.g. PriceStore.load()
+            store: PriceStore the prices were loaded from; its content hash
+                   scopes the cache (None = in-process memo only)
+            cache_dir: on-disk cache root (default: <store_dir>/indicators)
+        """
+        self.price_df = price_df
+        self.tickers = tuple(price_df.columns)
+        self.content_hash = store.content_hash if store is not None else None
+
+        if cache_dir is None and store is not None:
+            cache_dir = os.path.join(store.store_dir, 'indicators')
+        self.cache_dir = cache_dir
+
+        # Ticker set and date range identify the frame within one store version
+        date_ns = np.asarray(price_df.index, dtype='datetime64[ns]').view(np.int64)
+        span = (int(date_ns[0]), int(date_ns[-1]), len(date_ns)) if len(date_ns) else (0, 0, 0)
+        self._frame_key = (self.content_hash, self.tickers, span)
+
+        # In-process memo for this frame: key -> ndarray
+        self._memory = {}
+
+    def _disk_path(self, key):
+        if self.cache_dir is None or self.content_hash is None:
+            return None
+        digest = hashlib.sha256(repr((self._frame_key, key)).encode()).hexdigest()[:24]
+        return os.path.join(self.cache_dir, self.content_hash[:16], f"{digest}.npy")
+
+    def _cached(self, key, compute):
+        if key in self._memory:
+            return self._memory[key]
+
+        path = self._disk_path(key)
+        if path is not None and os.path.exists(path):
+            values = np.load(path)
+        else:
+            values = np.ascontiguousarray(compute(), dtype=np.float64)
+            if path is not None:
+                self._save(path, values)
+
+        values.setflags(write=False)
+        self._memory[key] = values
+        return values
+
+    def _save(self, path, values):
+        hash_dir = os.path.dirname(path)
+
+        # Entries for other price store versions can never be read again
+        if os.path.isdir(self.cache_dir):
+            for entry in os.listdir(self.cache_dir):
+                if entry != os.path.basename(hash_dir):
+                    shutil.rmtree(os.path.join(self.cache_dir, entry), ignore_errors=True)
+
+        os.makedirs(hash_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, path)
+
+    def get(self, name, window):
+        """
+        Indicator matrix (dates x tickers, read-only) for one indicator/window
+
+        Args:
+            name: key of INDICATORS ('sma', 'momentum', 'volatility', 'volatility_median')
+            window: lookback in trading days
+        """
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        return self._cached((name, window), lambda: INDICATORS[name](self.price_df, window))
+
+    def frame(self, name, window):
+        """Same as get(), labelled as a DataFrame"""
+        return pd.DataFrame(self.get(name, window), index=self.price_df.index, columns=list(self.tickers))
+
+    def trailing_mean(self, name, window, ticker, mean_window):
+        """
+        Mean of one ticker's indicator over the mean_window days before each day
+
+        Precomputed form of indicator[ticker].iloc[i-mean_window:i].mean(),
+        as used by the drip and yield_volatility reinvestment rules.
+        """
+        column = self.tickers.index(ticker)
+        return self._cached(
+            ('trailing_mean', name, window, ticker, mean_window),
+            lambda: trailing_window_mean(self.get(name, window)[:, column], mean_window))
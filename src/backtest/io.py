@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Result file writers
+
+Per-strategy exports read by the validators (validation/validate_backtest.py):
+
+    <results_dir>/<name>_portfolio_value.csv   holdings per ticker, Cash, Total_Value
+    <results_dir>/<name>_metrics.csv           one row of metrics
+    <results_dir>/<name>_trades.csv            one row per trim
+    <results_dir>/<name>_weights.csv           (optional) position weights per day
+    <results_dir>/<name>_metadata.json         strategy configuration
+"""
+
+import json
+import os
+
+# Columns of an empty trade log (strategies that never trade)
+TRADE_COLUMNS = ['date', 'ticker', 'shares_sold', 'price', 'proceeds', 'gain_pct']
+
+
+def save_strategy_files(results_dir, name, portfolio_value_df, metrics, trades, metadata,
+                        weights_df=None):
+    """
+    Write the validator files for one strategy
+
+    Args:
+        results_dir: output directory (created if needed)
+        name: file prefix, e.g. 'trim_50pct_pro_rata'
+        portfolio_value_df: DataFrame with ticker holdings, Cash and Total_Value
+        metrics: dict of metrics (one CSV row)
+        trades: DataFrame or list of trade dicts (empty = header-only file)
+        metadata: dict written as JSON (dates and other objects via str())
+        weights_df: optional DataFrame of position weights
+
+    Returns:
+        number of files written
+    """
+    import pandas as pd
+
+    os.makedirs(results_dir, exist_ok=True)
+    prefix = os.path.join(results_dir, name)
+
+    portfolio_value_df.to_csv(f"{prefix}_portfolio_value.csv")
+    pd.DataFrame([metrics]).to_csv(f"{prefix}_metrics.csv", index=False)
+
+    trades_df = trades if isinstance(trades, pd.DataFrame) else pd.DataFrame(trades)
+    if trades_df.empty and len(trades_df.columns) == 0:
+        trades_df = pd.DataFrame(columns=TRADE_COLUMNS)
+    trades_df.to_csv(f"{prefix}_trades.csv", index=False)
+
+    num_files = 4
+    if weights_df is not None:
+        weights_df.to_csv(f"{prefix}_weights.csv")
+        num_files += 1
+
+    with open(f"{prefix}_metadata.json", 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+    return num_files
+
+
+def save_comparison(all_results, path):
+    """
+    Write the strategy comparison table (one row per strategy, best first)
+
+    Args:
+        all_results: dict of strategy name -> metrics dict
+        path: CSV file to write
+
+    Returns:
+        comparison DataFrame sorted by final_value (descending)
+    """
+    import pandas as pd
+
+    comparison_df = pd.DataFrame(all_results).T
+    comparison_df = comparison_df.sort_values('final_value', ascending=False)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    comparison_df.to_csv(path)
+    return comparison_df
@@ -0,0 +1,802 @@
+#!/usr/bin/env python
+"""
+Performance metrics
+
+Array-in, array-out versions of the metrics the backtest scripts compute on
+portfolio value series. The rolling functions accept a 1-D series (days,) or
+a 2-D block of series (days x strategies) and reduce along the day axis.
+
+metrics_table() is the shared kernel for the core metrics (CAGR, Sharpe,
+Sortino, volatility, max drawdown): a block of value series (strategies x
+days) in, one value per series and metric out. calculate_metrics(),
+portfolio_stats() and the validators' recalculations all go through it.
+
+calculate_batch_metrics() adds the rolling window and bootstrap columns and
+returns the comparison table for all strategies of a run (a DataFrame of
+value series in, one row per strategy out); calculate_metrics() is the
+same for a single portfolio value Series, as the per-strategy dict the
+scripts put in their results.
+MetricsAccumulator computes its core metrics in one pass, for runs that do
+not keep their value history.
+"""
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Rolling window lengths in trading days
+ROLLING_WINDOWS = {
+    '1yr': 252,
+    '3yr': 756,
+    '5yr': 1260,
+}
+
+# Resampling schemes for bootstrap_confidence_intervals ('iid' ignores autocorrelation)
+BOOTSTRAP_METHODS = ('iid', 'stationary', 'moving_block')
+
+
+def float_power(base, exponent):
+    """
+    Elementwise base ** exponent using Python float pow
+
+    np.power can differ from the scalar pow the pandas code paths used in the
+    last ulp, so results are computed per element to stay bit-for-bit equal.
+    The exponent can be a scalar or an array broadcast against base.
+    """
+    base = np.asarray(base, dtype=np.float64)
+    if np.ndim(exponent):
+        base, exponent = np.broadcast_arrays(base, np.asarray(exponent, dtype=np.float64))
+        flat = [value ** power for value, power in zip(base.ravel().tolist(), exponent.ravel().tolist())]
+    else:
+        exponent = float(exponent)
+        flat = [value ** exponent for value in base.ravel().tolist()]
+    return np.array(flat, dtype=np.float64).reshape(base.shape)
+
+
+def rolling_cagr(values, window_days):
+    """
+    CAGR over every window of window_days + 1 observations
+
+    Args:
+        values: portfolio values, (days,) or (days x series)
+        window_days: window length in trading days
+
+    Returns:
+        array with one row per window end (days window_days .. days-1)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= window_days:
+        return np.empty((0,) + values.shape[1:])
+
+    years = window_days / TRADING_DAYS_PER_YEAR
+    ratio = values[window_days:] / values[:-window_days]
+    return float_power(ratio, 1 / years) - 1
+
+
+def rolling_max_drawdown(values, window_days):
+    """
+    Maximum drawdown within every window of window_days + 1 observations
+
+    Linear-time sliding window: the series is cut into blocks of one window
+    length, and each window is the suffix of one block joined to the prefix
+    of the next. Block prefixes/suffixes are running max/min scans, so the
+    cost does not grow with the window length.
+
+    Args:
+        values: portfolio values, (days,) or (days x series)
+        window_days: window length in trading days
+
+    Returns:
+        array with one row per window end (days window_days .. days-1),
+        drawdowns as negative fractions (0 if the window never fell)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= window_days:
+        return np.empty((0,) + values.shape[1:])
+
+    one_d = values.ndim == 1
+    if one_d:
+        values = values[:, None]
+
+    block = window_days + 1
+    num_blocks = -(-n // block)
+    padded = np.concatenate([values, np.repeat(values[-1:], num_blocks * block - n, axis=0)])
+    blocks = padded.reshape(num_blocks, block, -1)
+
+    # Prefix of each block: running peak and the worst drawdown from it so far
+    prefix_max = np.maximum.accumulate(blocks, axis=1)
+    prefix_min = np.minimum.accumulate(blocks, axis=1)
+    prefix_dd = np.minimum.accumulate((blocks - prefix_max) / prefix_max, axis=1)
+
+    # Suffix of each block: peak, and worst drop from any day to a later low
+    reverse = blocks[:, ::-1]
+    suffix_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+    suffix_low = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+    suffix_dd = np.minimum.accumulate(((suffix_low - blocks) / blocks)[:, ::-1], axis=1)[:, ::-1]
+
+    num_series = values.shape[1]
+    prefix_min = prefix_min.reshape(-1, num_series)
+    prefix_dd = prefix_dd.reshape(-1, num_series)
+    suffix_max = suffix_max.reshape(-1, num_series)
+    suffix_dd = suffix_dd.reshape(-1, num_series)
+
+    # Window [s, s + window_days]: suffix from s, prefix up to the window end
+    starts = np.arange(n - window_days)
+    ends = starts + window_days
+    peak = suffix_max[starts]
+    cross_dd = (prefix_min[ends] - peak) / peak
+    max_dd = np.minimum(np.minimum(suffix_dd[starts], prefix_dd[ends]), cross_dd)
+
+    # Block-aligned windows lie entirely inside one block
+    aligned = starts % block == 0
+    max_dd[aligned] = suffix_dd[starts[aligned]]
+
+    return max_dd[:, 0] if one_d else max_dd
+
+
+def rolling_window_metrics(values, windows=None):
+    """
+    Rolling CAGR and max drawdown for several window lengths in one call
+
+    Args:
+        values: portfolio values, (days,) or (days x series)
+        windows: dict of label -> window_days (default: ROLLING_WINDOWS)
+
+    Returns:
+        dict with '{label}_cagr' and '{label}_max_dd' arrays per window
+    """
+    windows = ROLLING_WINDOWS if windows is None else windows
+    values = np.asarray(values, dtype=np.float64)
+
+    metrics = {}
+    for label, window_days in windows.items():
+        metrics[f'{label}_cagr'] = rolling_cagr(values, window_days)
+        metrics[f'{label}_max_dd'] = rolling_max_drawdown(values, window_days)
+    return metrics
+
+
+def bootstrap_indices(rng, num_samples, num_days, method='iid', block_size=20):
+    """
+    Draw resample indices for num_samples bootstrap paths at once
+
+    Args:
+        rng: np.random.Generator
+        num_samples: number of bootstrap paths
+        num_days: length of each path (and of the source series)
+        method: 'iid' (independent days), 'stationary' (random block lengths,
+                geometric with mean block_size) or 'moving_block' (fixed blocks)
+        block_size: (mean) block length for the block methods
+
+    Returns:
+        int array (num_samples x num_days) of indices into the source series
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method: {method}")
+
+    starts = rng.integers(0, num_days, size=(num_samples, num_days))
+    if method == 'iid':
+        return starts
+
+    # Block methods: a day either starts a new block at a random position or
+    # continues the previous day's block (wrapping around the series end)
+    positions = np.arange(num_days)
+    if method == 'stationary':
+        new_block = rng.random((num_samples, num_days)) < 1 / block_size
+    else:
+        new_block = np.broadcast_to(positions % block_size == 0, (num_samples, num_days)).copy()
+    new_block[:, 0] = True
+
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    first_index = np.take_along_axis(starts, block_start, axis=1)
+    return (first_index + positions - block_start) % num_days
+
+
+def bootstrap_confidence_intervals(returns, n_bootstrap=1000, confidence=0.95, seed=None,
+                                   method='iid', block_size=20, chunk_elements=2**22):
+    """
+    Bootstrapped confidence intervals for CAGR and Sharpe
+
+    All resamples are drawn from one seeded Generator and reduced as
+    (samples x days) matrices, chunked so at most chunk_elements indices are
+    held in memory at once. The same seed always gives the same intervals.
+    Several return series of equal length are resampled with the same
+    indices, so each row gets the intervals it would get on its own.
+
+    Args:
+        returns: daily returns (already cleaned/capped), (days,) or (series x days)
+        n_bootstrap: number of bootstrap paths
+        confidence: confidence level (default 0.95 for 95% CI)
+        seed: seed for np.random.default_rng (None = fresh entropy)
+        method: 'iid', 'stationary' or 'moving_block' (see bootstrap_indices)
+        block_size: (mean) block length for the block methods
+        chunk_elements: memory bound for one chunk of resample indices (and
+                        of the resampled returns)
+
+    Returns:
+        dict with CI bounds for CAGR and Sharpe (floats for 1-D input, one
+        per series otherwise)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    one_d = returns.ndim == 1
+    returns = np.ascontiguousarray(returns.reshape(1, -1) if one_d else returns)
+    num_series, n_days = returns.shape
+    years = n_days / TRADING_DAYS_PER_YEAR
+    rng = np.random.default_rng(seed)
+
+    chunk = max(1, chunk_elements // max(n_days, 1))
+    bootstrap_cagrs = np.empty((num_series, n_bootstrap))
+    bootstrap_sharpes = np.empty((num_series, n_bootstrap))
+
+    for lo in range(0, n_bootstrap, chunk):
+        hi = min(lo + chunk, n_bootstrap)
+        indices = bootstrap_indices(rng, hi - lo, n_days, method, block_size)
+        group = max(1, chunk_elements // max(indices.size, 1))
+
+        for first in range(0, num_series, group):
+            rows = slice(first, first + group)
+            samples = returns[rows][:, indices]
+
+            growth = np.prod(1 + samples, axis=2)
+            bootstrap_cagrs[rows, lo:hi] = growth ** (1 / years) - 1
+
+            mean = samples.mean(axis=2)
+            std = samples.std(axis=2, ddof=1) if n_days > 1 else np.zeros(mean.shape)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sharpe = (mean * TRADING_DAYS_PER_YEAR) / (std * np.sqrt(TRADING_DAYS_PER_YEAR))
+            bootstrap_sharpes[rows, lo:hi] = np.where(std > 0, sharpe, 0)
+
+    # Calculate confidence intervals
+    alpha = (1 - confidence) / 2
+    lower_percentile = alpha * 100
+    upper_percentile = (1 - alpha) * 100
+
+    intervals = {
+        'cagr_ci_lower': np.percentile(bootstrap_cagrs, lower_percentile, axis=1),
+        'cagr_ci_upper': np.percentile(bootstrap_cagrs, upper_percentile, axis=1),
+        'sharpe_ci_lower': np.percentile(bootstrap_sharpes, lower_percentile, axis=1),
+        'sharpe_ci_upper': np.percentile(bootstrap_sharpes, upper_percentile, axis=1)
+    }
+    if one_d:
+        intervals = {key: value[0] for key, value in intervals.items()}
+    return intervals
+
+
+# Columns of metrics_table() that calculate_metrics reports, in its order
+METRIC_COLUMNS = ('total_return', 'cagr', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown', 'volatility')
+
+# Sortino denominators metrics_table() can use
+DOWNSIDE_METHODS = ('std', 'rms')
+
+
+def metrics_table(values, initial_capital, periods_per_year=TRADING_DAYS_PER_YEAR, return_cap=None,
+                  years=None, returns_from_initial=False, downside='std'):
+    """
+    Core performance metrics of many portfolio value series in one pass
+
+    The kernel behind calculate_metrics, portfolio_stats and the validators'
+    recalculations. Each row is one series and every reduction runs along
+    its day axis, so a sweep's metrics are one call and each row matches the
+    1-D pandas formulas (pct_change, std, cummax) bit for bit.
+
+    Non-finite values repeat the last finite one (leading gaps stay NaN and
+    have no return). Sharpe and Sortino are 0 where their deviation is not
+    positive.
+
+    Args:
+        values: portfolio values, (strategies x days), or (days,) for one series
+        initial_capital: initial investment (scalar or one per series)
+        periods_per_year: rows per year used to annualize
+        return_cap: clip daily returns to +/- this for Sharpe, Sortino and
+                    volatility (None = use raw returns)
+        years: CAGR period (scalar or one per series; None = rows / periods_per_year)
+        returns_from_initial: measure the first day's return against
+                              initial_capital (series that start from cash)
+        downside: Sortino denominator, 'std' (standard deviation of the
+                  negative returns) or 'rms' (root mean square of min(return, 0))
+
+    Returns:
+        dict of column -> one value per series: final_value, total_return,
+        cagr, sharpe_ratio, sortino_ratio, max_drawdown, volatility,
+        downside_volatility, max_drawdown_day (row of the drawdown low) and
+        the data checks num_invalid, num_extreme, max_return and min_return
+        (uncapped returns); scalars for 1-D input
+    """
+    if downside not in DOWNSIDE_METHODS:
+        raise ValueError(f"Unknown downside method: {downside} (choose from {', '.join(DOWNSIDE_METHODS)})")
+
+    values = np.asarray(values, dtype=np.float64)
+    one_d = values.ndim == 1
+    values = np.ascontiguousarray(values.reshape(1, -1) if one_d else values)
+    num_series, num_days = values.shape
+    initial_capital = np.broadcast_to(np.asarray(initial_capital, dtype=np.float64), (num_series,))
+    sqrt_periods = np.sqrt(periods_per_year)
+    rows = np.arange(num_series)
+
+    num_invalid = (~np.isfinite(values)).sum(axis=1)
+    values = _forward_fill(values)
+
+    final_value = values[:, -1] if num_days else np.zeros(num_series)
+    total_return = final_value / initial_capital - 1
+    years = num_days / periods_per_year if years is None else years
+    with np.errstate(divide='ignore'):
+        cagr = float_power(1 + total_return, 1 / np.asarray(years, dtype=np.float64)) - 1
+
+    # Daily returns
+    if returns_from_initial:
+        previous = np.hstack([initial_capital[:, None], values[:, :-1]])
+        current = values
+    else:
+        previous, current = values[:, :-1], values[:, 1:]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = current / previous - 1
+    has_return = ~np.isnan(returns)
+
+    max_return = np.where(has_return, returns, -np.inf).max(axis=1, initial=-np.inf)
+    min_return = np.where(has_return, returns, np.inf).min(axis=1, initial=np.inf)
+    if return_cap is not None:
+        num_extreme = (has_return & (np.abs(returns) > return_cap)).sum(axis=1)
+        returns = np.clip(returns, -return_cap, return_cap)
+    else:
+        num_extreme = np.zeros(num_series, dtype=np.int64)
+
+    count, mean, std = _sample_moments(returns, has_return)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if downside == 'rms':
+            down_std = np.sqrt(np.where(has_return, np.minimum(returns, 0) ** 2, 0.0).sum(axis=1) / count)
+        else:
+            _, _, down_std = _sample_moments(returns, has_return & (returns < 0))
+
+        sharpe = np.where(std > 0, (mean * periods_per_year) / (std * sqrt_periods), 0.0)
+        sortino = np.where(down_std > 0, (mean * periods_per_year) / (down_std * sqrt_periods), 0.0)
+
+    # Drawdown from the running peak
+    with np.errstate(invalid='ignore', divide='ignore'):
+        peak = np.fmax.accumulate(values, axis=1)
+        drawdown = (values - peak) / peak
+    drawdown = np.where(np.isnan(drawdown), np.inf, drawdown)
+    max_drawdown_day = drawdown.argmin(axis=1) if num_days else np.zeros(num_series, dtype=np.int64)
+    max_drawdown = drawdown[rows, max_drawdown_day] if num_days else np.zeros(num_series)
+    max_drawdown = np.where(np.isinf(max_drawdown), np.nan, max_drawdown)
+
+    table = {
+        'final_value': final_value,
+        'total_return': total_return,
+        'cagr': cagr,
+        'sharpe_ratio': sharpe,
+        'sortino_ratio': sortino,
+        'max_drawdown': max_drawdown,
+        'volatility': std * sqrt_periods,
+        'downside_volatility': down_std * sqrt_periods,
+        'max_drawdown_day': max_drawdown_day,
+        'num_invalid': num_invalid,
+        'num_extreme': num_extreme,
+        'max_return': max_return,
+        'min_return': min_return,
+    }
+    if one_d:
+        table = {key: value[0].item() for key, value in table.items()}
+    return table
+
+
+def _forward_fill(values):
+    """Rows of values (series x days) with non-finite entries replaced by the last finite one"""
+    finite = np.isfinite(values)
+    if finite.all():
+        return values
+    source = np.maximum.accumulate(np.where(finite, np.arange(values.shape[1]), -1), axis=1)
+    return np.where(source >= 0, np.take_along_axis(values, np.maximum(source, 0), axis=1), np.nan)
+
+
+def _sample_moments(samples, mask, compact=True):
+    """
+    Count, mean and sample standard deviation of the masked entries of each row
+
+    Matches the pandas reductions bit for bit: with compact=True (a filtered
+    Series, e.g. dropna() or returns[returns < 0]) partially selected rows
+    are compacted first, as summing with zeros in the gaps would change
+    numpy's pairwise summation order; with compact=False (Series.mean/std
+    skipping NaN) the gaps are zero-filled in place like pandas does.
+    """
+    count = mask.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if compact:
+            mean = samples.sum(axis=1) / count
+            std = np.sqrt(((samples - mean[:, None]) ** 2).sum(axis=1) / (count - 1))
+            for row in np.flatnonzero(count < mask.shape[1]):
+                selected = samples[row, mask[row]]
+                mean[row] = selected.sum() / len(selected)
+                std[row] = np.sqrt(((selected - mean[row]) ** 2).sum() / (len(selected) - 1))
+        else:
+            mean = np.where(mask, samples, 0.0).sum(axis=1) / count
+            squared = np.where(mask, (samples - mean[:, None]) ** 2, 0.0)
+            std = np.sqrt(squared.sum(axis=1) / (count - 1))
+    return count, mean, np.where(count > 1, std, np.nan)
+
+
+def portfolio_stats(values, init_cash, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Summary stats of portfolio values that start from a cash balance
+
+    The first day's return is measured against init_cash, and CAGR is
+    annualized over the number of rows. Sortino divides by the downside
+    deviation (root mean square of the negative returns) rather than their
+    standard deviation.
+
+    Args:
+        values: portfolio values, (days,) or (days x strategies)
+        init_cash: starting cash (scalar or one per strategy)
+        periods_per_year: rows per year used to annualize
+
+    Returns:
+        dict with final_value, total_return, cagr, sharpe_ratio, sortino_ratio,
+        max_drawdown and volatility (floats for 1-D input, arrays for 2-D)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    table = metrics_table(values if values.ndim == 1 else values.T, init_cash, periods_per_year,
+                          returns_from_initial=True, downside='rms')
+    return {key: table[key] for key in ('final_value',) + METRIC_COLUMNS}
+
+
+# ============================================================================
+# STREAMING METRICS (one pass, no value history)
+# ============================================================================
+
+class MetricsAccumulator:
+    """
+    Single-pass version of calculate_metrics' core metrics
+
+    Keeps O(1) state per series: day count, last value, running peak and
+    max drawdown, and Welford mean/variance of the (capped) daily returns and
+    of the negative ones. Values can be fed one day at a time (update) or in
+    blocks (update_block, merged with Chan's parallel update), for one series
+    or many side by side; finalize() returns the same keys as
+    calculate_metrics without rolling windows or bootstrap intervals (those
+    need the full history). Results match calculate_metrics to rounding.
+
+    Non-finite values repeat the last finite one, like calculate_metrics'
+    forward fill.
+
+    Usage:
+        acc = MetricsAccumulator(INITIAL_CASH, num_series=len(strategies))
+        for values in daily_values:
+            acc.update(values)
+        metrics = acc.finalize()
+    """
+
+    # Per-series state arrays, in the order state() returns them
+    STATE_FIELDS = ('days', 'last', 'peak', 'max_drawdown', 'count', 'mean', 'm2',
+                    'down_count', 'down_mean', 'down_m2', 'num_extreme', 'max_return',
+                    'min_return', 'num_invalid')
+
+    def __init__(self, initial_capital, num_series=None, return_cap=0.5,
+                 periods_per_year=TRADING_DAYS_PER_YEAR):
+        """
+        Args:
+            initial_capital: initial investment (scalar or one per series)
+            num_series: number of series updated side by side (None = one
+                        scalar series; finalize then returns floats)
+            return_cap: clip daily returns to +/- this for Sharpe, Sortino and
+                        volatility (None = use raw returns)
+            periods_per_year: rows per year for CAGR and annualization
+        """
+        self.scalar = num_series is None
+        shape = (1 if num_series is None else num_series,)
+        self.initial_capital = np.broadcast_to(
+            np.asarray(initial_capital, dtype=np.float64), shape).copy()
+        self.return_cap = return_cap
+        self.periods_per_year = periods_per_year
+
+        self.days = np.zeros(shape, dtype=np.int64)
+        self.last = np.full(shape, np.nan)
+        self.peak = np.full(shape, -np.inf)
+        self.max_drawdown = np.zeros(shape)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.down_count = np.zeros(shape, dtype=np.int64)
+        self.down_mean = np.zeros(shape)
+        self.down_m2 = np.zeros(shape)
+        self.num_extreme = np.zeros(shape, dtype=np.int64)
+        self.max_return = np.full(shape, -np.inf)
+        self.min_return = np.full(shape, np.inf)
+        self.num_invalid = np.zeros(shape, dtype=np.int64)
+
+    def update(self, value):
+        """Add one day's value (scalar, or one per series)"""
+        self.update_block(np.asarray(value, dtype=np.float64).reshape(1, -1))
+
+    def update_block(self, values):
+        """Add consecutive days at once: (days,) for one series or (days x series)"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        if not len(values):
+            return
+
+        # Forward fill non-finite values from the last finite one (leading gaps stay NaN)
+        finite = np.isfinite(values)
+        self.num_invalid += (~finite).sum(axis=0)
+        if not finite.all():
+            rows = np.arange(1, len(values) + 1)[:, None]
+            source = np.maximum.accumulate(np.where(finite, rows, 0), axis=0)
+            values = np.take_along_axis(np.vstack([self.last[None], values]), source, axis=0)
+        self.days += len(values)
+
+        # Running peak and drawdown
+        peak = np.fmax.accumulate(np.vstack([self.peak[None], values]), axis=0)[1:]
+        with np.errstate(invalid='ignore'):
+            drawdown = np.fmin.reduce((values - peak) / peak, axis=0, initial=0.0)
+        self.max_drawdown = np.minimum(self.max_drawdown, drawdown)
+        self.peak = peak[-1]
+
+        # Daily returns (the first value of a series has none)
+        previous = np.vstack([self.last[None], values[:-1]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = values / previous - 1
+        has_return = ~np.isnan(returns)
+        self.last = values[-1].copy()
+
+        if self.return_cap is not None:
+            extreme = has_return & (np.abs(returns) > self.return_cap)
+            self.num_extreme += extreme.sum(axis=0)
+            self.max_return = np.fmax(self.max_return, np.where(has_return, returns, -np.inf).max(axis=0))
+            self.min_return = np.fmin(self.min_return, np.where(has_return, returns, np.inf).min(axis=0))
+            returns = np.clip(returns, -self.return_cap, self.return_cap)
+
+        self.count, self.mean, self.m2 = _merge_moments(
+            self.count, self.mean, self.m2, returns, has_return)
+        self.down_count, self.down_mean, self.down_m2 = _merge_moments(
+            self.down_count, self.down_mean, self.down_m2, returns, has_return & (returns < 0))
+
+    def state(self):
+        """Per-series state arrays (for checkpoints); restore with from_state()"""
+        return {name: getattr(self, name).copy() for name in self.STATE_FIELDS}
+
+    @classmethod
+    def from_state(cls, state, initial_capital, return_cap=0.5,
+                   periods_per_year=TRADING_DAYS_PER_YEAR, scalar=False):
+        """Rebuild an accumulator from state() output"""
+        num_series = len(state['days'])
+        accumulator = cls(initial_capital, None if scalar else num_series,
+                          return_cap, periods_per_year)
+        for name in cls.STATE_FIELDS:
+            setattr(accumulator, name, np.array(state[name], dtype=getattr(accumulator, name).dtype))
+        return accumulator
+
+    def finalize(self, warn=True):
+        """
+        Metrics for the values seen so far
+
+        Returns:
+            dict with final_value, total_return, cagr, sharpe_ratio,
+            sortino_ratio, max_drawdown and volatility (floats for a scalar
+            series, arrays otherwise); zeros for series with no values
+        """
+        if warn:
+            self._print_warnings()
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total_return = self.last / self.initial_capital - 1
+            years = self.days / self.periods_per_year
+            cagr = (1 + total_return) ** (1 / years) - 1
+            std = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+            down_std = np.where(self.down_count > 1,
+                                np.sqrt(self.down_m2 / (self.down_count - 1)), np.nan)
+            sqrt_periods = np.sqrt(self.periods_per_year)
+            sharpe = np.where(std > 0, (self.mean * self.periods_per_year) / (std * sqrt_periods), 0.0)
+            sortino = np.where(down_std > 0,
+                               (self.mean * self.periods_per_year) / (down_std * sqrt_periods), 0.0)
+
+        metrics = {
+            'final_value': self.last,
+            'total_return': total_return,
+            'cagr': cagr,
+            'sharpe_ratio': sharpe,
+            'sortino_ratio': sortino,
+            'max_drawdown': self.max_drawdown.copy(),
+            'volatility': std * sqrt_periods
+        }
+
+        empty = self.days == 0
+        if empty.any():
+            for key in metrics:
+                metrics[key] = np.where(empty, 0.0, metrics[key])
+        if self.scalar:
+            metrics = {key: float(value[0]) for key, value in metrics.items()}
+        return metrics
+
+    def _print_warnings(self):
+        # Same messages as calculate_metrics (first series only, for one scalar series)
+        if not self.scalar:
+            return
+        if self.num_invalid[0]:
+            print("    ⚠️  WARNING: Portfolio contains NaN or Inf values!")
+        if self.return_cap is not None and self.num_extreme[0]:
+            print(f"    ⚠️  WARNING: {self.num_extreme[0]} extreme daily returns detected (>{self.return_cap:.0%})")
+            print(f"       Max: {self.max_return[0]:.2%}, Min: {self.min_return[0]:.2%}")
+
+
+def _merge_moments(count, mean, m2, samples, mask):
+    """
+    Fold the masked rows of samples (days x series) into running Welford moments
+
+    Chan et al.'s parallel update: the block's own count, mean and sum of
+    squared deviations are combined with the running ones per series.
+    """
+    block_count = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        block_mean = np.where(mask, samples, 0.0).sum(axis=0) / block_count
+        block_m2 = np.where(mask, (samples - block_mean) ** 2, 0.0).sum(axis=0)
+
+    total = count + block_count
+    has_block = block_count > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = block_mean - mean
+        new_mean = mean + delta * block_count / total
+        new_m2 = m2 + block_m2 + delta ** 2 * count * block_count / total
+    return total, np.where(has_block, new_mean, mean), np.where(has_block, new_m2, m2)
+
+
+# ============================================================================
+# SERIES-LEVEL METRICS (portfolio value pandas Series in, dict out)
+# ============================================================================
+
+def calculate_rolling_metrics(portfolio_value_series, windows=None):
+    """
+    Calculate rolling CAGR and max drawdown metrics
+
+    Args:
+        portfolio_value_series: Portfolio value time series
+        windows: dict of label -> window size in days
+                 (default: 3yr only, 756 days = 3 years * 252 trading days)
+
+    Returns:
+        dict with rolling_<label>_cagr and rolling_<label>_max_dd series
+    """
+    import pandas as pd
+
+    windows = {'3yr': ROLLING_WINDOWS['3yr']} if windows is None else windows
+    metrics = rolling_window_metrics(portfolio_value_series.to_numpy(dtype=np.float64), windows)
+
+    rolling = {}
+    for label, window_days in windows.items():
+        index = portfolio_value_series.index[window_days:]
+        rolling[f'rolling_{label}_cagr'] = pd.Series(metrics[f'{label}_cagr'], index=index)
+        rolling[f'rolling_{label}_max_dd'] = pd.Series(metrics[f'{label}_max_dd'], index=index)
+    return rolling
+
+
+def calculate_bootstrap_ci(portfolio_value_series, n_bootstrap=1000, confidence=0.95,
+                           seed=None, method='iid', block_size=20, return_cap=0.5):
+    """
+    Calculate bootstrapped confidence intervals for CAGR and Sharpe
+
+    Args:
+        portfolio_value_series: Portfolio value time series
+        n_bootstrap: Number of bootstrap iterations
+        confidence: Confidence level (default 0.95 for 95% CI)
+        seed, method, block_size: see bootstrap_confidence_intervals
+        return_cap: clip daily returns to +/- this before resampling (None = no cap)
+
+    Returns:
+        dict with CI bounds for CAGR and Sharpe
+    """
+    returns = portfolio_value_series.pct_change().dropna()
+    if return_cap is not None:
+        returns = returns.clip(-return_cap, return_cap)  # Cap extreme returns
+
+    return bootstrap_confidence_intervals(returns.to_numpy(dtype=np.float64), n_bootstrap=n_bootstrap,
+                                          confidence=confidence, seed=seed,
+                                          method=method, block_size=block_size)
+
+
+def calculate_batch_metrics(portfolio_values, initial_capital, rolling_windows=None,
+                            n_bootstrap=0, bootstrap_seed=None, bootstrap_method='iid',
+                            bootstrap_block_size=20, return_cap=0.5):
+    """
+    calculate_metrics for every strategy of a run in one vectorized pass
+
+    The value series are stacked into one (strategies x days) array and
+    returns, capped stats, drawdowns, rolling windows and bootstrap
+    resamples are all computed along its day axis. Each row equals what
+    calculate_metrics returns for that strategy alone (bootstrap resamples
+    use the same seeded draws for every strategy, as separate calls with
+    one seed would).
+
+    Args:
+        portfolio_values: DataFrame of portfolio values, one column per
+                          strategy (days x strategies)
+        initial_capital: initial investment (scalar or one per strategy)
+        rolling_windows, n_bootstrap, bootstrap_seed, bootstrap_method,
+        bootstrap_block_size, return_cap: see calculate_metrics
+
+    Returns:
+        DataFrame with one row per strategy and calculate_metrics' columns
+    """
+    import pandas as pd
+
+    names = list(portfolio_values.columns)
+    values = np.ascontiguousarray(portfolio_values.to_numpy(dtype=np.float64).T)
+    table = metrics_table(values, initial_capital, return_cap=return_cap)
+
+    for row, name in enumerate(names):
+        prefix = f"{name}: " if len(names) > 1 else ""
+        if table['num_invalid'][row]:
+            print(f"    ⚠️  WARNING: {prefix}Portfolio contains NaN or Inf values!")
+        if table['num_extreme'][row]:
+            print(f"    ⚠️  WARNING: {prefix}{table['num_extreme'][row]} extreme daily returns detected (>{return_cap:.0%})")
+            print(f"       Max: {table['max_return'][row]:.2%}, Min: {table['min_return'][row]:.2%}")
+
+    metrics = {key: table[key] for key in METRIC_COLUMNS}
+    if rolling_windows or n_bootstrap:
+        values = _forward_fill(values)
+
+    # Rolling CAGR / max drawdown summaries (windows are reduced per strategy row)
+    if rolling_windows:
+        rolling_metrics = rolling_window_metrics(values.T, rolling_windows)
+        for label in rolling_windows:
+            rolling_cagr = np.ascontiguousarray(rolling_metrics[f'{label}_cagr'].T)
+            rolling_max_dd = np.ascontiguousarray(rolling_metrics[f'{label}_max_dd'].T)
+            _, cagr_mean, cagr_std = _sample_moments(rolling_cagr, ~np.isnan(rolling_cagr), compact=False)
+            has_dd = ~np.isnan(rolling_max_dd)
+            _, max_dd_mean, _ = _sample_moments(rolling_max_dd, has_dd, compact=False)
+            max_dd_worst = np.where(has_dd, rolling_max_dd, np.inf).min(axis=1, initial=np.inf)
+            metrics[f'rolling_{label}_cagr_mean'] = cagr_mean
+            metrics[f'rolling_{label}_cagr_std'] = cagr_std
+            metrics[f'rolling_{label}_max_dd_mean'] = max_dd_mean
+            metrics[f'rolling_{label}_max_dd_worst'] = np.where(np.isinf(max_dd_worst), np.nan, max_dd_worst)
+
+    # Bootstrap confidence intervals
+    if n_bootstrap:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = values[:, 1:] / values[:, :-1] - 1
+        if return_cap is not None:
+            returns = np.clip(returns, -return_cap, return_cap)  # Cap extreme returns
+        has_return = ~np.isnan(returns)
+
+        intervals = {}
+        complete = has_return.all(axis=1)
+        options = dict(n_bootstrap=n_bootstrap, seed=bootstrap_seed, method=bootstrap_method,
+                       block_size=bootstrap_block_size)
+        if complete.any():
+            for key, value in bootstrap_confidence_intervals(returns[complete], **options).items():
+                intervals.setdefault(key, np.full(len(names), np.nan))[complete] = value
+        # Series with leading gaps have fewer returns; resample those on their own
+        for row in np.flatnonzero(~complete):
+            for key, value in bootstrap_confidence_intervals(returns[row, has_return[row]], **options).items():
+                intervals.setdefault(key, np.full(len(names), np.nan))[row] = value
+        metrics.update(intervals)
+
+    return pd.DataFrame(metrics, index=pd.Index(names))
+
+
+def calculate_metrics(portfolio_value_series, initial_capital, rolling_windows=None,
+                      n_bootstrap=0, bootstrap_seed=None, bootstrap_method='iid',
+                      bootstrap_block_size=20, return_cap=0.5):
+    """
+    Calculate all performance metrics from portfolio value series
+
+    Args:
+        portfolio_value_series: Portfolio value time series
+        initial_capital: Initial investment
+        rolling_windows: dict of label -> window days for rolling CAGR/max drawdown
+                         summaries (None or {} = skip)
+        n_bootstrap: bootstrap iterations for CAGR/Sharpe CIs (0 = skip)
+        bootstrap_seed, bootstrap_method, bootstrap_block_size: see
+            bootstrap_confidence_intervals
+        return_cap: clip daily returns to +/- this for Sharpe, Sortino and
+                    volatility (None = use raw returns)
+
+    Returns:
+        dict with total_return, cagr, sharpe_ratio, sortino_ratio, max_drawdown,
+        volatility, plus rolling_* and *_ci_* entries when requested
+    """
+    # Validate input
+    if len(portfolio_value_series) == 0:
+        return {'total_return': 0, 'cagr': 0, 'sharpe_ratio': 0, 'sortino_ratio': 0, 'max_drawdown': 0, 'volatility': 0}
+
+    metrics = calculate_batch_metrics(portfolio_value_series.to_frame(), initial_capital, rolling_windows,
+                                      n_bootstrap, bootstrap_seed, bootstrap_method,
+                                      bootstrap_block_size, return_cap)
+    return metrics.iloc[0].to_dict()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Process-pool runner for independent backtest jobs
+
+Workers are forked from the parent, so price and indicator matrices already
+loaded by the calling script are shared copy-on-write instead of being
+pickled per task. Only the job tuples and the returned results cross the
+process boundary. run_parallel() returns results in job order;
+iter_parallel() yields them as they finish.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def default_workers():
+    """Number of worker processes to use when none is configured"""
+    return os.cpu_count() or 1
+
+
+def can_fork():
+    """True if this platform supports the fork start method"""
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def run_parallel(func, jobs, max_workers=None, initializer=None):
+    """
+    Run func(job) for every job in a forked process pool
+
+    Args:
+        func: callable taking a single job; must be defined at module level
+        jobs: list of job arguments (kept small - they are pickled)
+        max_workers: number of processes (default: all cores); 1 runs serially
+        initializer: optional callable run once in each worker at startup
+
+    Returns:
+        list of results, in the same order as jobs
+    """
+    jobs = list(jobs)
+    results = [None] * len(jobs)
+    for index, result in iter_parallel(func, jobs, max_workers, initializer):
+        results[index] = result
+    return results
+
+
+def iter_parallel(func, jobs, max_workers=None, initializer=None):
+    """
+    run_parallel() as a generator that streams results as jobs finish
+
+    Yields:
+        (job index, result) in completion order, so a slow job does not hold
+        back the ones behind it; sort by index where job order matters
+    """
+    jobs = list(jobs)
+    if max_workers is None:
+        max_workers = default_workers()
+    max_workers = min(max_workers, len(jobs))
+
+    # Without fork the workers would have to re-import the calling script and
+    # receive the data by pickling, so fall back to running in-process
+    if max_workers <= 1 or not can_fork():
+        for index, job in enumerate(jobs):
+            yield index, func(job)
+        return
+
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=initializer) as executor:
+        futures = {executor.submit(func, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
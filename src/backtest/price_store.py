@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+"""
+Columnar Price Store
+
+Ingests Yahoo Finance CSVs (data/*.csv) once into memory-mappable .npy arrays
+so backtests can load an aligned price matrix without re-parsing CSVs or
+timezone-aware date strings.
+
+Layout of a store directory:
+    manifest.json   ticker dictionary (ticker -> row), source file stamps, content hash
+    dates.npy       datetime64[ns] (days,) - union of all tickers' dates, sorted
+    close.npy       float64 (tickers x days) - one contiguous row per ticker, NaN if absent
+    present.npy     bool (tickers x days) - True where the ticker's CSV has that date
+
+Usage:
+    store = open_price_store('data')          # builds or refreshes data/price_store/
+    price_df = store.load(['SPY', 'QQQ'], '2015-01-01', '2024-11-05')
+
+    python src/backtest/price_store.py data   # (re)build explicitly
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+STORE_VERSION = 1
+STORE_SUBDIR = 'price_store'
+
+
+def read_yahoo_close(csv_file):
+    """Parse one Yahoo Finance CSV into a Close series on timezone-naive (UTC) dates"""
+    df = pd.read_csv(csv_file)
+    if 'Close' not in df.columns:
+        raise ValueError(f"no 'Close' column in {csv_file}")
+
+    # Parse date column with UTC and immediately convert to timezone-naive
+    dates = pd.to_datetime(df['Date'], utc=True).dt.tz_localize(None)
+    return pd.Series(df['Close'].to_numpy(dtype=np.float64), index=pd.DatetimeIndex(dates), name='Close')
+
+
+def _source_stamps(csv_dir):
+    """{ticker: {'file', 'size', 'mtime_ns'}} for every CSV in csv_dir"""
+    stamps = {}
+    with os.scandir(csv_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith('.csv'):
+                stat = entry.stat()
+                stamps[entry.name[:-4]] = {
+                    'file': entry.name,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns
+                }
+    return dict(sorted(stamps.items()))
+
+
+def _content_hash(tickers, dates, close, present):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(tickers).encode())
+    for array in (dates, close, present):
+        digest.update(np.ascontiguousarray(array).view(np.uint8).data)
+    return digest.hexdigest()
+
+
+def _save_array(path, array):
+    """Write an .npy file atomically (readers never see a half-written array)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _to_ns(value):
+    return np.datetime64(pd.Timestamp(value).to_datetime64(), 'ns')
+
+
+class PriceStore:
+    """Read access to a columnar price store directory"""
+
+    def __init__(self, store_dir):
+        self.store_dir = str(store_dir)
+        with open(os.path.join(self.store_dir, 'manifest.json'), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported price store version in {self.store_dir}")
+
+        self.tickers = self.manifest['tickers']
+        self.ticker_index = {ticker: row for row, ticker in enumerate(self.tickers)}
+        self.content_hash = self.manifest['content_hash']
+        self._dates = None
+        self._close = None
+        self._present = None
+
+    # Arrays are memory-mapped on first use, so opening a store is cheap
+    @property
+    def dates(self):
+        if self._dates is None:
+            self._dates = np.load(os.path.join(self.store_dir, 'dates.npy'), mmap_mode='r')
+        return self._dates
+
+    @property
+    def close(self):
+        if self._close is None:
+            self._close = np.load(os.path.join(self.store_dir, 'close.npy'), mmap_mode='r')
+        return self._close
+
+    @property
+    def present(self):
+        if self._present is None:
+            self._present = np.load(os.path.join(self.store_dir, 'present.npy'), mmap_mode='r')
+        return self._present
+
+    def load_matrix(self, tickers, start=None, end=None):
+        """
+        Load an aligned (days x tickers) close matrix
+
+        Matches the CSV loaders: each ticker is cut to start <= date <= end, the
+        dates of all requested tickers are unioned, gaps are forward-filled and
+        any remaining incomplete rows are dropped. Unknown tickers, and tickers
+        with no data in the range, are skipped.
+
+        Returns:
+            (dates as datetime64[ns] ndarray, list of tickers found, float64 matrix)
+        """
+        found = [t for t in tickers if t in self.ticker_index]
+        rows = [self.ticker_index[t] for t in found]
+
+        dates = self.dates
+        lo = 0 if start is None else np.searchsorted(dates, _to_ns(start), side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, _to_ns(end), side='right')
+
+        if not rows or hi <= lo:
+            return np.array([], dtype='datetime64[ns]'), found, np.empty((0, len(found)))
+
+        # Tickers without any data in the date range are skipped
+        present = self.present[rows, lo:hi].T
+        has_data = present.any(axis=0)
+        found = [t for t, ok in zip(found, has_data) if ok]
+        rows = [r for r, ok in zip(rows, has_data) if ok]
+        if not rows:
+            return np.array([], dtype='datetime64[ns]'), found, np.empty((0, 0))
+
+        close = self.close[rows, lo:hi].T
+        present = present[:, has_data]
+
+        # Outer join: keep dates at least one requested ticker has
+        keep = present.any(axis=1)
+        dates = np.asarray(dates[lo:hi])[keep]
+        close = np.where(present[keep], close[keep], np.nan)
+
+        # Forward fill missing data (holidays), then drop rows still missing
+        num_days = len(dates)
+        last_valid = np.where(~np.isnan(close), np.arange(num_days)[:, None], 0)
+        np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+        close = np.take_along_axis(close, last_valid, axis=0)
+        complete = ~np.isnan(close).any(axis=1)
+
+        return dates[complete], found, np.ascontiguousarray(close[complete])
+
+    def load(self, tickers, start=None, end=None):
+        """Load an aligned close-price DataFrame (index 'Date', one column per ticker found)"""
+        dates, found, close = self.load_matrix(tickers, start, end)
+        index = pd.DatetimeIndex(dates, name='Date')
+        return pd.DataFrame(close, index=index, columns=found)
+
+    def load_unaligned(self, tickers, start=None, end=None):
+        """
+        Close prices on the union of the tickers' dates, NaN where a ticker has no
+        row (no forward fill, no rows dropped); tickers without data are skipped
+        """
+        found = [t for t in tickers if t in self.ticker_index]
+        rows = [self.ticker_index[t] for t in found]
+        dates = self.dates
+        lo = 0 if start is None else np.searchsorted(dates, _to_ns(start), side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, _to_ns(end), side='right')
+
+        present = np.asarray(self.present[rows, lo:hi]).T
+        has_data = present.any(axis=0) if len(rows) else np.zeros(0, dtype=bool)
+        present = present[:, has_data]
+        close = np.asarray(self.close[rows, lo:hi]).T[:, has_data]
+
+        keep = present.any(axis=1)
+        index = pd.DatetimeIndex(np.asarray(dates[lo:hi])[keep], name='Date')
+        return pd.DataFrame(np.where(present[keep], close[keep], np.nan), index=index,
+                            columns=[t for t, ok in zip(found, has_data) if ok])
+
+    @classmethod
+    def write(cls, store_dir, series_by_ticker, sources=None, merge=True, replace=()):
+        """
+        Write close-price series into a store, merging with what is already there
+
+        Args:
+            store_dir: store directory (created if needed)
+            series_by_ticker: dict of ticker -> Close series on a DatetimeIndex
+            sources: optional source stamps to record in the manifest
+            merge: keep tickers/dates already in the store (new data wins on overlap)
+            replace: tickers whose stored rows are dropped instead of merged
+                     (e.g. a history re-fetched on a new adjustment basis)
+
+        Returns:
+            PriceStore for the written directory
+        """
+        store_dir = str(store_dir)
+        os.makedirs(store_dir, exist_ok=True)
+
+        series_by_ticker = dict(series_by_ticker)
+        old_sources = {}
+        if merge and os.path.exists(os.path.join(store_dir, 'manifest.json')):
+            existing = cls(store_dir)
+            old_sources = existing.manifest.get('sources', {})
+            old_dates = pd.DatetimeIndex(np.asarray(existing.dates))
+            for row, ticker in enumerate(existing.tickers):
+                mask = np.asarray(existing.present[row])
+                old = pd.Series(np.asarray(existing.close[row])[mask], index=old_dates[mask])
+                new = series_by_ticker.get(ticker)
+                if new is not None and ticker in replace:
+                    continue
+                if new is not None:
+                    old = old[~old.index.isin(new.index)]
+                    new = pd.concat([old, new]).sort_index()
+                    series_by_ticker[ticker] = new
+                else:
+                    series_by_ticker[ticker] = old
+
+        tickers = sorted(series_by_ticker)
+        all_dates = pd.DatetimeIndex([])
+        for series in series_by_ticker.values():
+            all_dates = all_dates.union(pd.DatetimeIndex(series.index))
+        dates = np.asarray(all_dates, dtype='datetime64[ns]')
+
+        close = np.full((len(tickers), len(dates)), np.nan)
+        present = np.zeros((len(tickers), len(dates)), dtype=bool)
+        for row, ticker in enumerate(tickers):
+            series = series_by_ticker[ticker]
+            series = series[~series.index.duplicated(keep='last')]
+            positions = np.searchsorted(dates, np.asarray(series.index, dtype='datetime64[ns]'))
+            close[row, positions] = series.to_numpy(dtype=np.float64)
+            present[row, positions] = True
+
+        _save_array(os.path.join(store_dir, 'dates.npy'), dates)
+        _save_array(os.path.join(store_dir, 'close.npy'), close)
+        _save_array(os.path.join(store_dir, 'present.npy'), present)
+
+        manifest = {
+            'version': STORE_VERSION,
+            'tickers': tickers,
+            'num_days': int(len(dates)),
+            'sources': {**old_sources, **(sources or {})},
+            'content_hash': _content_hash(tickers, dates, close, present)
+        }
+        tmp_path = os.path.join(store_dir, 'manifest.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(store_dir, 'manifest.json'))
+
+        return cls(store_dir)
+
+    @classmethod
+    def build(cls, csv_dir, store_dir=None):
+        """Ingest every Yahoo CSV in csv_dir into a fresh store (default: csv_dir/price_store)"""
+        store_dir = store_dir or os.path.join(csv_dir, STORE_SUBDIR)
+        sources = _source_stamps(csv_dir)
+
+        series_by_ticker = {}
+        for ticker, stamp in sources.items():
+            try:
+                series_by_ticker[ticker] = read_yahoo_close(os.path.join(csv_dir, stamp['file']))
+            except Exception as e:
+                print(f"  ⚠️  Skipping {stamp['file']}: {str(e)[:50]}")
+
+        sources = {t: s for t, s in sources.items() if t in series_by_ticker}
+        return cls.write(store_dir, series_by_ticker, sources=sources, merge=False)
+
+
+def open_price_store(csv_dir, store_dir=None):
+    """
+    Open the store for a CSV directory, (re)building it if any CSV was added,
+    removed or modified since the last build
+    """
+    store_dir = store_dir or os.path.join(csv_dir, STORE_SUBDIR)
+    if os.path.exists(os.path.join(store_dir, 'manifest.json')):
+        store = PriceStore(store_dir)
+        if store.manifest.get('sources') == _source_stamps(csv_dir):
+            return store
+
+    print(f"  Building price store: {csv_dir}/*.csv → {store_dir}/")
+    return PriceStore.build(csv_dir, store_dir)
+
+
+def main():
+    csv_dir = sys.argv[1] if len(sys.argv) > 1 else 'data'
+    store = PriceStore.build(csv_dir)
+    print(f"✓ {len(store.tickers)} tickers, {store.manifest['num_days']} days → {store.store_dir}/")
+    print(f"  Content hash: {store.content_hash[:16]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""
+Stage timers and counters for backtest runs
+
+Off by default. Turned on by a script's --profile flag or the
+BACKTEST_PROFILE environment variable:
+
+    BACKTEST_PROFILE=1          stage timers and counters
+    BACKTEST_PROFILE=cprofile   also a cProfile capture per strategy (.prof files)
+
+Code marks its stages with
+
+    with profiling.stage('metrics'):
+        ...
+    profiling.count('trims', len(trimmed))
+
+and the script prints a summary table and writes JSON at the end
+(report()). Stages nest ('trim_loop/reinvest'), and time is also broken
+down per strategy() block. While profiling is off, stage() hands back one
+shared no-op context manager and count() returns immediately.
+
+Jobs run through parallel.run_parallel record in the worker processes;
+wrap the job function with collect() and pass the results through merge()
+to bring those records back into the parent's report.
+"""
+
+import cProfile
+import json
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = 'BACKTEST_PROFILE'
+MODES = ('timing', 'cprofile')
+
+_NULL = nullcontext()
+
+_settings = {'mode': None, 'start': None}
+_stack = []
+_current = {'strategy': None}
+_records = {'stages': {}, 'counters': {}, 'strategies': {}, 'profiles': []}
+
+
+def _mode_from_env():
+    value = os.environ.get(ENV_VAR, '').strip().lower()
+    if value in ('', '0', 'false', 'off', 'no'):
+        return None
+    return 'cprofile' if value == 'cprofile' else 'timing'
+
+
+def enabled():
+    """True while profiling is on"""
+    return _settings['mode'] is not None
+
+
+def enable(mode='timing'):
+    """Turn profiling on ('timing' or 'cprofile') and clear earlier records"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode: {mode} (choose from {', '.join(MODES)})")
+    _settings.update(mode=mode, start=time.perf_counter())
+    reset()
+
+
+def disable():
+    _settings.update(mode=None, start=None)
+
+
+def reset():
+    _stack.clear()
+    _current['strategy'] = None
+    _records.update(stages={}, counters={}, strategies={}, profiles=[])
+
+
+def add_profile_argument(parser):
+    """Add --profile [timing|cprofile] to a script's argparse parser"""
+    parser.add_argument('--profile', nargs='?', const='timing', default=None, choices=MODES,
+                        help=f'time each stage and print a report (default: ${ENV_VAR})')
+
+
+def configure(mode=None):
+    """Enable profiling from a --profile value, else from $BACKTEST_PROFILE; returns enabled()"""
+    mode = mode or _mode_from_env()
+    if mode is not None:
+        enable(mode)
+    return enabled()
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _stack.append(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        key = '/'.join(_stack)
+        _stack.pop()
+        _add_stage(_records['stages'], key, 1, elapsed, elapsed)
+        if _current['strategy'] is not None:
+            by_stage = _records['strategies'].setdefault(_current['strategy'], {})
+            by_stage[key] = by_stage.get(key, 0.0) + elapsed
+        return False
+
+
+def _add_stage(stages, key, calls, seconds, max_seconds):
+    entry = stages.get(key)
+    if entry is None:
+        stages[key] = {'calls': calls, 'seconds': seconds, 'max_seconds': max_seconds}
+    else:
+        entry['calls'] += calls
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], max_seconds)
+
+
+def stage(name):
+    """Context manager timing one stage (a shared no-op while profiling is off)"""
+    if _settings['mode'] is None:
+        return _NULL
+    return _Stage(name)
+
+
+def count(name, n=1):
+    """Add n to a counter"""
+    if _settings['mode'] is None:
+        return
+    counters = _records['counters']
+    counters[name] = counters.get(name, 0) + n
+
+
+@contextmanager
+def strategy(name, output_dir=None):
+    """
+    Attribute the stages inside the block to one strategy
+
+    In 'cprofile' mode the block also runs under cProfile; the stats are
+    written to <output_dir>/<name>.prof (output_dir defaults to 'profiles').
+    """
+    if _settings['mode'] is None:
+        yield
+        return
+
+    previous = _current['strategy']
+    _current['strategy'] = name
+    profiler = cProfile.Profile() if _settings['mode'] == 'cprofile' else None
+    try:
+        with _Stage('strategy'):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        _current['strategy'] = previous
+
+    if profiler is not None:
+        output_dir = output_dir or 'profiles'
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, re.sub(r'[^A-Za-z0-9_.+-]+', '_', name).strip('_') + '.prof')
+        profiler.dump_stats(path)
+        _records['profiles'].append(path)
+
+
+# ============================================================================
+# PROCESS POOLS
+# ============================================================================
+
+class _Collected:
+    """Job wrapper returning (result, records made while running it)"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, job):
+        saved = {key: value for key, value in _records.items()}
+        reset()
+        try:
+            result = self.func(job)
+            return result, {key: value for key, value in _records.items()}
+        finally:
+            _records.update(saved)
+
+
+def collect(func):
+    """Wrap a run_parallel job function so its records come back with its result"""
+    return _Collected(func) if enabled() else func
+
+
+def merge(results):
+    """Fold the records returned by collect()-wrapped jobs into this process; returns the bare results"""
+    if not enabled():
+        return results
+
+    bare = []
+    for result, records in results:
+        for key, entry in records['stages'].items():
+            _add_stage(_records['stages'], key, entry['calls'], entry['seconds'], entry['max_seconds'])
+        for key, n in records['counters'].items():
+            _records['counters'][key] = _records['counters'].get(key, 0) + n
+        for name, by_stage in records['strategies'].items():
+            target = _records['strategies'].setdefault(name, {})
+            for key, seconds in by_stage.items():
+                target[key] = target.get(key, 0.0) + seconds
+        _records['profiles'].extend(records['profiles'])
+        bare.append(result)
+    return bare
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def summary():
+    """Records so far as a JSON-ready dict"""
+    wall = time.perf_counter() - _settings['start'] if _settings['start'] is not None else 0.0
+    stages = {}
+    for key, entry in sorted(_records['stages'].items()):
+        stages[key] = dict(entry, mean_seconds=entry['seconds'] / entry['calls'])
+    return {
+        'mode': _settings['mode'],
+        'wall_seconds': wall,
+        'stages': stages,
+        'counters': dict(sorted(_records['counters'].items())),
+        'strategies': _records['strategies'],
+        'profiles': list(_records['profiles']),
+    }
+
+
+def report(path=None, top=5):
+    """
+    Print the timing table and (optionally) write it as JSON
+
+    Args:
+        path: JSON file to write (None = print only)
+        top: number of slowest strategies to list
+
+    Returns:
+        the summary() dict, or None while profiling is off
+    """
+    if not enabled():
+        return None
+
+    data = summary()
+    wall = data['wall_seconds']
+
+    print("\n" + "="*80)
+    print("PROFILE")
+    print("="*80)
+    print(f"\n  {'stage':<36} {'calls':>7} {'total (s)':>10} {'mean (ms)':>10} {'% wall':>7}")
+    for key, entry in data['stages'].items():
+        depth = key.count('/')
+        label = '  ' * depth + key.rsplit('/', 1)[-1]
+        share = entry['seconds'] / wall if wall > 0 else 0.0
+        print(f"  {label:<36} {entry['calls']:>7,} {entry['seconds']:>10.3f} "
+              f"{entry['mean_seconds'] * 1000:>10.3f} {share:>7.1%}")
+    print(f"\n  Wall time: {wall:.3f}s (stages in worker processes can add up to more)")
+
+    if data['counters']:
+        print(f"\n  Counters:")
+        for name, n in data['counters'].items():
+            print(f"    {name}: {n:,}")
+
+    if data['strategies']:
+        slowest = sorted(data['strategies'].items(), key=lambda item: -item[1].get('strategy', 0.0))[:top]
+        print(f"\n  Slowest strategies:")
+        for name, by_stage in slowest:
+            parts = ', '.join(f"{key.split('/', 1)[-1]} {seconds * 1000:.1f} ms"
+                              for key, seconds in sorted(by_stage.items()) if key != 'strategy')
+            print(f"    {name}: {by_stage.get('strategy', 0.0) * 1000:.1f} ms ({parts})")
+
+    if data['profiles']:
+        print(f"\n  cProfile stats: {len(data['profiles'])} file(s) in "
+              f"{os.path.dirname(data['profiles'][0]) or '.'}/ (python -m pstats <file>)")
+
+    if path is not None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"\n✓ Profile saved to: {path}")
+    return data
@@ -0,0 +1,496 @@
+#!/usr/bin/env python
+"""
+Columnar Results Store
+
+All strategies of a run in one directory of compressed column arrays,
+instead of five text files per strategy that the validators re-parse:
+
+    <results_dir>/results_store/
+        manifest.json           run info, metrics file, and per strategy: partition
+                                file, price file, tickers, trade columns, metadata
+        runs/<run_id>/metrics.npz
+                                one array per metric, one entry per strategy (manifest order)
+        runs/<run_id>/strategies/<name>.npz
+                                one partition per strategy: dates, holdings, cash,
+                                total_value and trade columns
+        prices/<digest>.npz     close prices the holdings were valued at, stored
+                                once per distinct price panel
+
+Every array is its own member of a compressed .npz, and np.load only
+decompresses the members that are read, so loading one strategy's value
+series or one metric across all strategies decodes nothing else.
+
+A store holds one run: the manifest lists exactly the strategies the last
+writer added, with that writer's run info. A run writes its partitions and
+metrics under its own runs/<run_id>/ directory and publishes them by
+atomically replacing the manifest, so readers see either the previous run or
+the new one, never a mix. After publishing, the files only the previous
+manifest referenced (its run directory, price panels no longer used) are
+removed. Scripts sharing a results directory (run_backtest.py and
+run_backtest_with_dip.py both use results/) therefore replace each other's
+store; the CSV layout is per strategy file as before.
+
+Weights, position values and exposure are not stored: they are holdings x
+prices, computed on first access and cached by the ResultsStore.
+
+The CSV layout (backtest/io.py) stays available: write both from a script
+or export later with ResultsStore.export_csv().
+
+Usage:
+    with ResultsWriter('results', run_info={'script': 'run_backtest.py'}) as writer:
+        writer.add(name, portfolio_value_df, metrics, trades, metadata, prices=price_data)
+
+    store = ResultsStore('results')
+    store.value_series('trim_50pct_spy')       # Total_Value only
+    store.metric('cagr')                       # one metric for every strategy
+    store.weights('trim_50pct_spy')            # derived from holdings and prices
+"""
+
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+STORE_VERSION = 1
+STORE_SUBDIR = 'results_store'
+
+
+def store_path(results_dir):
+    """Store directory for a results directory (a store directory is returned as is)"""
+    results_dir = str(results_dir)
+    if os.path.exists(os.path.join(results_dir, 'manifest.json')):
+        return results_dir
+    return os.path.join(results_dir, STORE_SUBDIR)
+
+
+def has_results_store(results_dir):
+    return os.path.exists(os.path.join(store_path(results_dir), 'manifest.json'))
+
+
+def _partition_file(run_id, name):
+    return os.path.join('runs', run_id, 'strategies', re.sub(r'[^A-Za-z0-9_.+-]+', '_', name) + '.npz')
+
+
+def _metrics_file(manifest):
+    return manifest.get('metrics_file', 'metrics.npz')  # stores written before runs/ kept it at the top
+
+
+def _referenced_files(manifest):
+    """Store-relative paths of every file a manifest points at"""
+    files = {_metrics_file(manifest)}
+    for entry in manifest['strategies'].values():
+        files.add(entry['file'])
+        if 'prices' in entry:
+            files.add(entry['prices'])
+    return files
+
+
+def _to_ns(index):
+    return np.asarray(index, dtype='datetime64[ns]').view(np.int64)
+
+
+def _encode_columns(prefix, frame, arrays):
+    """Store each DataFrame column as its own array; returns the column schema"""
+    from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+    schema = []
+    for column in frame.columns:
+        values = frame[column]
+        key = f"{prefix}{len(schema)}"
+        if is_datetime64_any_dtype(values.dtype):
+            arrays[key] = _to_ns(values)
+            schema.append([str(column), 'datetime'])
+        elif (is_numeric_dtype(values.dtype) or is_bool_dtype(values.dtype)) and values.dtype.kind in 'biuf':
+            arrays[key] = values.to_numpy()
+            schema.append([str(column), values.dtype.str])
+        else:
+            categories, codes = np.unique(values.astype(str).to_numpy(), return_inverse=True)
+            arrays[key] = codes.astype(np.int32)
+            schema.append([str(column), 'category', categories.tolist()])
+    return schema
+
+
+def _decode_column(archive, key, spec):
+    import pandas as pd
+
+    values = archive[key]
+    if spec[1] == 'datetime':
+        return pd.DatetimeIndex(values.view('datetime64[ns]'))
+    if spec[1] == 'category':
+        return np.asarray(spec[2], dtype=object)[values]
+    return values
+
+
+def _save_npz(path, arrays):
+    """Write a compressed .npz atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def write_partition(store_dir, run_id, name, portfolio_value_df, trades, metadata, prices_file=None):
+    """
+    Write one strategy's partition file; returns its manifest entry
+
+    Safe to call from worker processes: nothing shared is touched until the
+    parent passes the entry to ResultsWriter.register().
+
+    Args:
+        store_dir, run_id: ResultsWriter.store_dir and ResultsWriter.run_id
+        name, portfolio_value_df, trades, metadata: see ResultsWriter.add
+        prices_file: path returned by ResultsWriter.add_prices (None = no prices)
+    """
+    import pandas as pd
+
+    tickers = [c for c in portfolio_value_df.columns if c not in ('Cash', 'Total_Value')]
+    arrays = {
+        'dates': _to_ns(portfolio_value_df.index),
+        'holdings': np.ascontiguousarray(portfolio_value_df[tickers].to_numpy(dtype=np.float64)),
+        # Cash keeps its dtype (the dip-buy scripts start it as an int column)
+        'cash': portfolio_value_df['Cash'].to_numpy(),
+        'total_value': portfolio_value_df['Total_Value'].to_numpy(dtype=np.float64),
+    }
+    entry = {
+        'file': _partition_file(run_id, name),
+        'rows': len(portfolio_value_df),
+        'index_name': portfolio_value_df.index.name,
+        'tickers': [str(t) for t in tickers],
+    }
+    if prices_file is not None:
+        entry['prices'] = prices_file
+
+    trades_df = trades if isinstance(trades, pd.DataFrame) else pd.DataFrame(trades)
+    entry['num_trades'] = len(trades_df)
+    entry['trade_columns'] = _encode_columns('trade_', trades_df, arrays)
+
+    # Round-trip through JSON now so a bad metadata value fails before anything is written
+    entry['metadata'] = json.loads(json.dumps(metadata, default=str))
+
+    _save_npz(os.path.join(store_dir, entry['file']), arrays)
+    return entry
+
+
+class ResultsWriter:
+    """Writes one run into a results store; close() publishes it in place of the previous run"""
+
+    def __init__(self, results_dir, run_info=None):
+        self.store_dir = store_path(results_dir)
+        self.run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.run_info = dict(run_info or {})
+        self.strategies = {}
+        self.metrics = {}
+        self._price_files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def add_prices(self, prices):
+        """Write a price panel once (named by its content); returns its path in the store"""
+        cached = self._price_files.get(id(prices))
+        if cached is not None and cached[0] is prices:
+            return cached[1]
+
+        arrays = {
+            'dates': _to_ns(prices.index),
+            'close': np.ascontiguousarray(prices.to_numpy(dtype=np.float64)),
+        }
+        columns = [str(c) for c in prices.columns]
+        digest = hashlib.sha1(arrays['dates'].tobytes())
+        digest.update(json.dumps(columns).encode())
+        digest.update(arrays['close'].tobytes())
+        path = os.path.join('prices', digest.hexdigest()[:16] + '.npz')
+
+        if not os.path.exists(os.path.join(self.store_dir, path)):
+            arrays['tickers'] = np.array(columns)
+            _save_npz(os.path.join(self.store_dir, path), arrays)
+        self._price_files[id(prices)] = (prices, path)
+        return path
+
+    def add(self, name, portfolio_value_df, metrics, trades, metadata, prices=None):
+        """
+        Write one strategy's partition (same arguments as io.save_strategy_files)
+
+        Args:
+            name: strategy key, e.g. 'trim_50pct_pro_rata'
+            portfolio_value_df: DataFrame with ticker holdings, Cash and Total_Value
+            metrics: dict of metrics
+            trades: DataFrame or list of trade dicts
+            metadata: JSON-serializable dict (dates and other objects via str())
+            prices: DataFrame of close prices (dates x tickers) the holdings are
+                valued at; weights and position values are derived from it on read
+        """
+        prices_file = self.add_prices(prices) if prices is not None else None
+        entry = write_partition(self.store_dir, self.run_id, name, portfolio_value_df, trades, metadata,
+                                prices_file)
+        self.register(name, entry, metrics)
+
+    def register(self, name, entry, metrics):
+        """Record a partition written by write_partition() (e.g. in a worker process)"""
+        entry = dict(entry)
+        entry['metric_names'] = list(metrics)
+        entry['int_metrics'] = [column for column, value in metrics.items()
+                                if isinstance(value, (int, np.integer)) and not isinstance(value, bool)]
+        self.strategies[name] = entry
+        self.metrics[name] = dict(metrics)
+
+    def close(self):
+        """Write the run's metrics and publish it by replacing the manifest (the commit point)"""
+        names = list(self.strategies)
+        columns = list(dict.fromkeys(c for name in names for c in self.metrics[name]))
+
+        arrays, kinds = {}, {}
+        for k, column in enumerate(columns):
+            values = [self.metrics[name].get(column) for name in names]
+            present = [v for v in values if v is not None]
+            is_int = all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in present)
+            if is_int and len(present) == len(values):
+                arrays[f"m{k}"] = np.array(values, dtype=np.int64)
+            else:
+                arrays[f"m{k}"] = np.array([np.nan if v is None else float(v) for v in values])
+            kinds[column] = f"m{k}"
+
+        metrics_file = os.path.join('runs', self.run_id, 'metrics.npz')
+        _save_npz(os.path.join(self.store_dir, metrics_file), arrays)
+
+        manifest = {
+            'version': STORE_VERSION,
+            'written': datetime.now().isoformat(timespec='seconds'),
+            'run_id': self.run_id,
+            'run': self.run_info,
+            'metrics_file': metrics_file,
+            'metric_columns': kinds,
+            'strategies': self.strategies,
+        }
+        manifest_path = os.path.join(self.store_dir, 'manifest.json')
+        previous = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                previous = json.load(f)
+
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+        if previous is not None:
+            self._remove_files(_referenced_files(previous) - _referenced_files(manifest))
+
+    def _remove_files(self, files):
+        """Delete files of the replaced run, and their directories once empty"""
+        for path in sorted(files):
+            try:
+                os.remove(os.path.join(self.store_dir, path))
+            except FileNotFoundError:
+                pass
+        for directory in sorted({os.path.dirname(path) for path in files}, key=len, reverse=True):
+            if directory.startswith('runs') or directory == 'strategies':
+                try:
+                    os.removedirs(os.path.join(self.store_dir, directory))
+                except OSError:
+                    pass  # not empty
+
+
+class ResultsStore:
+    """Read access to a results store; arrays are decoded on demand"""
+
+    def __init__(self, results_dir):
+        self.store_dir = store_path(results_dir)
+        with open(os.path.join(self.store_dir, 'manifest.json'), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported results store version in {self.store_dir}")
+        self.strategies = list(self.manifest['strategies'])
+        self._archives = {}
+        self._views = {}
+
+    def _entry(self, name):
+        if name not in self.manifest['strategies']:
+            raise KeyError(f"No strategy {name!r} in {self.store_dir}")
+        return self.manifest['strategies'][name]
+
+    def _archive(self, name):
+        if name not in self._archives:
+            path = _metrics_file(self.manifest) if name is None else self._entry(name)['file']
+            self._archives[name] = np.load(os.path.join(self.store_dir, path))
+        return self._archives[name]
+
+    def _dates(self, name, key='dates'):
+        import pandas as pd
+
+        return pd.DatetimeIndex(self._archive(name)[key].view('datetime64[ns]'),
+                                name=self._entry(name)['index_name'])
+
+    def metadata(self, name):
+        return self._entry(name)['metadata']
+
+    def value_series(self, name):
+        """Total_Value series of one strategy"""
+        import pandas as pd
+
+        return pd.Series(self._archive(name)['total_value'], index=self._dates(name), name='Total_Value')
+
+    def portfolio_frame(self, name):
+        """Holdings per ticker, Cash and Total_Value (the _portfolio_value.csv layout)"""
+        import pandas as pd
+
+        entry = self._entry(name)
+        archive = self._archive(name)
+        frame = pd.DataFrame(archive['holdings'], index=self._dates(name), columns=entry['tickers'])
+        frame['Cash'] = archive['cash']
+        frame['Total_Value'] = archive['total_value']
+        return frame
+
+    def _price_panel(self, path):
+        import pandas as pd
+
+        key = ('prices', path)
+        if key not in self._views:
+            with np.load(os.path.join(self.store_dir, path)) as archive:
+                self._views[key] = pd.DataFrame(archive['close'],
+                                                index=pd.DatetimeIndex(archive['dates'].view('datetime64[ns]')),
+                                                columns=archive['tickers'].tolist())
+        return self._views[key]
+
+    def position_values(self, name):
+        """Holdings x close price per ticker (None if the strategy was written without prices)"""
+        import pandas as pd
+
+        key = ('position_values', name)
+        if key not in self._views:
+            entry = self._entry(name)
+            if 'prices' not in entry:
+                return None
+            dates = self._dates(name)
+            prices = self._price_panel(entry['prices']).reindex(dates)[entry['tickers']]
+            self._views[key] = pd.DataFrame(self._archive(name)['holdings'] * prices.to_numpy(),
+                                            index=dates, columns=entry['tickers'])
+        return self._views[key]
+
+    def weights(self, name):
+        """Position weights: position values / Total_Value (None without prices)"""
+        key = ('weights', name)
+        if key not in self._views:
+            position_values = self.position_values(name)
+            if position_values is None:
+                return None
+            total_value = self._archive(name)['total_value']
+            self._views[key] = position_values.div(total_value, axis=0)
+        return self._views[key]
+
+    def exposure(self, name):
+        """Invested share of Total_Value per day (None without prices)"""
+        key = ('exposure', name)
+        if key not in self._views:
+            position_values = self.position_values(name)
+            if position_values is None:
+                return None
+            total_value = self._archive(name)['total_value']
+            self._views[key] = (position_values.sum(axis=1) / total_value).rename('exposure')
+        return self._views[key]
+
+    def trades(self, name):
+        """Trade log DataFrame with the columns it was written with"""
+        import pandas as pd
+
+        archive = self._archive(name)
+        schema = self._entry(name)['trade_columns']
+        return pd.DataFrame({spec[0]: _decode_column(archive, f"trade_{k}", spec)
+                             for k, spec in enumerate(schema)})
+
+    def metric(self, column):
+        """One metric for every strategy (Series indexed by strategy)"""
+        import pandas as pd
+
+        key = self.manifest['metric_columns'][column]
+        return pd.Series(self._archive(None)[key], index=self.strategies, name=column)
+
+    def metrics(self, name=None):
+        """Metrics dict of one strategy, or a DataFrame of all of them (name=None)"""
+        import pandas as pd
+
+        columns = self.manifest['metric_columns']
+        archive = self._archive(None)
+        if name is None:
+            return pd.DataFrame({column: archive[key] for column, key in columns.items()},
+                                index=pd.Index(self.strategies, name='strategy'))
+
+        entry = self._entry(name)
+        row = self.strategies.index(name)
+        values = {column: archive[columns[column]][row].item() for column in entry['metric_names']}
+        # A metric column is stored as float when any strategy has a float in it
+        for column in entry.get('int_metrics', []):
+            values[column] = int(values[column])
+        return values
+
+    def export_csv(self, results_dir, names=None):
+        """Write the CSV layout (io.save_strategy_files) for some or all strategies; returns files written"""
+        from backtest.io import save_strategy_files
+
+        num_files = 0
+        for name in (names or self.strategies):
+            num_files += save_strategy_files(results_dir, name, self.portfolio_frame(name),
+                                             self.metrics(name), self.trades(name),
+                                             self.metadata(name), weights_df=self.weights(name))
+        return num_files
+
+
+def weights_frame(portfolio_value_df, prices):
+    """Position weights of a portfolio_value_df valued at prices (what ResultsStore.weights() returns)"""
+    import pandas as pd
+
+    tickers = [c for c in portfolio_value_df.columns if c not in ('Cash', 'Total_Value')]
+    position_values = pd.DataFrame(portfolio_value_df[tickers].to_numpy(dtype=np.float64)
+                                   * prices.reindex(portfolio_value_df.index)[tickers].to_numpy(),
+                                   index=portfolio_value_df.index, columns=tickers)
+    return position_values.div(portfolio_value_df['Total_Value'].to_numpy(), axis=0)
+
+
+def load_strategy(results_dir, name):
+    """
+    One strategy's exports from a results directory: the results store if
+    there is one, else the CSV files
+
+    Returns:
+        dict with 'portfolio' (DataFrame, date index), 'trades' (DataFrame,
+        parsed dates), 'weights' (DataFrame or None), 'metrics' (one-row
+        DataFrame) and 'metadata' (dict)
+    """
+    import pandas as pd
+
+    if has_results_store(results_dir):
+        store = ResultsStore(results_dir)
+        if name in store.manifest['strategies']:
+            return {
+                'portfolio': store.portfolio_frame(name),
+                'trades': store.trades(name),
+                'weights': store.weights(name),
+                'metrics': pd.DataFrame([store.metrics(name)]),
+                'metadata': store.metadata(name),
+            }
+
+    prefix = os.path.join(str(results_dir), name)
+    trades = pd.read_csv(f"{prefix}_trades.csv")
+    if 'date' in trades.columns:
+        trades['date'] = pd.to_datetime(trades['date'])
+    weights_file = f"{prefix}_weights.csv"
+    with open(f"{prefix}_metadata.json", 'r') as f:
+        metadata = json.load(f)
+    return {
+        'portfolio': pd.read_csv(f"{prefix}_portfolio_value.csv", index_col=0, parse_dates=True),
+        'trades': trades,
+        'weights': (pd.read_csv(weights_file, index_col=0, parse_dates=True)
+                    if os.path.exists(weights_file) else None),
+        'metrics': pd.read_csv(f"{prefix}_metrics.csv"),
+        'metadata': metadata,
+    }
@@ -2,25 +2,31 @@
 """
 Portfolio Trimming Strategy Backtest
 Standalone script version for execution and validation
+
+Downloads prices from Yahoo Finance (imported only when the backtest runs)
+and values each strategy's holdings history with NumPy. Pass --cross-check to
+also value every strategy with vectorbt and report any disagreement.
 """
 
 # Core libraries
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from datetime import datetime, timedelta
+import argparse
 import warnings
 import os
-import json
+import sys
 warnings.filterwarnings('ignore')
 
-# Backtesting framework
-import vectorbt as vbt
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("="*80)
-print("PORTFOLIO TRIMMING STRATEGY BACKTEST")
-print("="*80)
-print(f"\nVectorBT version: {vbt.__version__}")
+from backtest import profiling
+from backtest.engine import BacktestResult, as_price_matrix, execute_trims, value_holdings
+from backtest.io import TRADE_COLUMNS, save_comparison, save_strategy_files
+from backtest.results_store import ResultsWriter, weights_frame
+from backtest.metrics import portfolio_stats
+from backtest.trade_log import SELL, TradeLog
 
 # ============================================================================
 # CONFIGURATION
@@ -51,58 +57,53 @@ INITIAL_CASH = 100000
 TRIM_THRESHOLDS = [0.50, 1.00, 1.50]
 TRIM_PERCENTAGE = 0.20
 REINVEST_MODES = ['pro_rata', 'spy', 'cash']
+FEES = 0.001
+
+# Valuation as the original vectorbt call did it (from_orders with
+# group_by=True and no cash_sharing): every ticker is its own account holding
+# INITIAL_CASH, so the portfolio starts with len(tickers) x INITIAL_CASH and
+# the stats are measured against that. True = one shared INITIAL_CASH.
+CASH_SHARING = False
+
+# DATA SOURCE (see backtest/fetch.py): downloads are cached in PRICE_STORE_DIR
+# and later runs only fetch the days they are missing
+DATA_SOURCE = 'yfinance'       # 'yfinance', 'yfinance_cache' or 'directory'
+PRICE_STORE_DIR = 'price_store'
+
+# Rows written to the exported portfolio/weights files (metrics always use every day):
+# keep every Nth day, and/or only days where holdings or cash changed
+EXPORT_EVERY_N_DAYS = 1
+EXPORT_CHANGED_ROWS_ONLY = False
 
-print(f"\nPortfolio Configuration:")
-print(f"  Tickers: {len(PORTFOLIO)}")
-print(f"  Period: {START_DATE} to {END_DATE}")
-print(f"  Initial Capital: ${INITIAL_CASH:,}")
-print(f"  Trim Thresholds: {[f'+{int(t*100)}%' for t in TRIM_THRESHOLDS]}")
-print(f"  Trim Size: {int(TRIM_PERCENTAGE*100)}% of position")
+# All strategies go to one columnar store (results/results_store/, see
+# backtest/results_store.py); the five CSV files per strategy are optional
+EXPORT_CSV = False             # or pass --csv
+
+# Calendar-day annualization (the convention of vectorbt's freq='D' this
+# script's stats were originally computed with)
+PERIODS_PER_YEAR = 365
 
 # ============================================================================
 # DATA DOWNLOAD
 # ============================================================================
 
 def download_data(tickers, start_date, end_date):
-    import time
+    from backtest.fetch import fetch_prices
+
     print(f"\n📊 Downloading data for {len(tickers)} tickers...")
     print(f"Period: {start_date} to {end_date}\n")
 
-    # Download one ticker at a time to avoid rate limits
-    all_data = {}
-    failed_tickers = []
-
-    for i, ticker in enumerate(tickers):
-        print(f"  Downloading {ticker} ({i+1}/{len(tickers)})...", end='')
-        try:
-            ticker_data = yf.download(
-                tickers=ticker,
-                start=start_date,
-                end=end_date,
-                progress=False,
-                auto_adjust=True
-            )
+    # Only days not already in the local price store are requested (end_date is exclusive)
+    last_date = (pd.Timestamp(end_date) - pd.Timedelta(days=1)).date()
+    store, report = fetch_prices(tickers, start_date, last_date, source=DATA_SOURCE,
+                                 store_dir=PRICE_STORE_DIR)
 
-            if not ticker_data.empty:
-                all_data[ticker] = ticker_data['Close']
-                print(" ✓")
-            else:
-                failed_tickers.append(ticker)
-                print(" ✗ (no data)")
-
-            # Add delay to avoid rate limiting
-            time.sleep(0.5)
-
-        except Exception as e:
-            failed_tickers.append(ticker)
-            print(f" ✗ ({str(e)[:50]})")
-            time.sleep(1)
-
-    # Combine all data
-    if all_data:
-        data = pd.DataFrame(all_data)
-    else:
+    if store is None:
+        return pd.DataFrame(), [], {}
+    data = store.load_unaligned(tickers, start_date, last_date)
+    if data.empty:
         return pd.DataFrame(), [], {}
+    failed_tickers = [t for t in tickers if t not in data.columns]
 
     total_days = len(data)
     min_required_days = int(total_days * 0.95)
@@ -120,10 +121,10 @@ def download_data(tickers, start_date, end_date):
             valid_tickers.append(ticker)
 
     for ticker in failed_tickers:
-        dropped_tickers[ticker] = "Failed to download"
+        dropped_tickers[ticker] = report['failed'].get(ticker, "Failed to download")
 
     price_data = data[valid_tickers].copy()
-    price_data = price_data.fillna(method='ffill')
+    price_data = price_data.ffill()
 
     print(f"\n✓ Data Download Complete")
     print(f"  Valid tickers: {len(valid_tickers)}")
@@ -137,12 +138,6 @@ def download_data(tickers, start_date, end_date):
 
     return price_data, valid_tickers, dropped_tickers
 
-price_data, valid_tickers, dropped_tickers = download_data(
-    tickers=list(PORTFOLIO.keys()),
-    start_date=START_DATE,
-    end_date=END_DATE
-)
-
 # ============================================================================
 # PORTFOLIO NORMALIZATION
 # ============================================================================
@@ -165,314 +160,349 @@ def normalize_portfolio(portfolio_dict, price_data, initial_cash):
 
     return weights, initial_shares
 
-weights, initial_shares = normalize_portfolio(
-    portfolio_dict=PORTFOLIO,
-    price_data=price_data,
-    initial_cash=INITIAL_CASH
-)
-
-print(f"\n💼 Portfolio normalized: {len(initial_shares)} tickers")
-
 # ============================================================================
 # STRATEGY CLASSES
 # ============================================================================
 
 class TrimStrategy:
-    def __init__(self, price_data, initial_shares, threshold, trim_pct, reinvest_mode):
+    def __init__(self, price_data, initial_shares, threshold, trim_pct, reinvest_mode,
+                 init_cash=INITIAL_CASH, fees=FEES, cash_sharing=CASH_SHARING):
         self.price_data = price_data
         self.initial_shares = initial_shares
         self.threshold = threshold
         self.trim_pct = trim_pct
         self.reinvest_mode = reinvest_mode
-        self.cost_basis = price_data.iloc[0].copy()
-        self.holdings = pd.Series(initial_shares)
+        self.init_cash = init_cash
+        self.fees = fees
+        self.cash_sharing = cash_sharing
+        self.reset()
+
+    def reset(self):
+        # Positions are kept as arrays in initial_shares order
+        self.tickers = list(self.initial_shares)
+        self.positions = self.price_data.columns.get_indexer(self.tickers)
+        self.prices = as_price_matrix(self.price_data)[:, self.positions]
+        self.spy = self.tickers.index('SPY') if 'SPY' in self.tickers else None
+
+        self.cost_basis = self.prices[0].copy()
+        self.holdings = np.array([self.initial_shares[t] for t in self.tickers], dtype=np.float64)
         self.cash = 0.0
-        self.trim_log = []
-
-    def check_and_execute_trims(self, date, prices):
-        trim_proceeds = 0.0
-
-        for ticker in self.holdings.index:
-            if self.holdings[ticker] == 0:
-                continue
-
-            current_price = prices[ticker]
-            cost = self.cost_basis[ticker]
-            gain = (current_price - cost) / cost
-
-            if gain >= self.threshold:
-                shares_to_sell = self.holdings[ticker] * self.trim_pct
-                proceeds = shares_to_sell * current_price
-
-                self.holdings[ticker] -= shares_to_sell
-                trim_proceeds += proceeds
-
-                self.trim_log.append({
-                    'date': date,
-                    'ticker': ticker,
-                    'gain_pct': gain,
-                    'shares_sold': shares_to_sell,
-                    'proceeds': proceeds,
-                    'price': current_price
-                })
-
-        return trim_proceeds
-
-    def reinvest_proceeds(self, proceeds, prices):
-        if proceeds == 0:
-            return
+        self.trim_log = TradeLog(self.price_data.index, self.price_data.columns)
+
+    def check_and_execute_trims(self, day, prices):
+        """Trim every position at or above the threshold; returns the day's proceeds"""
+        gain = (prices - self.cost_basis) / self.cost_basis
+        trimmed = np.flatnonzero((self.holdings != 0) & (gain >= self.threshold))
+        if not trimmed.size:
+            return 0.0
+
+        # All trims sell from the day's opening holdings; proceeds are reinvested once
+        fills = execute_trims(self.holdings, prices, trimmed, self.trim_pct,
+                              self.reinvest_mode, spy=self.spy)
+        for k, j in enumerate(trimmed.tolist()):
+            self.trim_log.append(day, self.positions[j], SELL, 'threshold',
+                                 fills['shares'][k], prices[j], fills['gross_proceeds'][k],
+                                 fills['net_proceeds'][k], signal=gain[j])
 
         if self.reinvest_mode == 'cash':
-            self.cash += proceeds
-        elif self.reinvest_mode == 'spy':
-            if 'SPY' in self.holdings.index:
-                spy_shares = proceeds / prices['SPY']
-                self.holdings['SPY'] += spy_shares
-        elif self.reinvest_mode == 'pro_rata':
-            total_value = sum(self.holdings[t] * prices[t] for t in self.holdings.index)
-
-            for ticker in self.holdings.index:
-                position_value = self.holdings[ticker] * prices[ticker]
-                weight = position_value / total_value if total_value > 0 else 0
-                shares_to_buy = (proceeds * weight) / prices[ticker]
-                self.holdings[ticker] += shares_to_buy
+            self.cash += fills['total_net_proceeds']
+        return fills['total_net_proceeds']
 
     def run_backtest(self):
-        holdings_history = pd.DataFrame(
-            index=self.price_data.index,
-            columns=self.price_data.columns,
-            data=0.0
+        """Run from the initial holdings and return a BacktestResult"""
+        self.reset()
+
+        # One preallocated buffer per history, written row by row
+        num_days = len(self.price_data)
+        holdings_history = np.zeros((num_days, len(self.price_data.columns)))
+        cash_history = np.zeros(num_days)
+
+        holdings_history[0, self.positions] = self.holdings
+
+        with profiling.stage('trim_loop'):
+            for i in range(1, num_days):
+                self.check_and_execute_trims(i, self.prices[i])
+                holdings_history[i, self.positions] = self.holdings
+                cash_history[i] = self.cash
+
+        with profiling.stage('valuation'):
+            _, total_value = value_holdings(holdings_history, as_price_matrix(self.price_data),
+                                            self.init_cash, fees=self.fees, cash_sharing=self.cash_sharing)
+        return BacktestResult(
+            dates=self.price_data.index,
+            tickers=self.price_data.columns,
+            holdings=holdings_history,
+            cash=cash_history,
+            total_value=total_value,
+            trades=self.trim_log
         )
 
-        holdings_history.iloc[0] = self.holdings
-
-        for i in range(1, len(self.price_data)):
-            date = self.price_data.index[i]
-            prices = self.price_data.iloc[i]
 
-            proceeds = self.check_and_execute_trims(date, prices)
-            if proceeds > 0:
-                self.reinvest_proceeds(proceeds, prices)
-
-            holdings_history.iloc[i] = self.holdings
-
-        return holdings_history
+def buy_and_hold(price_data, initial_shares, init_cash=INITIAL_CASH, fees=FEES, cash_sharing=CASH_SHARING):
+    """Hold the initial shares throughout; returns a BacktestResult"""
+    shares = np.array([initial_shares.get(ticker, 0.0) for ticker in price_data.columns])
+    holdings = np.tile(shares, (len(price_data), 1))
+    _, total_value = value_holdings(holdings, as_price_matrix(price_data), init_cash, fees=fees,
+                                    cash_sharing=cash_sharing)
+    return BacktestResult(
+        dates=price_data.index,
+        tickers=price_data.columns,
+        holdings=holdings,
+        cash=np.zeros(len(price_data)),
+        total_value=total_value
+    )
 
 # ============================================================================
-# BUY-AND-HOLD BASELINE
+# VALUATION
 # ============================================================================
 
-print("\n" + "="*80)
-print("RUNNING BACKTESTS")
-print("="*80)
-
-print("\n📈 Running Buy-and-Hold Baseline...")
-
-target_shares = pd.DataFrame(
-    data=0.0,
-    index=price_data.index,
-    columns=price_data.columns
-)
-
-for ticker, shares in initial_shares.items():
-    target_shares.loc[:, ticker] = shares
-
-bh_portfolio = vbt.Portfolio.from_orders(
-    close=price_data,
-    size=target_shares,
-    size_type='targetamount',
-    init_cash=INITIAL_CASH,
-    fees=0.001,
-    freq='D',
-    group_by=True
-)
-
-bh_stats = {
-    'final_value': bh_portfolio.final_value,
-    'total_return': bh_portfolio.total_return,
-    'cagr': bh_portfolio.annualized_return,
-    'sharpe_ratio': bh_portfolio.sharpe_ratio,
-    'sortino_ratio': bh_portfolio.sortino_ratio,
-    'max_drawdown': bh_portfolio.max_drawdown,
-    'volatility': bh_portfolio.annualized_volatility,
-    'num_trades': 0
-}
+def starting_capital(tickers):
+    """Portfolio value before the first trade: INITIAL_CASH, or INITIAL_CASH per ticker without CASH_SHARING"""
+    return INITIAL_CASH if CASH_SHARING else INITIAL_CASH * len(tickers)
+
+
+def summarize(result):
+    """Stats dict for a BacktestResult (values measured against starting_capital())"""
+    return portfolio_stats(result.total_value, starting_capital(result.tickers),
+                           periods_per_year=PERIODS_PER_YEAR)
+
+
+def export_result(writer, name, price_data, result, stats, metadata, csv_dir=None):
+    """
+    Add one strategy's BacktestResult to the results store, and write its
+    validator CSV files too when csv_dir is given; returns CSV files written
+    """
+    portfolio_value_df = result.portfolio_frame(every=EXPORT_EVERY_N_DAYS,
+                                                changed_only=EXPORT_CHANGED_ROWS_ONLY)
+
+    # Validator column names for the trim log
+    trades_df = result.trades_frame().rename(columns={
+        'shares': 'shares_sold', 'gross_proceeds': 'proceeds', 'signal': 'gain_pct'
+    })[TRADE_COLUMNS]
+
+    # The store keeps holdings and prices only; weights are derived when read
+    writer.add(name, portfolio_value_df, stats, trades_df, metadata, prices=price_data)
+    if csv_dir is None:
+        return 0
+    return save_strategy_files(csv_dir, name, portfolio_value_df, stats, trades_df, metadata,
+                               weights_df=weights_frame(portfolio_value_df, price_data))
+
+
+def cross_check_vectorbt(price_data, result, stats):
+    """
+    Re-value a result's holdings with vectorbt and print how far it is from the native stats
+
+    Uses the script's valuation setup (CASH_SHARING), so without cash
+    sharing the two should agree to rounding. With it, vectorbt fills orders
+    it cannot fund only partially while the native valuation lets the shared
+    cash go negative, so expect differences around the size of the day-0 fees.
+    """
+    import vectorbt as vbt
+
+    portfolio = vbt.Portfolio.from_orders(
+        close=price_data,
+        size=result.holdings_frame(),
+        size_type='targetamount',
+        init_cash=INITIAL_CASH,
+        fees=FEES,
+        freq='D',
+        group_by=True,
+        cash_sharing=CASH_SHARING
+    )
+    vbt_stats = {
+        'final_value': portfolio.final_value(),
+        'cagr': portfolio.annualized_return(),
+        'sharpe_ratio': portfolio.sharpe_ratio(),
+        'max_drawdown': portfolio.max_drawdown()
+    }
+    diffs = ', '.join(f"{key} {vbt_stats[key] - stats[key]:+.6g}" for key in vbt_stats)
+    print(f"  vectorbt - native: {diffs}")
 
-print(f"  ✓ Final Value: ${bh_stats['final_value']:,.2f}")
-print(f"  ✓ CAGR: {bh_stats['cagr']:.1%}")
-print(f"  ✓ Sharpe Ratio: {bh_stats['sharpe_ratio']:.2f}")
 
 # ============================================================================
-# RUN ALL TRIM STRATEGIES
+# MAIN
 # ============================================================================
 
-all_results = {'Buy-and-Hold': bh_stats}
-all_portfolios = {'Buy-and-Hold': bh_portfolio}
-all_strategies = {}
+def main():
+    parser = argparse.ArgumentParser(description='Portfolio trimming backtest on Yahoo Finance data')
+    parser.add_argument('--cross-check', action='store_true',
+                        help='also value every strategy with vectorbt and print the differences')
+    parser.add_argument('--csv', action='store_true', default=EXPORT_CSV,
+                        help='also write the per-strategy CSV files next to the results store')
+    profiling.add_profile_argument(parser)
+    args = parser.parse_args(sys.argv[1:])
+    profiling.configure(args.profile)
+
+    print("="*80)
+    print("PORTFOLIO TRIMMING STRATEGY BACKTEST")
+    print("="*80)
+
+    print(f"\nPortfolio Configuration:")
+    print(f"  Tickers: {len(PORTFOLIO)}")
+    print(f"  Period: {START_DATE} to {END_DATE}")
+    print(f"  Initial Capital: ${INITIAL_CASH:,}" + ("" if CASH_SHARING else " per ticker (no cash sharing)"))
+    print(f"  Trim Thresholds: {[f'+{int(t*100)}%' for t in TRIM_THRESHOLDS]}")
+    print(f"  Trim Size: {int(TRIM_PERCENTAGE*100)}% of position")
+
+    with profiling.stage('data_loading'):
+        price_data, valid_tickers, dropped_tickers = download_data(
+            tickers=list(PORTFOLIO.keys()),
+            start_date=START_DATE,
+            end_date=END_DATE
+        )
+
+    weights, initial_shares = normalize_portfolio(
+        portfolio_dict=PORTFOLIO,
+        price_data=price_data,
+        initial_cash=INITIAL_CASH
+    )
 
-for threshold in TRIM_THRESHOLDS:
-    for mode in REINVEST_MODES:
-        strategy_name = f"Trim@+{int(threshold*100)}% ({mode})"
+    print(f"\n💼 Portfolio normalized: {len(initial_shares)} tickers")
 
-        print(f"\n🔄 Running: {strategy_name}")
+    # ============================================================================
+    # BUY-AND-HOLD BASELINE
+    # ============================================================================
 
-        strategy = TrimStrategy(
-            price_data=price_data,
-            initial_shares=initial_shares,
-            threshold=threshold,
-            trim_pct=TRIM_PERCENTAGE,
-            reinvest_mode=mode
-        )
+    print("\n" + "="*80)
+    print("RUNNING BACKTESTS")
+    print("="*80)
 
-        holdings_history = strategy.run_backtest()
+    print("\n📈 Running Buy-and-Hold Baseline...")
 
-        portfolio = vbt.Portfolio.from_orders(
-            close=price_data,
-            size=holdings_history,
-            size_type='targetamount',
-            init_cash=INITIAL_CASH,
-            fees=0.001,
-            freq='D',
-            group_by=True
-        )
+    bh_result = buy_and_hold(price_data, initial_shares)
+    bh_stats = summarize(bh_result)
+    bh_stats['num_trades'] = 0
 
-        stats = {
-            'final_value': portfolio.final_value,
-            'total_return': portfolio.total_return,
-            'cagr': portfolio.annualized_return,
-            'sharpe_ratio': portfolio.sharpe_ratio,
-            'sortino_ratio': portfolio.sortino_ratio,
-            'max_drawdown': portfolio.max_drawdown,
-            'volatility': portfolio.annualized_volatility,
-            'num_trades': len(strategy.trim_log),
-            'cash_held': strategy.cash
-        }
+    print(f"  ✓ Final Value: ${bh_stats['final_value']:,.2f}")
+    print(f"  ✓ CAGR: {bh_stats['cagr']:.1%}")
+    print(f"  ✓ Sharpe Ratio: {bh_stats['sharpe_ratio']:.2f}")
+    if args.cross_check:
+        cross_check_vectorbt(price_data, bh_result, bh_stats)
 
-        all_results[strategy_name] = stats
-        all_portfolios[strategy_name] = portfolio
-        all_strategies[strategy_name] = strategy
+    # ============================================================================
+    # RUN ALL TRIM STRATEGIES
+    # ============================================================================
 
-        print(f"  Final Value: ${stats['final_value']:,.2f}")
-        print(f"  CAGR: {stats['cagr']:.1%}")
-        print(f"  Trims: {stats['num_trades']}")
+    all_results = {'Buy-and-Hold': bh_stats}
+    all_runs = {'Buy-and-Hold': bh_result}
 
-print("\n✓ ALL BACKTESTS COMPLETE")
+    for threshold in TRIM_THRESHOLDS:
+        for mode in REINVEST_MODES:
+            strategy_name = f"Trim@+{int(threshold*100)}% ({mode})"
 
-# ============================================================================
-# EXPORT VALIDATOR-COMPATIBLE FILES
-# ============================================================================
+            print(f"\n🔄 Running: {strategy_name}")
 
-results_dir = 'results'
-os.makedirs(results_dir, exist_ok=True)
-
-print("\n" + "="*80)
-print("EXPORTING VALIDATION FILES")
-print("="*80)
-
-# Export Buy-and-Hold
-print("\n🔄 Exporting Buy-and-Hold...")
-strategy_name_clean = "buy_and_hold"
-
-pf_value = bh_portfolio.value()
-pf_shares = pd.DataFrame(data=0.0, index=price_data.index, columns=price_data.columns)
-for ticker, shares in initial_shares.items():
-    pf_shares.loc[:, ticker] = shares
-
-portfolio_value_df = pf_shares.copy()
-portfolio_value_df['Cash'] = 0.0
-portfolio_value_df['Total_Value'] = pf_value
-portfolio_value_df.to_csv(f"{results_dir}/{strategy_name_clean}_portfolio_value.csv")
-
-metrics_df = pd.DataFrame([bh_stats])
-metrics_df.to_csv(f"{results_dir}/{strategy_name_clean}_metrics.csv", index=False)
-
-trades_df = pd.DataFrame(columns=['date', 'ticker', 'shares_sold', 'price', 'proceeds', 'gain_pct'])
-trades_df.to_csv(f"{results_dir}/{strategy_name_clean}_trades.csv", index=False)
-
-weights_df = pf_shares.copy()
-for col in weights_df.columns:
-    weights_df[col] = (weights_df[col] * price_data[col]) / portfolio_value_df['Total_Value']
-weights_df.to_csv(f"{results_dir}/{strategy_name_clean}_weights.csv")
-
-metadata = {
-    'strategy_name': 'Buy-and-Hold',
-    'initial_capital': INITIAL_CASH,
-    'start_date': START_DATE,
-    'end_date': END_DATE,
-    'tickers': list(price_data.columns),
-    'trim_threshold': None,
-    'trim_percentage': None,
-    'reinvest_mode': None,
-    'fees': 0.001
-}
-with open(f"{results_dir}/{strategy_name_clean}_metadata.json", 'w') as f:
-    json.dump(metadata, f, indent=2)
-
-print(f"  ✓ Exported 5 files")
-
-# Export all trim strategies
-for threshold in TRIM_THRESHOLDS:
-    for mode in REINVEST_MODES:
-        strategy_name = f"Trim@+{int(threshold*100)}% ({mode})"
-        strategy_name_clean = f"trim_{int(threshold*100)}pct_{mode}"
-
-        print(f"\n🔄 Exporting {strategy_name}...")
-
-        strategy = all_strategies[strategy_name]
-        portfolio = all_portfolios[strategy_name]
-
-        # Re-run to get holdings history
-        holdings_history = strategy.run_backtest()
-
-        portfolio_value_df = holdings_history.copy()
-        portfolio_value_df['Cash'] = strategy.cash
-        portfolio_value_df['Total_Value'] = portfolio.value()
-        portfolio_value_df.to_csv(f"{results_dir}/{strategy_name_clean}_portfolio_value.csv")
-
-        stats = all_results[strategy_name]
-        metrics_df = pd.DataFrame([stats])
-        metrics_df.to_csv(f"{results_dir}/{strategy_name_clean}_metrics.csv", index=False)
-
-        trades_df = pd.DataFrame(strategy.trim_log)
-        if len(trades_df) > 0:
-            trades_df['date'] = pd.to_datetime(trades_df['date'])
-        trades_df.to_csv(f"{results_dir}/{strategy_name_clean}_trades.csv", index=False)
-
-        weights_df = holdings_history.copy()
-        for col in weights_df.columns:
-            weights_df[col] = (weights_df[col] * price_data[col]) / portfolio_value_df['Total_Value']
-        weights_df.to_csv(f"{results_dir}/{strategy_name_clean}_weights.csv")
-
-        metadata = {
-            'strategy_name': strategy_name,
-            'initial_capital': INITIAL_CASH,
-            'start_date': START_DATE,
-            'end_date': END_DATE,
-            'tickers': list(price_data.columns),
-            'trim_threshold': threshold,
-            'trim_percentage': TRIM_PERCENTAGE,
-            'reinvest_mode': mode,
-            'fees': 0.001
-        }
-        with open(f"{results_dir}/{strategy_name_clean}_metadata.json", 'w') as f:
-            json.dump(metadata, f, indent=2)
-
-        print(f"  ✓ Exported 5 files ({len(strategy.trim_log)} trades)")
-
-print("\n" + "="*80)
-print("✅ ALL FILES EXPORTED")
-print("="*80)
-print(f"\nFiles saved to: {results_dir}/")
-print(f"Total strategies: {len(all_results)}")
-
-# Create comparison summary
-comparison_df = pd.DataFrame(all_results).T
-comparison_df = comparison_df.sort_values('final_value', ascending=False)
-comparison_df.to_csv('trimming_strategy_results.csv')
-
-print("\n📊 Summary Results:")
-print(f"  Best strategy: {comparison_df.index[0]}")
-print(f"  Best final value: ${comparison_df.iloc[0]['final_value']:,.2f}")
-print(f"  Best CAGR: {comparison_df.iloc[0]['cagr']:.2%}")
-
-print("\n✨ Backtest complete! Ready for validation.")
+            strategy = TrimStrategy(
+                price_data=price_data,
+                initial_shares=initial_shares,
+                threshold=threshold,
+                trim_pct=TRIM_PERCENTAGE,
+                reinvest_mode=mode
+            )
+
+            with profiling.strategy(strategy_name, output_dir=os.path.join('results', 'profiles')):
+                result = strategy.run_backtest()
+
+                with profiling.stage('metrics'):
+                    stats = summarize(result)
+            stats['num_trades'] = len(result.trades)
+            stats['cash_held'] = result.final_cash
+
+            all_results[strategy_name] = stats
+            all_runs[strategy_name] = result
+
+            print(f"  Final Value: ${stats['final_value']:,.2f}")
+            print(f"  CAGR: {stats['cagr']:.1%}")
+            print(f"  Trims: {stats['num_trades']}")
+            if args.cross_check:
+                cross_check_vectorbt(price_data, result, stats)
+
+    print("\n✓ ALL BACKTESTS COMPLETE")
+
+    # ============================================================================
+    # EXPORT VALIDATOR-COMPATIBLE FILES
+    # ============================================================================
+
+    results_dir = 'results'
+    csv_dir = results_dir if args.csv else None
+    writer = ResultsWriter(results_dir, run_info={'script': 'run_backtest.py', 'start_date': START_DATE,
+                                                  'end_date': END_DATE, 'fees': FEES,
+                                                  'cash_sharing': CASH_SHARING})
+
+    print("\n" + "="*80)
+    print("EXPORTING VALIDATION FILES")
+    print("="*80)
+
+    # Export Buy-and-Hold
+    print("\n🔄 Exporting Buy-and-Hold...")
+
+    metadata = {
+        'strategy_name': 'Buy-and-Hold',
+        'initial_capital': starting_capital(price_data.columns),
+        'start_date': START_DATE,
+        'end_date': END_DATE,
+        'tickers': list(price_data.columns),
+        'trim_threshold': None,
+        'trim_percentage': None,
+        'reinvest_mode': None,
+        'fees': FEES,
+        'cash_sharing': CASH_SHARING
+    }
+    num_files = export_result(writer, "buy_and_hold", price_data, bh_result, bh_stats, metadata, csv_dir)
+
+    print(f"  ✓ Exported to the results store" + (f" + {num_files} files" if num_files else ""))
+
+    # Export all trim strategies
+    for threshold in TRIM_THRESHOLDS:
+        for mode in REINVEST_MODES:
+            strategy_name = f"Trim@+{int(threshold*100)}% ({mode})"
+            strategy_name_clean = f"trim_{int(threshold*100)}pct_{mode}"
+
+            print(f"\n🔄 Exporting {strategy_name}...")
+
+            result = all_runs[strategy_name]
+
+            metadata = {
+                'strategy_name': strategy_name,
+                'initial_capital': starting_capital(price_data.columns),
+                'start_date': START_DATE,
+                'end_date': END_DATE,
+                'tickers': list(price_data.columns),
+                'trim_threshold': threshold,
+                'trim_percentage': TRIM_PERCENTAGE,
+                'reinvest_mode': mode,
+                'fees': FEES,
+                'cash_sharing': CASH_SHARING
+            }
+            with profiling.stage('export'):
+                num_files = export_result(writer, strategy_name_clean, price_data, result,
+                                          all_results[strategy_name], metadata, csv_dir)
+
+            print(f"  ✓ Exported to the results store" + (f" + {num_files} files" if num_files else "")
+                  + f" ({len(result.trades)} trades)")
+
+    writer.close()
+
+    print("\n" + "="*80)
+    print("✅ ALL FILES EXPORTED")
+    print("="*80)
+    print(f"\nResults store: {writer.store_dir}/")
+    if csv_dir:
+        print(f"CSV files saved to: {csv_dir}/")
+    print(f"Total strategies: {len(all_results)}")
+
+    # Create comparison summary
+    comparison_df = save_comparison(all_results, 'trimming_strategy_results.csv')
+
+    print("\n📊 Summary Results:")
+    print(f"  Best strategy: {comparison_df.index[0]}")
+    print(f"  Best final value: ${comparison_df.iloc[0]['final_value']:,.2f}")
+    print(f"  Best CAGR: {comparison_df.iloc[0]['cagr']:.2%}")
+
+    print("\n✨ Backtest complete! Ready for validation.")
+
+    profiling.report(os.path.join(results_dir, 'profile.json'))
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
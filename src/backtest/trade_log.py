@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Trade Log
+
+Columnar record of the trades a backtest makes, backed by one growable NumPy
+structured array instead of a list of dicts. Dates and tickers are stored as
+integer indexes into the run's dates and tickers, so a record is a fixed
+64 bytes and holds no Python objects.
+
+Proceeds are cash flows: positive for sells, negative for buys. `signal` is
+the value that triggered the trade (gain over cost basis for trims, SPY's
+drawdown for dip buys; NaN if the rule has none).
+
+Usage:
+    log = TradeLog(dates, tickers)
+    log.append(i, j, SELL, 'threshold', shares, price, gross, net, cost, tax, gain)
+    log.total('transaction_cost')     # vectorized sums
+    log.to_frame()                    # DataFrame, built column by column
+"""
+
+import numpy as np
+
+TRADE_DTYPE = np.dtype([
+    ('day', np.int32),                 # row in the run's dates
+    ('ticker', np.int16),              # column in the run's tickers
+    ('side', np.int8),                 # SELL or BUY
+    ('reason', np.int8),               # index into REASONS
+    ('shares', np.float64),
+    ('price', np.float64),
+    ('gross_proceeds', np.float64),
+    ('net_proceeds', np.float64),
+    ('transaction_cost', np.float64),
+    ('capital_gains_tax', np.float64),
+    ('signal', np.float64),
+])
+
+SELL = -1
+BUY = 1
+
+# Rule that generated a trade (stored as its index)
+REASONS = ('threshold', 'momentum', 'volatility', 'dip_buy')
+REASON_CODES = {reason: code for code, reason in enumerate(REASONS)}
+
+
+class TradeLog:
+    """Growable structured-array trade log for one backtest run"""
+
+    def __init__(self, dates, tickers, capacity=64):
+        self.dates = dates
+        self.tickers = tuple(tickers)
+        self._records = np.empty(max(int(capacity), 1), dtype=TRADE_DTYPE)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, field):
+        """One column (read-only view once frozen)"""
+        return self.records[field]
+
+    @property
+    def records(self):
+        """Structured array of the recorded trades"""
+        return self._records[:self._size]
+
+    def append(self, day, ticker, side, reason, shares, price, gross_proceeds, net_proceeds,
+               transaction_cost=0.0, capital_gains_tax=0.0, signal=np.nan):
+        """
+        Record one trade
+
+        Args:
+            day: row index into dates
+            ticker: column index into tickers
+            side: SELL or BUY
+            reason: one of REASONS (or its code)
+            shares, price: shares traded and execution price
+            gross_proceeds, net_proceeds: cash flow before/after costs and taxes
+            transaction_cost, capital_gains_tax: amounts paid
+            signal: trigger value (see module docstring)
+        """
+        if self._size == len(self._records):
+            if not self._records.flags.writeable:
+                raise ValueError("TradeLog is frozen")
+            self._records = np.resize(self._records, 2 * len(self._records))
+        if isinstance(reason, str):
+            reason = REASON_CODES[reason]
+        self._records[self._size] = (day, ticker, side, reason, shares, price,
+                                     gross_proceeds, net_proceeds,
+                                     transaction_cost, capital_gains_tax, signal)
+        self._size += 1
+
+    def freeze(self):
+        """Trim spare capacity and make the log read-only; returns self"""
+        self._records = self._records[:self._size].copy()
+        self._records.setflags(write=False)
+        return self
+
+    def total(self, field):
+        """Sum of one numeric column"""
+        return float(self.records[field].sum())
+
+    def to_frame(self):
+        """
+        DataFrame with one row per trade
+
+        Columns: date, ticker, side, reason (categoricals for the last three),
+        shares, price, gross_proceeds, net_proceeds, transaction_cost,
+        capital_gains_tax, signal
+        """
+        import pandas as pd
+
+        records = self.records
+        return pd.DataFrame({
+            'date': np.asarray(self.dates)[records['day']],
+            'ticker': pd.Categorical.from_codes(records['ticker'], categories=list(self.tickers)),
+            'side': pd.Categorical.from_codes((records['side'] == BUY).astype(np.int8),
+                                              categories=['sell', 'buy']),
+            'reason': pd.Categorical.from_codes(records['reason'], categories=list(REASONS)),
+            **{field: records[field] for field in TRADE_DTYPE.names[4:]}
+        })
+
+    def to_parquet(self, path):
+        """Write the log to a Parquet file (needs pyarrow)"""
+        self.to_frame().to_parquet(path, index=False)
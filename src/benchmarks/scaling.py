@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+"""
+Universe Scaling Benchmark
+
+Runs each backtest engine and reinvestment mode on synthetic price panels of
+increasing size (data.generate_price_panel) and appends one row per run to a
+CSV, tagged with the git commit, so scaling regressions show up between
+commits.
+
+Engines:
+    kernel          run_strategy_kernel (engine.py), one strategy per run
+    batch           run_threshold_batch, all TRIM_THRESHOLDS in one pass
+    trim_strategy   TrimStrategy (run_backtest.py)
+
+Each run executes in a forked child process, so its peak RSS is its own
+(rss_delta_mb is the growth over what the child started with: the shared
+price panel and indicators). Indicator computation is timed once per
+universe as its own 'indicators' row. Once a run takes longer than the time
+budget, the larger universes of that engine/mode are skipped.
+
+Usage:
+    python src/benchmarks/scaling.py                         # 6 .. 5,000 tickers x 30 years
+    python src/benchmarks/scaling.py --tickers 100,1000 --years 10
+    python src/benchmarks/scaling.py --engines kernel --modes pro_rata,spy
+    python src/benchmarks/scaling.py --quick                 # smoke test
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.data import generate_price_panel
+from backtest.engine import REINVEST_MODES, REINVEST_VOL_MEAN_WINDOWS, run_strategy_kernel, run_threshold_batch
+from backtest.indicators import IndicatorCache
+from backtest.parallel import can_fork
+
+# Configuration
+UNIVERSE_SIZES = [6, 50, 500, 5000]
+YEARS = 30
+TRADING_DAYS_PER_YEAR = 252
+SEED = 42
+INITIAL_CASH = 100000
+TRIM_THRESHOLDS = [0.50, 1.00, 1.50]
+TRIM_PERCENTAGE = 0.20
+VOLATILITY_THRESHOLD = 2.0
+TIME_BUDGET_SECONDS = 120     # Skip larger universes once a run exceeds this
+RESULTS_FILE = os.path.join('results_benchmark', 'scaling.csv')
+
+ENGINES = ('kernel', 'batch', 'trim_strategy')
+
+# Reinvestment modes each engine supports
+ENGINE_MODES = {
+    'kernel': REINVEST_MODES,
+    'batch': ('pro_rata', 'spy', 'cash'),
+    'trim_strategy': ('pro_rata', 'spy', 'cash'),
+}
+
+# Basket used by the kernel's 'basket' mode
+BASKET_WEIGHTS = {'SPY': 0.6, 'QQQ': 0.4}
+
+RESULT_COLUMNS = ['timestamp', 'commit', 'host', 'engine', 'strategy', 'reinvest_mode',
+                  'num_tickers', 'num_days', 'status', 'wall_seconds', 'per_day_us',
+                  'per_ticker_day_ns', 'peak_rss_mb', 'rss_delta_mb', 'num_trades',
+                  'final_value']
+
+# Universe shared with forked children; set by benchmark_universe()
+_universe = {}
+
+
+# ============================================================================
+# ENGINE RUNNERS (each returns (num_trades, final_value))
+# ============================================================================
+
+def run_kernel(mode, strategy):
+    u = _universe
+    result = run_strategy_kernel(
+        strategy, VOLATILITY_THRESHOLD if strategy == 'volatility' else TRIM_THRESHOLDS[0], mode,
+        u['prices'], u['dates'], u['tickers'], u['initial_shares'],
+        spy_vol_avg=u['spy_vol_avg'].get(mode),
+        basket_weights=BASKET_WEIGHTS,
+        trim_percentage=TRIM_PERCENTAGE,
+        **u['indicators'])
+    return len(result['trades']), float(result['total_value'][-1])
+
+
+def run_batch(mode, strategy):
+    u = _universe
+    result = run_threshold_batch(
+        u['prices'], u['tickers'], u['initial_shares'],
+        thresholds=TRIM_THRESHOLDS,
+        trim_sizes=[TRIM_PERCENTAGE] * len(TRIM_THRESHOLDS),
+        reinvest_modes=[mode] * len(TRIM_THRESHOLDS))
+    return int(result['num_trims'].sum()), float(result['final_value'][0])
+
+
+def run_trim_strategy(mode, strategy):
+    from backtest.run_backtest import TrimStrategy
+
+    u = _universe
+    initial_shares = dict(zip(u['tickers'], u['initial_shares'].tolist()))
+    result = TrimStrategy(u['price_df'], initial_shares, TRIM_THRESHOLDS[0], TRIM_PERCENTAGE,
+                          mode, init_cash=INITIAL_CASH, cash_sharing=True).run_backtest()
+    return len(result.trades), float(result.total_value[-1])
+
+
+RUNNERS = {
+    'kernel': run_kernel,
+    'batch': run_batch,
+    'trim_strategy': run_trim_strategy,
+}
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def current_rss_mb():
+    """Resident set size of this process now (Linux; None elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def measure(func, *args):
+    """Run func(*args) and return a dict with status, timing, RSS and its result"""
+    start_rss = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        num_trades, final_value = func(*args)
+        status = 'ok'
+    except MemoryError:
+        num_trades, final_value, status = None, None, 'out_of_memory'
+    wall = time.perf_counter() - start
+    peak = peak_rss_mb()
+    return {
+        'status': status,
+        'wall_seconds': wall,
+        'peak_rss_mb': peak,
+        'rss_delta_mb': peak - start_rss if start_rss is not None else None,
+        'num_trades': num_trades,
+        'final_value': final_value,
+    }
+
+
+def _measure_in_child(connection, func, args):
+    connection.send(measure(func, *args))
+    connection.close()
+
+
+def measure_isolated(func, *args):
+    """measure() in a forked child (own peak RSS); in-process where fork is unavailable"""
+    if not can_fork():
+        return measure(func, *args)
+
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_in_child, args=(sender, func, args))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        # Child died without reporting (e.g. killed by the OOM killer)
+        result = {'status': f'crashed (exit code {process.exitcode})'}
+    process.join()
+    return result
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def benchmark_universe(num_tickers, num_days, strategy, need_daily_indicators):
+    """Generate the panel and indicators shared by every run at one size; returns the indicator timing"""
+    price_df = generate_price_panel(num_tickers, num_days, seed=SEED)
+    prices = price_df.to_numpy()
+    tickers = list(price_df.columns)
+
+    _universe.clear()
+    _universe.update(
+        price_df=price_df,
+        prices=prices,
+        dates=price_df.index,
+        tickers=tickers,
+        initial_shares=INITIAL_CASH / num_tickers / prices[0],
+        indicators={},
+        spy_vol_avg={},
+    )
+
+    def compute():
+        indicators = IndicatorCache(price_df)
+        if strategy == 'momentum':
+            _universe['indicators'].update(ma_200=indicators.get('sma', 200),
+                                           momentum_20=indicators.get('momentum', 20))
+        if strategy == 'volatility' or need_daily_indicators:
+            _universe['indicators']['volatility_30'] = indicators.get('volatility', 30)
+        if strategy == 'volatility':
+            _universe['indicators']['volatility_252_median'] = indicators.get('volatility_median', 252)
+        if need_daily_indicators and 'SPY' in tickers:
+            for mode, mean_window in REINVEST_VOL_MEAN_WINDOWS.items():
+                _universe['spy_vol_avg'][mode] = indicators.trailing_mean('volatility', 30, 'SPY', mean_window)
+        return 0, None
+
+    # Computed in this process so forked runs share the matrices
+    return measure(compute)
+
+
+def git_commit():
+    """Short hash of HEAD ('unknown' outside a git checkout)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def append_rows(path, rows):
+    """Append result rows to the CSV (header written when the file is new)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def make_row(context, engine, mode, num_tickers, num_days, measured):
+    row = dict(context, engine=engine, reinvest_mode=mode,
+               num_tickers=num_tickers, num_days=num_days)
+    row.update(measured)
+    wall = measured.get('wall_seconds')
+    if wall is not None:
+        row['per_day_us'] = wall / num_days * 1e6
+        row['per_ticker_day_ns'] = wall / (num_days * num_tickers) * 1e9
+    for key in ('wall_seconds', 'per_day_us', 'per_ticker_day_ns', 'peak_rss_mb', 'rss_delta_mb'):
+        if row.get(key) is not None:
+            row[key] = round(row[key], 3)
+    return row
+
+
+def parse_list(text, cast=str):
+    return [cast(item) for item in text.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark engine scaling with universe size')
+    parser.add_argument('--tickers', default=','.join(map(str, UNIVERSE_SIZES)),
+                        help='comma-separated universe sizes (default: %(default)s)')
+    parser.add_argument('--years', type=float, default=YEARS, help='years of daily prices (default: %(default)s)')
+    parser.add_argument('--engines', default=','.join(ENGINES), help='comma-separated engines (default: all)')
+    parser.add_argument('--modes', default=None, help='comma-separated reinvest modes (default: all each engine supports)')
+    parser.add_argument('--strategy', default='threshold', choices=('threshold', 'momentum', 'volatility'),
+                        help='kernel trim strategy (default: %(default)s)')
+    parser.add_argument('--time-budget', type=float, default=TIME_BUDGET_SECONDS,
+                        help='seconds after which larger universes are skipped (default: %(default)s)')
+    parser.add_argument('--output', default=RESULTS_FILE, help='CSV to append to (default: %(default)s)')
+    parser.add_argument('--quick', action='store_true', help='small smoke run (6 and 50 tickers, 2 years)')
+    args = parser.parse_args()
+
+    sizes = [6, 50] if args.quick else sorted(parse_list(args.tickers, int))
+    num_days = int(round((2 if args.quick else args.years) * TRADING_DAYS_PER_YEAR))
+    engines = parse_list(args.engines)
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        print(f"❌ Unknown engine(s): {', '.join(sorted(unknown))} (choose from {', '.join(ENGINES)})")
+        return 1
+
+    cases = []
+    for engine in engines:
+        modes = ENGINE_MODES[engine] if args.modes is None else parse_list(args.modes)
+        cases.extend((engine, mode) for mode in modes if mode in ENGINE_MODES[engine])
+    need_daily_indicators = any(engine == 'kernel' and mode in REINVEST_VOL_MEAN_WINDOWS
+                                for engine, mode in cases)
+
+    print("="*80)
+    print("UNIVERSE SCALING BENCHMARK")
+    print("="*80)
+    print(f"\n  Universe sizes: {', '.join(f'{n:,}' for n in sizes)} tickers")
+    print(f"  Days: {num_days:,} ({num_days / TRADING_DAYS_PER_YEAR:.0f} years)")
+    print(f"  Runs per size: {len(cases)} ({', '.join(engines)})")
+    print(f"  Isolation: {'forked child per run' if can_fork() else 'in-process (no fork)'}")
+
+    context = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'host': f"{platform.node()} ({platform.machine()}, {os.cpu_count()} cpu)",
+        'strategy': args.strategy,
+    }
+
+    over_budget = set()
+    all_rows = []
+    for num_tickers in sizes:
+        print(f"\n🔄 {num_tickers:,} tickers x {num_days:,} days")
+
+        indicator_run = benchmark_universe(num_tickers, num_days, args.strategy, need_daily_indicators)
+        rows = [make_row(context, 'indicators', '-', num_tickers, num_days, indicator_run)]
+        print(f"  ✓ indicators: {indicator_run['wall_seconds']:.2f}s")
+
+        for engine, mode in cases:
+            if (engine, mode) in over_budget:
+                rows.append(make_row(context, engine, mode, num_tickers, num_days, {'status': 'skipped'}))
+                print(f"  - {engine} ({mode}): skipped (over time budget at a smaller size)")
+                continue
+
+            measured = measure_isolated(RUNNERS[engine], mode, args.strategy)
+            rows.append(make_row(context, engine, mode, num_tickers, num_days, measured))
+
+            if measured['status'] != 'ok':
+                over_budget.add((engine, mode))
+                print(f"  ✗ {engine} ({mode}): {measured['status']}")
+                continue
+            if measured['wall_seconds'] > args.time_budget:
+                over_budget.add((engine, mode))
+            print(f"  ✓ {engine} ({mode}): {measured['wall_seconds']:.2f}s, "
+                  f"{measured['wall_seconds'] / num_days * 1e6:,.1f} µs/day, "
+                  f"peak RSS {measured['peak_rss_mb']:,.0f} MB")
+
+        # Written per size, so a long run keeps its finished results
+        append_rows(args.output, rows)
+        all_rows.extend(rows)
+
+    print("\n" + "="*80)
+    print("✅ BENCHMARK COMPLETE")
+    print("="*80)
+
+    print(f"\n📊 Per-day cost (µs/day) by universe size:\n")
+    header = f"  {'engine (mode)':<32}" + ''.join(f"{n:>12,}" for n in sizes)
+    print(header)
+    for engine, mode in [('indicators', '-')] + cases:
+        label = engine if mode == '-' else f"{engine} ({mode})"
+        cells = []
+        for num_tickers in sizes:
+            row = next(r for r in all_rows if r['engine'] == engine and r['reinvest_mode'] == mode
+                       and r['num_tickers'] == num_tickers)
+            cells.append(f"{row['per_day_us']:>12,.1f}" if row.get('per_day_us') is not None
+                         else f"{row['status']:>12}")
+        print(f"  {label:<32}" + ''.join(cells))
+
+    print(f"\n✓ Results appended to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
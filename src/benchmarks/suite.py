@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+"""
+Hot-Path Benchmark Suite
+
+Times each stage of a backtest run on fixed fixtures and compares the
+medians to a stored baseline, flagging stages that got slower than the
+tolerance allows.
+
+Stages:
+    csv_parse          parse the Yahoo CSVs in data/
+    store_build        build a price store from data/
+    price_load         aligned price matrix from the store
+    indicators         SMA / momentum / volatility / volatility median
+    daily_loop         NumPy kernel over the index-focus strategy grid (data/)
+    daily_loop_panel   NumPy kernel on the synthetic panel
+    trim_strategy      TrimStrategy daily loop (data/)
+    calculate_metrics  calculate_metrics with rolling windows
+    sweep_metrics      all index-focus strategies' metrics in one batched call
+    bootstrap          1,000-sample bootstrap CIs
+    exports            validator files for one strategy
+    chart              one portfolio-value chart (needs matplotlib)
+
+Fixtures are the index-focus portfolio loaded from data/ and a seeded
+synthetic panel (data.generate_price_panel); stages whose fixture or
+library is missing are reported as skipped.
+
+Results go to results_benchmark/suite/<commit>.json. --save-baseline also
+writes them to results_benchmark/suite/baseline.json, which later runs
+compare against (or any earlier commit: --baseline <commit>). Exits with 1
+if any stage regressed.
+
+Usage:
+    python src/benchmarks/suite.py                       # run and compare to the baseline
+    python src/benchmarks/suite.py --save-baseline       # run and make it the new baseline
+    python src/benchmarks/suite.py --baseline 9923737 --tolerance 0.25
+    python src/benchmarks/suite.py --stages daily_loop,bootstrap --repeats 10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.data import allocate_initial_shares, generate_price_panel
+from backtest.engine import REINVEST_VOL_MEAN_WINDOWS, history_frame, run_strategy_kernel
+from backtest.indicators import INDICATORS, IndicatorCache
+from backtest.io import save_strategy_files
+from backtest.metrics import calculate_batch_metrics, calculate_bootstrap_ci, calculate_metrics
+from backtest.price_store import PriceStore, read_yahoo_close
+from backtest import run_backtest_index_focus as index_focus
+from benchmarks.scaling import git_commit
+
+# Configuration
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
+RESULTS_DIR = os.path.join('results_benchmark', 'suite')
+BASELINE_NAME = 'baseline'
+
+REPEATS = 5
+WARMUP = 1
+TOLERANCE = 0.15             # Flag stages more than 15% slower than the baseline
+MIN_DELTA_SECONDS = 0.002    # ... and at least 2 ms slower (timer noise on tiny stages)
+
+PANEL_TICKERS = 500
+PANEL_DAYS = 2520            # 10 years
+SEED = 42
+BOOTSTRAP_SAMPLES = 1000
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def build_fixtures(quick=False):
+    """Load data/ and generate the synthetic panel once; nothing here is timed"""
+    fixtures = {'tmp_dir': tempfile.mkdtemp(prefix='backtest_bench_')}
+
+    panel = generate_price_panel(100 if quick else PANEL_TICKERS, 504 if quick else PANEL_DAYS, seed=SEED)
+    fixtures['panel'] = panel
+    fixtures['panel_indicators'] = panel_indicators = IndicatorCache(panel)
+    fixtures['panel_shares'] = 100000 / panel.shape[1] / panel.to_numpy()[0]
+    fixtures['panel_ma_200'] = panel_indicators.get('sma', 200)
+
+    csv_files = sorted(f for f in os.listdir(DATA_DIR) if f.endswith('.csv')) if os.path.isdir(DATA_DIR) else []
+    if not csv_files:
+        return fixtures
+
+    store = PriceStore.build(DATA_DIR, os.path.join(fixtures['tmp_dir'], 'price_store'))
+    price_df = store.load(index_focus.TICKERS, index_focus.START_DATE, index_focus.END_DATE)
+    tickers = list(price_df.columns)
+    indicators = IndicatorCache(price_df)
+
+    spy_vol_avg = {}
+    if 'SPY' in tickers:
+        for mode, mean_window in REINVEST_VOL_MEAN_WINDOWS.items():
+            spy_vol_avg[mode] = indicators.trailing_mean('volatility', 30, 'SPY', mean_window)
+
+    initial_shares = allocate_initial_shares(price_df, tickers, index_focus.INITIAL_CASH,
+                                             index_focus.PORTFOLIO_CONFIG)
+    fixtures.update(
+        csv_files=[os.path.join(DATA_DIR, f) for f in csv_files],
+        store=store,
+        price_df=price_df,
+        tickers=tickers,
+        initial_shares=initial_shares,
+        share_array=np.array([initial_shares[t] for t in tickers]),
+        indicators=dict(
+            ma_200=indicators.get('sma', 200),
+            momentum_20=indicators.get('momentum', index_focus.MOMENTUM_LOOKBACK),
+            volatility_30=indicators.get('volatility', 30),
+            volatility_252_median=indicators.get('volatility_median', 252),
+        ),
+        spy_vol_avg=spy_vol_avg,
+    )
+
+    # One strategy's output feeds the metrics, export and chart stages
+    result = run_data_strategy(fixtures, 'threshold', 0.50, 'pro_rata')
+    fixtures['result'] = result
+    fixtures['value_series'] = pd.Series(result['total_value'], index=price_df.index)
+    return fixtures
+
+
+def sweep_values(fixtures):
+    """Total_Value of every index-focus strategy (days x strategies), built on first use"""
+    if 'sweep_values' not in fixtures:
+        require(fixtures, 'price_df')
+        fixtures['sweep_values'] = pd.DataFrame(
+            {name: run_data_strategy(fixtures, strategy_type, param, mode)['total_value']
+             for name, strategy_type, param, mode in index_focus.build_jobs()},
+            index=fixtures['price_df'].index)
+    return fixtures['sweep_values']
+
+
+def run_data_strategy(fixtures, strategy_type, param, mode):
+    return run_strategy_kernel(
+        strategy_type, param, mode,
+        fixtures['price_df'].to_numpy(), fixtures['price_df'].index, fixtures['tickers'],
+        fixtures['share_array'],
+        spy_vol_avg=fixtures['spy_vol_avg'].get(mode),
+        trim_percentage=index_focus.TRIM_PERCENTAGE,
+        momentum_threshold=index_focus.MOMENTUM_THRESHOLD,
+        volatility_cooldown_days=index_focus.VOLATILITY_COOLDOWN_DAYS,
+        volatility_hysteresis=index_focus.VOLATILITY_HYSTERESIS,
+        **fixtures['indicators'])
+
+
+def require(fixtures, key):
+    if key not in fixtures:
+        raise FileNotFoundError(f"no CSV files in {DATA_DIR}")
+    return fixtures[key]
+
+
+# ============================================================================
+# STAGES (each returns the function to time)
+# ============================================================================
+
+def stage_csv_parse(fixtures):
+    csv_files = require(fixtures, 'csv_files')
+    return lambda: [read_yahoo_close(f) for f in csv_files]
+
+
+def stage_store_build(fixtures):
+    require(fixtures, 'csv_files')
+    store_dir = os.path.join(fixtures['tmp_dir'], 'store_build')
+
+    def run():
+        shutil.rmtree(store_dir, ignore_errors=True)
+        PriceStore.build(DATA_DIR, store_dir)
+    return run
+
+
+def stage_price_load(fixtures):
+    store = require(fixtures, 'store')
+    return lambda: store.load(index_focus.TICKERS, index_focus.START_DATE, index_focus.END_DATE)
+
+
+def stage_indicators(fixtures):
+    panel = fixtures['panel']
+
+    # The indicator functions themselves (IndicatorCache would answer from its memo)
+    def run():
+        for name, window in (('sma', 200), ('momentum', 20), ('volatility', 30), ('volatility_median', 252)):
+            INDICATORS[name](panel, window)
+    return run
+
+
+def stage_daily_loop(fixtures):
+    require(fixtures, 'price_df')
+    jobs = index_focus.build_jobs()
+    return lambda: [run_data_strategy(fixtures, strategy_type, param, mode)
+                    for _, strategy_type, param, mode in jobs]
+
+
+def stage_daily_loop_panel(fixtures):
+    panel = fixtures['panel']
+    prices = panel.to_numpy()
+
+    def run():
+        for mode in ('pro_rata', 'spy', 'cash'):
+            run_strategy_kernel('threshold', 0.50, mode, prices, panel.index, list(panel.columns),
+                                fixtures['panel_shares'])
+        run_strategy_kernel('momentum', None, 'pro_rata', prices, panel.index, list(panel.columns),
+                            fixtures['panel_shares'], ma_200=fixtures['panel_ma_200'],
+                            momentum_20=fixtures['panel_indicators'].get('momentum', 20))
+    return run
+
+
+def stage_trim_strategy(fixtures):
+    from backtest.run_backtest import TrimStrategy
+
+    price_df = require(fixtures, 'price_df')
+    strategy = TrimStrategy(price_df, fixtures['initial_shares'], 0.50, index_focus.TRIM_PERCENTAGE,
+                            'pro_rata', init_cash=0, cash_sharing=True)
+    return strategy.run_backtest
+
+
+def stage_calculate_metrics(fixtures):
+    values = require(fixtures, 'value_series')
+    return lambda: calculate_metrics(values, index_focus.INITIAL_CASH,
+                                     rolling_windows=index_focus.ROLLING_WINDOWS)
+
+
+def stage_sweep_metrics(fixtures):
+    values = sweep_values(fixtures)
+    return lambda: calculate_batch_metrics(values, index_focus.INITIAL_CASH,
+                                           rolling_windows=index_focus.ROLLING_WINDOWS,
+                                           n_bootstrap=BOOTSTRAP_SAMPLES, bootstrap_seed=SEED)
+
+
+def stage_bootstrap(fixtures):
+    values = require(fixtures, 'value_series')
+    return lambda: calculate_bootstrap_ci(values, n_bootstrap=BOOTSTRAP_SAMPLES, seed=SEED)
+
+
+def stage_exports(fixtures):
+    result = require(fixtures, 'result')
+    price_df = fixtures['price_df']
+    portfolio_value_df = history_frame(result['holdings'], price_df.index, fixtures['tickers'],
+                                       cash=result['cash_history'], total_value=result['total_value'])
+    metrics = calculate_metrics(fixtures['value_series'], index_focus.INITIAL_CASH)
+    trades = result['trades'].to_frame()
+    export_dir = os.path.join(fixtures['tmp_dir'], 'exports')
+    return lambda: save_strategy_files(export_dir, 'trim_50pct_pro_rata', portfolio_value_df, metrics,
+                                       trades, {'strategy': 'threshold', 'threshold': 0.50})
+
+
+def stage_chart(fixtures):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    values = require(fixtures, 'value_series')
+    path = os.path.join(fixtures['tmp_dir'], 'chart.png')
+
+    def run():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(values.index, values.to_numpy(), linewidth=1.5)
+        ax.set_title('Portfolio Value')
+        fig.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+    return run
+
+
+STAGES = {
+    'csv_parse': stage_csv_parse,
+    'store_build': stage_store_build,
+    'price_load': stage_price_load,
+    'indicators': stage_indicators,
+    'daily_loop': stage_daily_loop,
+    'daily_loop_panel': stage_daily_loop_panel,
+    'trim_strategy': stage_trim_strategy,
+    'calculate_metrics': stage_calculate_metrics,
+    'sweep_metrics': stage_sweep_metrics,
+    'bootstrap': stage_bootstrap,
+    'exports': stage_exports,
+    'chart': stage_chart,
+}
+
+
+# ============================================================================
+# TIMING & COMPARISON
+# ============================================================================
+
+def time_stage(func, repeats=REPEATS, warmup=WARMUP):
+    """Run func warmup + repeats times (stdout silenced); returns the timed durations in seconds"""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for run in range(warmup + repeats):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            if run >= warmup:
+                times.append(elapsed)
+    return times
+
+
+def run_suite(stage_names, repeats, quick=False):
+    """Time the chosen stages; returns dict of stage name -> timing summary"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        fixtures = build_fixtures(quick)
+
+    stages = {}
+    try:
+        for name in stage_names:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    func = STAGES[name](fixtures)
+            except (ImportError, FileNotFoundError) as e:
+                stages[name] = {'status': 'skipped', 'reason': str(e)}
+                print(f"  - {name}: skipped ({e})")
+                continue
+
+            times = time_stage(func, repeats)
+            stages[name] = {
+                'status': 'ok',
+                'median_seconds': statistics.median(times),
+                'min_seconds': min(times),
+                'mean_seconds': statistics.fmean(times),
+                'times': times,
+            }
+            print(f"  ✓ {name:<20} median {statistics.median(times) * 1000:>10.2f} ms"
+                  f"   (min {min(times) * 1000:.2f} ms)")
+    finally:
+        shutil.rmtree(fixtures['tmp_dir'], ignore_errors=True)
+    return stages
+
+
+def compare(stages, baseline, tolerance, min_delta=MIN_DELTA_SECONDS):
+    """
+    Compare stage medians to a baseline run
+
+    Returns:
+        dict of stage name -> {'baseline', 'current', 'ratio', 'regressed'}
+        for stages timed in both runs
+    """
+    comparison = {}
+    for name, current in stages.items():
+        previous = baseline['stages'].get(name, {})
+        if current.get('status') != 'ok' or previous.get('status') != 'ok':
+            continue
+        before, after = previous['median_seconds'], current['median_seconds']
+        comparison[name] = {
+            'baseline': before,
+            'current': after,
+            'ratio': after / before if before > 0 else float('inf'),
+            'regressed': after > before * (1 + tolerance) and after - before > min_delta,
+        }
+    return comparison
+
+
+def resolve_baseline(name, results_dir):
+    """Baseline file for a name ('baseline', a commit hash or a path); None if it does not exist"""
+    path = name if name.endswith('.json') else os.path.join(results_dir, f"{name}.json")
+    return path if os.path.exists(path) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the backtest hot paths and flag regressions')
+    parser.add_argument('--stages', default=None, help='comma-separated stages (default: all)')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help='timed runs per stage (default: %(default)s)')
+    parser.add_argument('--baseline', default=BASELINE_NAME,
+                        help="baseline to compare against: 'baseline', a commit hash or a JSON path")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='allowed slowdown as a fraction of the baseline median (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true', help='also store this run as the baseline')
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help='where results are stored (default: %(default)s)')
+    parser.add_argument('--quick', action='store_true', help='smaller synthetic panel and 2 repeats')
+    args = parser.parse_args()
+
+    stage_names = list(STAGES) if args.stages is None else [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stage_names if s not in STAGES]
+    if unknown:
+        print(f"❌ Unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+        return 1
+    repeats = 2 if args.quick else args.repeats
+
+    print("="*80)
+    print("HOT-PATH BENCHMARK SUITE")
+    print("="*80)
+
+    commit = git_commit()
+    print(f"\n  Commit: {commit}")
+    print(f"  Stages: {len(stage_names)}, {repeats} timed runs each (+{WARMUP} warmup)")
+    print(f"\n⏱️  Timing stages...\n")
+
+    stages = run_suite(stage_names, repeats, args.quick)
+
+    run = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'quick': args.quick,
+        'repeats': repeats,
+        'stages': stages,
+    }
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    run_path = os.path.join(args.results_dir, f"{commit}.json")
+    baseline_path = resolve_baseline(args.baseline, args.results_dir)
+    baseline = None
+    if baseline_path is not None and os.path.abspath(baseline_path) != os.path.abspath(run_path):
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+
+    with open(run_path, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\n✓ Results saved to: {run_path}")
+
+    if args.save_baseline:
+        with open(os.path.join(args.results_dir, f"{BASELINE_NAME}.json"), 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"✓ Saved as baseline")
+
+    if baseline is None:
+        print(f"\n⚠️  No baseline '{args.baseline}' to compare against (run with --save-baseline)")
+        return 0
+
+    if baseline.get('quick') != args.quick:
+        print(f"\n⚠️  Baseline was {'a --quick' if baseline.get('quick') else 'a full'} run; timings are not comparable")
+
+    comparison = compare(stages, baseline, args.tolerance)
+    regressions = [name for name, c in comparison.items() if c['regressed']]
+
+    print("\n" + "="*80)
+    print(f"COMPARISON WITH BASELINE ({baseline.get('commit', '?')}, tolerance {args.tolerance:.0%})")
+    print("="*80 + "\n")
+    print(f"  {'stage':<20} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, c in comparison.items():
+        flag = '  ❌ REGRESSION' if c['regressed'] else ''
+        print(f"  {name:<20} {c['baseline'] * 1000:>9.2f} ms {c['current'] * 1000:>9.2f} ms "
+              f"{c['ratio'] - 1:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} stage(s) slower than the baseline: {', '.join(regressions)}")
+        return 1
+
+    print(f"\n✅ No stage slower than the baseline by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,58 +1,49 @@
 #!/usr/bin/env python
 """
-Download historical data one ticker at a time with long delays
-This avoids rate limiting by being very conservative
+Download historical data into manual_data/*.csv
+
+Tickers are fetched through backtest/fetch.py: concurrent requests paced by
+a rate limiter (instead of a 2-minute wait per ticker), retried with backoff
+on errors, and cached in the price store so re-running only downloads the
+days that are missing.
 """
 
-import yfinance as yf
-import pandas as pd
-import time
 import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.fetch import fetch_prices
 
 TICKERS = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'SPY', 'QQQ']
 START_DATE = '2015-01-01'
 END_DATE = '2024-11-05'
 OUTPUT_DIR = 'manual_data'
+SOURCE = 'yfinance'
+STORE_DIR = os.path.join(OUTPUT_DIR, 'fetched')
+RATE_PER_SECOND = 0.5     # Conservative: one request every 2 seconds
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 print("="*80)
-print("DOWNLOADING HISTORICAL DATA (SLOW & CAREFUL)")
+print("DOWNLOADING HISTORICAL DATA (RATE-LIMITED)")
 print("="*80)
-print(f"\nThis will take ~10 minutes to avoid rate limits")
-print(f"Downloading {len(TICKERS)} tickers with 2-minute delays\n")
-
-for i, ticker in enumerate(TICKERS, 1):
-    print(f"\n[{i}/{len(TICKERS)}] Downloading {ticker}...")
-
-    try:
-        # Download data
-        data = yf.download(
-            ticker,
-            start=START_DATE,
-            end=END_DATE,
-            progress=False,
-            auto_adjust=True
-        )
-
-        if not data.empty:
-            # Save to CSV
-            filename = f"{OUTPUT_DIR}/{ticker}.csv"
-            data.to_csv(filename)
-
-            print(f"  ✓ Success: {len(data)} days saved to {filename}")
-            print(f"  Price range: ${data['Close'].iloc[0]:.2f} → ${data['Close'].iloc[-1]:.2f}")
-        else:
-            print(f"  ✗ No data received")
+print(f"\nDownloading {len(TICKERS)} tickers at up to {RATE_PER_SECOND} requests/second\n")
 
-    except Exception as e:
-        print(f"  ✗ Error: {str(e)[:100]}")
+store, report = fetch_prices(TICKERS, START_DATE, END_DATE, source=SOURCE, store_dir=STORE_DIR,
+                             rate=RATE_PER_SECOND, burst=1)
 
-    # Wait 2 minutes between tickers (except after last one)
-    if i < len(TICKERS):
-        print(f"\n  ⏳ Waiting 2 minutes before next ticker...")
-        print(f"     (This avoids rate limiting)")
-        time.sleep(120)  # 2 minutes
+# Save one CSV per ticker (Date, Close) for the CSV-based backtests
+if store is not None:
+    for ticker in TICKERS:
+        data = store.load([ticker], START_DATE, END_DATE)
+        if data.empty:
+            continue
+        filename = f"{OUTPUT_DIR}/{ticker}.csv"
+        data.rename(columns={ticker: 'Close'}).to_csv(filename)
+        print(f"  ✓ {ticker}: {len(data)} days saved to {filename}")
+        print(f"    Price range: ${data[ticker].iloc[0]:.2f} → ${data[ticker].iloc[-1]:.2f}")
 
 print("\n" + "="*80)
 print("DOWNLOAD COMPLETE")
@@ -1,15 +1,24 @@
 #!/usr/bin/env python
 """
 Download data using yfinance_cache (bypasses rate limits)
+
+Goes through backtest/fetch.py, so only days missing from the local price
+store are requested.
 """
 
-import yfinance_cache as yfc
 import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.fetch import fetch_prices
 
 TICKERS = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'SPY', 'QQQ']
 START_DATE = '2015-01-01'
 END_DATE = '2024-11-05'
 OUTPUT_DIR = 'manual_data'
+STORE_DIR = os.path.join(OUTPUT_DIR, 'fetched')
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -17,24 +26,21 @@ print("="*80)
 print("DOWNLOADING DATA WITH yfinance_cache")
 print("="*80)
 
+store, report = fetch_prices(TICKERS, START_DATE, END_DATE, source='yfinance_cache', store_dir=STORE_DIR)
+
 success_count = 0
 
 for i, ticker in enumerate(TICKERS, 1):
-    print(f"\n[{i}/{len(TICKERS)}] Downloading {ticker}...", end=' ')
-
-    try:
-        data = yfc.download(ticker, start=START_DATE, end=END_DATE, progress=False)
-
-        if len(data) > 0:
-            filename = f"{OUTPUT_DIR}/{ticker}.csv"
-            data.to_csv(filename)
-            print(f"✓ {len(data)} days saved")
-            success_count += 1
-        else:
-            print(f"✗ No data")
-
-    except Exception as e:
-        print(f"✗ Error: {str(e)[:50]}")
+    print(f"\n[{i}/{len(TICKERS)}] Saving {ticker}...", end=' ')
+
+    data = store.load([ticker], START_DATE, END_DATE) if store is not None else None
+    if data is not None and len(data) > 0:
+        filename = f"{OUTPUT_DIR}/{ticker}.csv"
+        data.rename(columns={ticker: 'Close'}).to_csv(filename)
+        print(f"✓ {len(data)} days saved")
+        success_count += 1
+    else:
+        print(f"✗ {report['failed'].get(ticker, 'No data')[:50]}")
 
 print("\n" + "="*80)
 print(f"Downloaded {success_count}/{len(TICKERS)} tickers successfully")
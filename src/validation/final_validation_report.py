@@ -8,357 +8,372 @@ This is the authoritative validation that properly accounts for:
 3. All strategy-specific requirements
 """
 
+import argparse
+import os
+import sys
 import pandas as pd
 import numpy as np
-import json
 from datetime import datetime
 from pathlib import Path
 
-results_dir = Path('/Users/austinwallace/sandbox/stock_strategies/trim_strat_test/results')
-timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-print("\n")
-print("╔" + "=" * 78 + "╗")
-print("║" + " " * 20 + "FINAL VALIDATION REPORT" + " " * 35 + "║")
-print("║" + " " * 15 + "Strategy: Trim@+50% (dip-buy-5pct)" + " " * 29 + "║")
-print("╚" + "=" * 78 + "╝")
-print("\n")
-
-# ============================================================================
-# LOAD ALL DATA
-# ============================================================================
-
-print("=" * 80)
-print("1. LOADING DATA FILES")
-print("=" * 80)
-
-with open(results_dir / 'trim_50pct_dip_buy_5pct_metadata.json', 'r') as f:
-    metadata = json.load(f)
-
-metrics = pd.read_csv(results_dir / 'trim_50pct_dip_buy_5pct_metrics.csv')
-trades = pd.read_csv(results_dir / 'trim_50pct_dip_buy_5pct_trades.csv')
-trades['date'] = pd.to_datetime(trades['date'])
-
-portfolio = pd.read_csv(results_dir / 'trim_50pct_dip_buy_5pct_portfolio_value.csv', index_col=0)
-portfolio.index = pd.to_datetime(portfolio.index)
-
-print(f"✓ Loaded metadata: {len(metadata['dip_buys'])} dip-buy events")
-print(f"✓ Loaded {len(trades)} trim events")
-print(f"✓ Loaded portfolio time series: {len(portfolio)} trading days")
-print(f"✓ Period: {portfolio.index[0].strftime('%Y-%m-%d')} to {portfolio.index[-1].strftime('%Y-%m-%d')}")
-print()
-
-# ============================================================================
-# VALIDATE PERFORMANCE METRICS
-# ============================================================================
-
-print("=" * 80)
-print("2. VALIDATING PERFORMANCE METRICS")
-print("=" * 80)
-
-reported = metrics.iloc[0]
-initial_capital = metadata['initial_capital']
-final_value = portfolio['Total_Value'].iloc[-1]
-
-print("\n[2.1] Total Return")
-print("-" * 40)
-calc_total_return = (final_value - initial_capital) / initial_capital
-print(f"  Reported:   {reported['total_return']:.6f} ({reported['total_return']*100:.2f}%)")
-print(f"  Calculated: {calc_total_return:.6f} ({calc_total_return*100:.2f}%)")
-print(f"  Difference: {abs(calc_total_return - reported['total_return']):.8f}")
-print(f"  Status: {'✓ PASS' if abs(calc_total_return - reported['total_return']) < 1e-6 else '✗ FAIL'}")
-
-print("\n[2.2] CAGR (Compound Annual Growth Rate)")
-print("-" * 40)
-num_trading_days = len(portfolio)
-years_trading = num_trading_days / 252  # Trading days method
-calc_cagr = (1 + calc_total_return) ** (1 / years_trading) - 1
-print(f"  Trading days: {num_trading_days}")
-print(f"  Years (252 days/year): {years_trading:.6f}")
-print(f"  Reported:   {reported['cagr']:.6f} ({reported['cagr']*100:.2f}%)")
-print(f"  Calculated: {calc_cagr:.6f} ({calc_cagr*100:.2f}%)")
-print(f"  Difference: {abs(calc_cagr - reported['cagr']):.8f}")
-print(f"  Status: {'✓ PASS' if abs(calc_cagr - reported['cagr']) < 1e-6 else '✗ FAIL'}")
-
-print("\n[2.3] Maximum Drawdown")
-print("-" * 40)
-cummax = portfolio['Total_Value'].cummax()
-drawdown = (portfolio['Total_Value'] - cummax) / cummax
-calc_max_dd = drawdown.min()
-max_dd_date = drawdown.idxmin()
-print(f"  Reported:   {reported['max_drawdown']:.6f} ({reported['max_drawdown']*100:.2f}%)")
-print(f"  Calculated: {calc_max_dd:.6f} ({calc_max_dd*100:.2f}%)")
-print(f"  Occurred:   {max_dd_date.strftime('%Y-%m-%d')}")
-print(f"  Difference: {abs(calc_max_dd - reported['max_drawdown']):.8f}")
-print(f"  Status: {'✓ PASS' if abs(calc_max_dd - reported['max_drawdown']) < 1e-6 else '✗ FAIL'}")
-
-print("\n[2.4] Volatility (Annualized)")
-print("-" * 40)
-daily_returns = portfolio['Total_Value'].pct_change().dropna()
-calc_volatility = daily_returns.std() * np.sqrt(252)  # Annualized using trading days
-print(f"  Reported:   {reported['volatility']:.6f} ({reported['volatility']*100:.2f}%)")
-print(f"  Calculated: {calc_volatility:.6f} ({calc_volatility*100:.2f}%)")
-print(f"  Difference: {abs(calc_volatility - reported['volatility']):.8f}")
-print(f"  Status: {'✓ PASS' if abs(calc_volatility - reported['volatility']) < 1e-6 else '✗ FAIL'}")
-
-print("\n[2.5] Sharpe Ratio (risk-free rate = 0)")
-print("-" * 40)
-calc_sharpe = calc_cagr / calc_volatility
-print(f"  Reported:   {reported['sharpe_ratio']:.6f}")
-print(f"  Calculated: {calc_sharpe:.6f}")
-print(f"  Difference: {abs(calc_sharpe - reported['sharpe_ratio']):.8f}")
-print(f"  Status: {'✓ PASS' if abs(calc_sharpe - reported['sharpe_ratio']) < 0.001 else '✗ FAIL'}")
-
-print("\n[2.6] Sortino Ratio (risk-free rate = 0)")
-print("-" * 40)
-downside_returns = daily_returns[daily_returns < 0]
-downside_std = downside_returns.std() * np.sqrt(252)
-calc_sortino = calc_cagr / downside_std
-print(f"  Reported:   {reported['sortino_ratio']:.6f}")
-print(f"  Calculated: {calc_sortino:.6f}")
-print(f"  Difference: {abs(calc_sortino - reported['sortino_ratio']):.8f}")
-print(f"  Status: {'✓ PASS' if abs(calc_sortino - reported['sortino_ratio']) < 0.001 else '✗ FAIL'}")
-
-print("\n[2.7] Final Portfolio Value")
-print("-" * 40)
-print(f"  Reported:   ${reported['final_value']:,.2f}")
-print(f"  Calculated: ${final_value:,.2f}")
-print(f"  Difference: ${abs(final_value - reported['final_value']):.2f}")
-print(f"  Status: {'✓ PASS' if abs(final_value - reported['final_value']) < 0.01 else '✗ FAIL'}")
-
-print("\n[2.8] Event Counts")
-print("-" * 40)
-print(f"  Trim events - Reported: {int(reported['num_trades'])}, Actual: {len(trades)}")
-print(f"  Dip-buys - Reported: {int(reported['num_dip_buys'])}, Actual: {len(metadata['dip_buys'])}")
-print(f"  Status: {'✓ PASS' if len(trades) == reported['num_trades'] and len(metadata['dip_buys']) == reported['num_dip_buys'] else '✗ FAIL'}")
-
-# ============================================================================
-# VALIDATE TRIM EVENTS
-# ============================================================================
-
-print("\n" + "=" * 80)
-print("3. VALIDATING TRIM EVENTS (50% Gain Threshold)")
-print("=" * 80)
-
-trim_threshold = metadata['trim_threshold']
-trim_percentage = metadata['trim_percentage']
-all_trims_valid = True
-
-print(f"\nStrategy Parameters:")
-print(f"  Trim threshold: {trim_threshold*100}% gain")
-print(f"  Trim amount: {trim_percentage*100}% of position")
-print()
-
-for idx, trade in trades.iterrows():
-    gain = trade['gain_pct']
-    valid = gain >= trim_threshold
-
-    if not valid:
-        all_trims_valid = False
-
-    status = "✓" if valid else "✗"
-    print(f"{status} Trim #{idx+1}: {trade['date'].strftime('%Y-%m-%d')} - {trade['ticker']}")
-    print(f"  Gain: {gain*100:.2f}% | Price: ${trade['price']:.2f} | Proceeds: ${trade['proceeds']:,.2f}")
-
-print(f"\nSummary: {len(trades)} trim events, {'ALL VALID' if all_trims_valid else 'SOME INVALID'}")
-print(f"Status: {'✓ PASS' if all_trims_valid else '✗ FAIL'}")
-
-# ============================================================================
-# VALIDATE DIP-BUY EVENTS
-# ============================================================================
-
-print("\n" + "=" * 80)
-print("4. VALIDATING DIP-BUY EVENTS (5% SPY Drop + Alternation)")
-print("=" * 80)
-
-dip_threshold = metadata['dip_threshold']
-dip_buys = metadata['dip_buys']
-all_dips_valid = True
-
-print(f"\nStrategy Parameters:")
-print(f"  Dip threshold: {dip_threshold*100}% SPY drop from recent high")
-print(f"  ETF alternation: SPY → QQQ → SPY → QQQ...")
-print()
-
-for idx, dip in enumerate(dip_buys):
-    spy_drop = dip['spy_drop_pct']
-    ticker = dip['ticker']
-    expected_ticker = 'SPY' if idx % 2 == 0 else 'QQQ'
-
-    threshold_met = spy_drop >= dip_threshold
-    alternation_correct = ticker == expected_ticker
-    valid = threshold_met and alternation_correct
-
-    if not valid:
-        all_dips_valid = False
-
-    status = "✓" if valid else "✗"
-    print(f"{status} Dip-Buy #{idx+1}: {dip['date']}")
-    print(f"  SPY drop: {spy_drop*100:.2f}% {'✓' if threshold_met else '✗ BELOW THRESHOLD'}")
-    print(f"  Ticker: {ticker} (expected: {expected_ticker}) {'✓' if alternation_correct else '✗ WRONG'}")
-    print(f"  Amount: ${dip['amount']:,.2f} → {dip['shares_bought']:.4f} shares @ ${dip['price']:.2f}")
-
-# Validate average dip size
-avg_dip = np.mean([d['spy_drop_pct'] for d in dip_buys])
-print(f"\nAverage Dip Size:")
-print(f"  Reported: {reported['avg_dip_size']*100:.2f}%")
-print(f"  Calculated: {avg_dip*100:.2f}%")
-print(f"  {'✓ PASS' if abs(avg_dip - reported['avg_dip_size']) < 0.001 else '✗ FAIL'}")
-
-print(f"\nSummary: {len(dip_buys)} dip-buy events, {'ALL VALID' if all_dips_valid else 'SOME INVALID'}")
-print(f"Status: {'✓ PASS' if all_dips_valid else '✗ FAIL'}")
-
-# ============================================================================
-# VALIDATE EVENT PAIRING & TIMING
-# ============================================================================
-
-print("\n" + "=" * 80)
-print("5. VALIDATING EVENT TIMING & PAIRING")
-print("=" * 80)
-
-print(f"\n[5.1] Event Count Matching")
-print(f"  Trim events: {len(trades)}")
-print(f"  Dip-buy events: {len(dip_buys)}")
-print(f"  Status: {'✓ PASS (1:1 ratio)' if len(trades) == len(dip_buys) else '✗ FAIL'}")
-
-print(f"\n[5.2] Chronological Order (dip-buy must occur after trim)")
-all_ordered = True
-for idx in range(min(len(trades), len(dip_buys))):
-    trim_date = trades.iloc[idx]['date']
-    dip_date = pd.to_datetime(dip_buys[idx]['date'])
-    days_between = (dip_date - trim_date).days
-
-    if dip_date < trim_date:
-        all_ordered = False
-        print(f"  ✗ Pair #{idx+1}: Dip-buy BEFORE trim (impossible)")
-    else:
-        print(f"  ✓ Pair #{idx+1}: Dip-buy {days_between} days after trim")
-
-print(f"  Status: {'✓ PASS' if all_ordered else '✗ FAIL'}")
-
-print(f"\n[5.3] Cash Management")
-cash_holdings = portfolio['Cash']
-print(f"  Maximum cash: ${cash_holdings.max():,.2f}")
-print(f"  Average cash: ${cash_holdings.mean():,.2f}")
-print(f"  Final cash: ${cash_holdings.iloc[-1]:,.2f}")
-print(f"  Status: {'✓ PASS (all cash deployed)' if cash_holdings.iloc[-1] < 1.0 else '⚠ Warning: cash remaining'}")
-
-# ============================================================================
-# DATA INTEGRITY CHECKS
-# ============================================================================
-
-print("\n" + "=" * 80)
-print("6. DATA INTEGRITY CHECKS")
-print("=" * 80)
-
-print(f"\n[6.1] Date Coverage")
-print(f"  Start: {portfolio.index[0].strftime('%Y-%m-%d')}")
-print(f"  End: {portfolio.index[-1].strftime('%Y-%m-%d')}")
-print(f"  Trading days: {len(portfolio)}")
-print(f"  Status: ✓ PASS")
-
-print(f"\n[6.2] Value Validity")
-has_negative = (portfolio['Total_Value'] < 0).any()
-has_nan = portfolio['Total_Value'].isna().any()
-print(f"  Negative values: {'✗ FOUND' if has_negative else '✓ None'}")
-print(f"  NaN values: {'✗ FOUND' if has_nan else '✓ None'}")
-print(f"  Status: {'✓ PASS' if not (has_negative or has_nan) else '✗ FAIL'}")
-
-print(f"\n[6.3] Share Stability (shares should only change on events)")
-tickers = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'SPY', 'QQQ']
-for ticker in tickers:
-    shares = portfolio[ticker]
-    changes = shares.diff().abs()
-    num_changes = (changes > 0.001).sum()
-    print(f"  {ticker}: {num_changes} share count changes")
-print(f"  Status: ✓ PASS (changes aligned with events)")
-
-# ============================================================================
-# SUMMARY STATISTICS
-# ============================================================================
-
-print("\n" + "=" * 80)
-print("7. SUMMARY STATISTICS")
-print("=" * 80)
-
-print(f"\n[7.1] Time Period")
-print(f"  Duration: {years_trading:.2f} trading years ({(portfolio.index[-1] - portfolio.index[0]).days} calendar days)")
-print(f"  Trading days: {len(portfolio)}")
-
-print(f"\n[7.2] Event Frequency")
-events_per_year = len(trades) / years_trading
-avg_days_between = len(portfolio) / len(trades) if len(trades) > 0 else 0
-print(f"  Total events: {len(trades)} trims, {len(dip_buys)} dip-buys")
-print(f"  Frequency: {events_per_year:.2f} events/year")
-print(f"  Average days between events: {avg_days_between:.1f} trading days")
-
-print(f"\n[7.3] Dip Statistics")
-dip_sizes = [d['spy_drop_pct'] for d in dip_buys]
-print(f"  Minimum dip: {min(dip_sizes)*100:.2f}%")
-print(f"  Maximum dip: {max(dip_sizes)*100:.2f}%")
-print(f"  Average dip: {np.mean(dip_sizes)*100:.2f}%")
-print(f"  Median dip: {np.median(dip_sizes)*100:.2f}%")
-
-print(f"\n[7.4] Trim Distribution by Ticker")
-trim_counts = trades['ticker'].value_counts()
-for ticker in sorted(trim_counts.index):
-    count = trim_counts[ticker]
-    pct = count / len(trades) * 100
-    print(f"  {ticker}: {count} trims ({pct:.1f}%)")
-
-print(f"\n[7.5] Dip-Buy Distribution")
-spy_count = sum(1 for d in dip_buys if d['ticker'] == 'SPY')
-qqq_count = sum(1 for d in dip_buys if d['ticker'] == 'QQQ')
-print(f"  SPY: {spy_count} purchases ({spy_count/len(dip_buys)*100:.1f}%)")
-print(f"  QQQ: {qqq_count} purchases ({qqq_count/len(dip_buys)*100:.1f}%)")
-
-# ============================================================================
-# FINAL VERDICT
-# ============================================================================
-
-print("\n" + "=" * 80)
-print("8. FINAL VALIDATION VERDICT")
-print("=" * 80)
-
-validation_passed = (
-    abs(calc_total_return - reported['total_return']) < 1e-6 and
-    abs(calc_cagr - reported['cagr']) < 1e-6 and
-    abs(calc_max_dd - reported['max_drawdown']) < 1e-6 and
-    abs(final_value - reported['final_value']) < 0.01 and
-    all_trims_valid and
-    all_dips_valid and
-    len(trades) == len(dip_buys)
-)
-
-print()
-if validation_passed:
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest.results_store import load_strategy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Final validation report for a dip-buy strategy')
+    parser.add_argument('--results-dir', default='/Users/austinwallace/sandbox/stock_strategies/trim_strat_test/results')
+    parser.add_argument('--strategy', default='trim_50pct_dip_buy_5pct', help='strategy name in the results')
+    args = parser.parse_args()
+
+    results_dir = Path(args.results_dir)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    print("\n")
     print("╔" + "=" * 78 + "╗")
-    print("║" + " " * 25 + "✓ VALIDATION PASSED" + " " * 34 + "║")
+    print("║" + " " * 20 + "FINAL VALIDATION REPORT" + " " * 35 + "║")
+    print("║" + " " * 15 + "Strategy: Trim@+50% (dip-buy-5pct)" + " " * 29 + "║")
     print("╚" + "=" * 78 + "╝")
+    print("\n")
+
+    # ============================================================================
+    # LOAD ALL DATA
+    # ============================================================================
+
+    print("=" * 80)
+    print("1. LOADING DATA FILES")
+    print("=" * 80)
+
+    # Results store if the run wrote one, else the CSV exports
+    data = load_strategy(results_dir, args.strategy)
+    metadata = data['metadata']
+    metrics = data['metrics']
+    trades = data['trades']
+    portfolio = data['portfolio']
+
+    print(f"✓ Loaded metadata: {len(metadata['dip_buys'])} dip-buy events")
+    print(f"✓ Loaded {len(trades)} trim events")
+    print(f"✓ Loaded portfolio time series: {len(portfolio)} trading days")
+    print(f"✓ Period: {portfolio.index[0].strftime('%Y-%m-%d')} to {portfolio.index[-1].strftime('%Y-%m-%d')}")
     print()
-    print("All critical validations successful:")
-    print("  ✓ Performance metrics match reported values")
-    print("  ✓ All 13 trim events triggered at correct +50% threshold")
-    print("  ✓ All 13 dip-buy events occurred at ≥5% SPY drops")
-    print("  ✓ SPY/QQQ alternation pattern correct")
-    print("  ✓ Event timing and pairing valid")
-    print("  ✓ Data integrity confirmed")
+
+    # ============================================================================
+    # VALIDATE PERFORMANCE METRICS
+    # ============================================================================
+
+    print("=" * 80)
+    print("2. VALIDATING PERFORMANCE METRICS")
+    print("=" * 80)
+
+    reported = metrics.iloc[0]
+    initial_capital = metadata['initial_capital']
+    final_value = portfolio['Total_Value'].iloc[-1]
+
+    print("\n[2.1] Total Return")
+    print("-" * 40)
+    calc_total_return = (final_value - initial_capital) / initial_capital
+    print(f"  Reported:   {reported['total_return']:.6f} ({reported['total_return']*100:.2f}%)")
+    print(f"  Calculated: {calc_total_return:.6f} ({calc_total_return*100:.2f}%)")
+    print(f"  Difference: {abs(calc_total_return - reported['total_return']):.8f}")
+    print(f"  Status: {'✓ PASS' if abs(calc_total_return - reported['total_return']) < 1e-6 else '✗ FAIL'}")
+
+    print("\n[2.2] CAGR (Compound Annual Growth Rate)")
+    print("-" * 40)
+    num_trading_days = len(portfolio)
+    years_trading = num_trading_days / 252  # Trading days method
+    calc_cagr = (1 + calc_total_return) ** (1 / years_trading) - 1
+    print(f"  Trading days: {num_trading_days}")
+    print(f"  Years (252 days/year): {years_trading:.6f}")
+    print(f"  Reported:   {reported['cagr']:.6f} ({reported['cagr']*100:.2f}%)")
+    print(f"  Calculated: {calc_cagr:.6f} ({calc_cagr*100:.2f}%)")
+    print(f"  Difference: {abs(calc_cagr - reported['cagr']):.8f}")
+    print(f"  Status: {'✓ PASS' if abs(calc_cagr - reported['cagr']) < 1e-6 else '✗ FAIL'}")
+
+    print("\n[2.3] Maximum Drawdown")
+    print("-" * 40)
+    cummax = portfolio['Total_Value'].cummax()
+    drawdown = (portfolio['Total_Value'] - cummax) / cummax
+    calc_max_dd = drawdown.min()
+    max_dd_date = drawdown.idxmin()
+    print(f"  Reported:   {reported['max_drawdown']:.6f} ({reported['max_drawdown']*100:.2f}%)")
+    print(f"  Calculated: {calc_max_dd:.6f} ({calc_max_dd*100:.2f}%)")
+    print(f"  Occurred:   {max_dd_date.strftime('%Y-%m-%d')}")
+    print(f"  Difference: {abs(calc_max_dd - reported['max_drawdown']):.8f}")
+    print(f"  Status: {'✓ PASS' if abs(calc_max_dd - reported['max_drawdown']) < 1e-6 else '✗ FAIL'}")
+
+    print("\n[2.4] Volatility (Annualized)")
+    print("-" * 40)
+    daily_returns = portfolio['Total_Value'].pct_change().dropna()
+    calc_volatility = daily_returns.std() * np.sqrt(252)  # Annualized using trading days
+    print(f"  Reported:   {reported['volatility']:.6f} ({reported['volatility']*100:.2f}%)")
+    print(f"  Calculated: {calc_volatility:.6f} ({calc_volatility*100:.2f}%)")
+    print(f"  Difference: {abs(calc_volatility - reported['volatility']):.8f}")
+    print(f"  Status: {'✓ PASS' if abs(calc_volatility - reported['volatility']) < 1e-6 else '✗ FAIL'}")
+
+    print("\n[2.5] Sharpe Ratio (risk-free rate = 0)")
+    print("-" * 40)
+    calc_sharpe = calc_cagr / calc_volatility
+    print(f"  Reported:   {reported['sharpe_ratio']:.6f}")
+    print(f"  Calculated: {calc_sharpe:.6f}")
+    print(f"  Difference: {abs(calc_sharpe - reported['sharpe_ratio']):.8f}")
+    print(f"  Status: {'✓ PASS' if abs(calc_sharpe - reported['sharpe_ratio']) < 0.001 else '✗ FAIL'}")
+
+    print("\n[2.6] Sortino Ratio (risk-free rate = 0)")
+    print("-" * 40)
+    downside_returns = daily_returns[daily_returns < 0]
+    downside_std = downside_returns.std() * np.sqrt(252)
+    calc_sortino = calc_cagr / downside_std
+    print(f"  Reported:   {reported['sortino_ratio']:.6f}")
+    print(f"  Calculated: {calc_sortino:.6f}")
+    print(f"  Difference: {abs(calc_sortino - reported['sortino_ratio']):.8f}")
+    print(f"  Status: {'✓ PASS' if abs(calc_sortino - reported['sortino_ratio']) < 0.001 else '✗ FAIL'}")
+
+    print("\n[2.7] Final Portfolio Value")
+    print("-" * 40)
+    print(f"  Reported:   ${reported['final_value']:,.2f}")
+    print(f"  Calculated: ${final_value:,.2f}")
+    print(f"  Difference: ${abs(final_value - reported['final_value']):.2f}")
+    print(f"  Status: {'✓ PASS' if abs(final_value - reported['final_value']) < 0.01 else '✗ FAIL'}")
+
+    print("\n[2.8] Event Counts")
+    print("-" * 40)
+    print(f"  Trim events - Reported: {int(reported['num_trades'])}, Actual: {len(trades)}")
+    print(f"  Dip-buys - Reported: {int(reported['num_dip_buys'])}, Actual: {len(metadata['dip_buys'])}")
+    print(f"  Status: {'✓ PASS' if len(trades) == reported['num_trades'] and len(metadata['dip_buys']) == reported['num_dip_buys'] else '✗ FAIL'}")
+
+    # ============================================================================
+    # VALIDATE TRIM EVENTS
+    # ============================================================================
+
+    print("\n" + "=" * 80)
+    print("3. VALIDATING TRIM EVENTS (50% Gain Threshold)")
+    print("=" * 80)
+
+    trim_threshold = metadata['trim_threshold']
+    trim_percentage = metadata['trim_percentage']
+    all_trims_valid = True
+
+    print(f"\nStrategy Parameters:")
+    print(f"  Trim threshold: {trim_threshold*100}% gain")
+    print(f"  Trim amount: {trim_percentage*100}% of position")
     print()
-    print(f"Strategy achieved {calc_total_return*100:.2f}% total return ({calc_cagr*100:.2f}% CAGR)")
-    print(f"over {years_trading:.2f} years with {calc_max_dd*100:.2f}% max drawdown.")
-else:
-    print("╔" + "=" * 78 + "╗")
-    print("║" + " " * 25 + "✗ VALIDATION FAILED" + " " * 34 + "║")
-    print("╚" + "=" * 78 + "╝")
+
+    for idx, trade in trades.iterrows():
+        gain = trade['gain_pct']
+        valid = gain >= trim_threshold
+
+        if not valid:
+            all_trims_valid = False
+
+        status = "✓" if valid else "✗"
+        print(f"{status} Trim #{idx+1}: {trade['date'].strftime('%Y-%m-%d')} - {trade['ticker']}")
+        print(f"  Gain: {gain*100:.2f}% | Price: ${trade['price']:.2f} | Proceeds: ${trade['proceeds']:,.2f}")
+
+    print(f"\nSummary: {len(trades)} trim events, {'ALL VALID' if all_trims_valid else 'SOME INVALID'}")
+    print(f"Status: {'✓ PASS' if all_trims_valid else '✗ FAIL'}")
+
+    # ============================================================================
+    # VALIDATE DIP-BUY EVENTS
+    # ============================================================================
+
+    print("\n" + "=" * 80)
+    print("4. VALIDATING DIP-BUY EVENTS (5% SPY Drop + Alternation)")
+    print("=" * 80)
+
+    dip_threshold = metadata['dip_threshold']
+    dip_buys = metadata['dip_buys']
+    all_dips_valid = True
+
+    print(f"\nStrategy Parameters:")
+    print(f"  Dip threshold: {dip_threshold*100}% SPY drop from recent high")
+    print(f"  ETF alternation: SPY → QQQ → SPY → QQQ...")
+    print()
+
+    for idx, dip in enumerate(dip_buys):
+        spy_drop = dip['spy_drop_pct']
+        ticker = dip['ticker']
+        expected_ticker = 'SPY' if idx % 2 == 0 else 'QQQ'
+
+        threshold_met = spy_drop >= dip_threshold
+        alternation_correct = ticker == expected_ticker
+        valid = threshold_met and alternation_correct
+
+        if not valid:
+            all_dips_valid = False
+
+        status = "✓" if valid else "✗"
+        print(f"{status} Dip-Buy #{idx+1}: {dip['date']}")
+        print(f"  SPY drop: {spy_drop*100:.2f}% {'✓' if threshold_met else '✗ BELOW THRESHOLD'}")
+        print(f"  Ticker: {ticker} (expected: {expected_ticker}) {'✓' if alternation_correct else '✗ WRONG'}")
+        print(f"  Amount: ${dip['amount']:,.2f} → {dip['shares_bought']:.4f} shares @ ${dip['price']:.2f}")
+
+    # Validate average dip size
+    avg_dip = np.mean([d['spy_drop_pct'] for d in dip_buys])
+    print(f"\nAverage Dip Size:")
+    print(f"  Reported: {reported['avg_dip_size']*100:.2f}%")
+    print(f"  Calculated: {avg_dip*100:.2f}%")
+    print(f"  {'✓ PASS' if abs(avg_dip - reported['avg_dip_size']) < 0.001 else '✗ FAIL'}")
+
+    print(f"\nSummary: {len(dip_buys)} dip-buy events, {'ALL VALID' if all_dips_valid else 'SOME INVALID'}")
+    print(f"Status: {'✓ PASS' if all_dips_valid else '✗ FAIL'}")
+
+    # ============================================================================
+    # VALIDATE EVENT PAIRING & TIMING
+    # ============================================================================
+
+    print("\n" + "=" * 80)
+    print("5. VALIDATING EVENT TIMING & PAIRING")
+    print("=" * 80)
+
+    print(f"\n[5.1] Event Count Matching")
+    print(f"  Trim events: {len(trades)}")
+    print(f"  Dip-buy events: {len(dip_buys)}")
+    print(f"  Status: {'✓ PASS (1:1 ratio)' if len(trades) == len(dip_buys) else '✗ FAIL'}")
+
+    print(f"\n[5.2] Chronological Order (dip-buy must occur after trim)")
+    all_ordered = True
+    for idx in range(min(len(trades), len(dip_buys))):
+        trim_date = trades.iloc[idx]['date']
+        dip_date = pd.to_datetime(dip_buys[idx]['date'])
+        days_between = (dip_date - trim_date).days
+
+        if dip_date < trim_date:
+            all_ordered = False
+            print(f"  ✗ Pair #{idx+1}: Dip-buy BEFORE trim (impossible)")
+        else:
+            print(f"  ✓ Pair #{idx+1}: Dip-buy {days_between} days after trim")
+
+    print(f"  Status: {'✓ PASS' if all_ordered else '✗ FAIL'}")
+
+    print(f"\n[5.3] Cash Management")
+    cash_holdings = portfolio['Cash']
+    print(f"  Maximum cash: ${cash_holdings.max():,.2f}")
+    print(f"  Average cash: ${cash_holdings.mean():,.2f}")
+    print(f"  Final cash: ${cash_holdings.iloc[-1]:,.2f}")
+    print(f"  Status: {'✓ PASS (all cash deployed)' if cash_holdings.iloc[-1] < 1.0 else '⚠ Warning: cash remaining'}")
+
+    # ============================================================================
+    # DATA INTEGRITY CHECKS
+    # ============================================================================
+
+    print("\n" + "=" * 80)
+    print("6. DATA INTEGRITY CHECKS")
+    print("=" * 80)
+
+    print(f"\n[6.1] Date Coverage")
+    print(f"  Start: {portfolio.index[0].strftime('%Y-%m-%d')}")
+    print(f"  End: {portfolio.index[-1].strftime('%Y-%m-%d')}")
+    print(f"  Trading days: {len(portfolio)}")
+    print(f"  Status: ✓ PASS")
+
+    print(f"\n[6.2] Value Validity")
+    has_negative = (portfolio['Total_Value'] < 0).any()
+    has_nan = portfolio['Total_Value'].isna().any()
+    print(f"  Negative values: {'✗ FOUND' if has_negative else '✓ None'}")
+    print(f"  NaN values: {'✗ FOUND' if has_nan else '✓ None'}")
+    print(f"  Status: {'✓ PASS' if not (has_negative or has_nan) else '✗ FAIL'}")
+
+    print(f"\n[6.3] Share Stability (shares should only change on events)")
+    tickers = [t for t in metadata['tickers'] if t in portfolio.columns]
+    for ticker in tickers:
+        shares = portfolio[ticker]
+        changes = shares.diff().abs()
+        num_changes = (changes > 0.001).sum()
+        print(f"  {ticker}: {num_changes} share count changes")
+    print(f"  Status: ✓ PASS (changes aligned with events)")
+
+    # ============================================================================
+    # SUMMARY STATISTICS
+    # ============================================================================
+
+    print("\n" + "=" * 80)
+    print("7. SUMMARY STATISTICS")
+    print("=" * 80)
+
+    print(f"\n[7.1] Time Period")
+    print(f"  Duration: {years_trading:.2f} trading years ({(portfolio.index[-1] - portfolio.index[0]).days} calendar days)")
+    print(f"  Trading days: {len(portfolio)}")
+
+    print(f"\n[7.2] Event Frequency")
+    events_per_year = len(trades) / years_trading
+    avg_days_between = len(portfolio) / len(trades) if len(trades) > 0 else 0
+    print(f"  Total events: {len(trades)} trims, {len(dip_buys)} dip-buys")
+    print(f"  Frequency: {events_per_year:.2f} events/year")
+    print(f"  Average days between events: {avg_days_between:.1f} trading days")
+
+    print(f"\n[7.3] Dip Statistics")
+    dip_sizes = [d['spy_drop_pct'] for d in dip_buys]
+    print(f"  Minimum dip: {min(dip_sizes)*100:.2f}%")
+    print(f"  Maximum dip: {max(dip_sizes)*100:.2f}%")
+    print(f"  Average dip: {np.mean(dip_sizes)*100:.2f}%")
+    print(f"  Median dip: {np.median(dip_sizes)*100:.2f}%")
+
+    print(f"\n[7.4] Trim Distribution by Ticker")
+    trim_counts = trades['ticker'].value_counts()
+    for ticker in sorted(trim_counts.index):
+        count = trim_counts[ticker]
+        pct = count / len(trades) * 100
+        print(f"  {ticker}: {count} trims ({pct:.1f}%)")
+
+    print(f"\n[7.5] Dip-Buy Distribution")
+    spy_count = sum(1 for d in dip_buys if d['ticker'] == 'SPY')
+    qqq_count = sum(1 for d in dip_buys if d['ticker'] == 'QQQ')
+    print(f"  SPY: {spy_count} purchases ({spy_count/len(dip_buys)*100:.1f}%)")
+    print(f"  QQQ: {qqq_count} purchases ({qqq_count/len(dip_buys)*100:.1f}%)")
+
+    # ============================================================================
+    # FINAL VERDICT
+    # ============================================================================
+
+    print("\n" + "=" * 80)
+    print("8. FINAL VALIDATION VERDICT")
+    print("=" * 80)
+
+    validation_passed = (
+        abs(calc_total_return - reported['total_return']) < 1e-6 and
+        abs(calc_cagr - reported['cagr']) < 1e-6 and
+        abs(calc_max_dd - reported['max_drawdown']) < 1e-6 and
+        abs(final_value - reported['final_value']) < 0.01 and
+        all_trims_valid and
+        all_dips_valid and
+        len(trades) == len(dip_buys)
+    )
+
+    print()
+    if validation_passed:
+        print("╔" + "=" * 78 + "╗")
+        print("║" + " " * 25 + "✓ VALIDATION PASSED" + " " * 34 + "║")
+        print("╚" + "=" * 78 + "╝")
+        print()
+        print("All critical validations successful:")
+        print("  ✓ Performance metrics match reported values")
+        print("  ✓ All 13 trim events triggered at correct +50% threshold")
+        print("  ✓ All 13 dip-buy events occurred at ≥5% SPY drops")
+        print("  ✓ SPY/QQQ alternation pattern correct")
+        print("  ✓ Event timing and pairing valid")
+        print("  ✓ Data integrity confirmed")
+        print()
+        print(f"Strategy achieved {calc_total_return*100:.2f}% total return ({calc_cagr*100:.2f}% CAGR)")
+        print(f"over {years_trading:.2f} years with {calc_max_dd*100:.2f}% max drawdown.")
+    else:
+        print("╔" + "=" * 78 + "╗")
+        print("║" + " " * 25 + "✗ VALIDATION FAILED" + " " * 34 + "║")
+        print("╚" + "=" * 78 + "╝")
+        print()
+        print("Issues detected - see detailed sections above")
+
+    # Save report
+    report_path = results_dir / f'validation_report_dip_buy_{timestamp}.txt'
+    print(f"\n✓ Full report saved to: {report_path.name}")
     print()
-    print("Issues detected - see detailed sections above")
 
-# Save report
-report_path = results_dir / f'validation_report_dip_buy_{timestamp}.txt'
-print(f"\n✓ Full report saved to: {report_path.name}")
-print()
+    print("=" * 80)
+    print("END OF VALIDATION REPORT")
+    print("=" * 80)
+    print()
+
+    return 0 if validation_passed else 1
+
 
-print("=" * 80)
-print("END OF VALIDATION REPORT")
-print("=" * 80)
-print()
+if __name__ == "__main__":
+    exit(main())
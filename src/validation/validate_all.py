@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Validate every strategy of one or more backtest runs in parallel
+
+Discovers the strategies in each results directory (the results store, or
+the *_metadata.json files of a CSV export) and runs the matching validator
+on each one in a process pool:
+
+    DipBuyStrategyValidator   strategies whose metadata records dip_buys
+    BacktestValidator         everything else
+
+Each strategy's outcome is streamed as one JSON line (pass/fail, errors,
+warnings, per-check timings) as soon as it is done, in completion order, and
+an aggregated summary (strategies in discovery order) is printed and saved
+at the end:
+
+    <output-dir>/validation_results.jsonl
+    <output-dir>/validation_summary.json
+
+Usage:
+    python src/validation/validate_all.py results_index_focus
+    python src/validation/validate_all.py results results_index_focus --workers 8
+    python src/validation/validate_all.py results --strategy 'trim_50pct_*'
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest.parallel import can_fork, default_workers, iter_parallel
+from backtest.results_store import ResultsStore, has_results_store
+
+from validation.validate_backtest import BacktestValidator
+from validation.validate_dip_buy_strategy import DipBuyStrategyValidator
+
+# Validator name -> (class, errors attribute, warnings attribute)
+VALIDATORS = {
+    'backtest': (BacktestValidator, 'validation_errors', 'validation_warnings'),
+    'dip_buy': (DipBuyStrategyValidator, 'errors', 'warnings'),
+}
+
+
+def discover_strategies(results_dir):
+    """
+    Strategies of one results directory
+
+    Returns:
+        list of (strategy_name, validator name) in export order
+    """
+    if has_results_store(results_dir):
+        store = ResultsStore(results_dir)
+        return [(name, 'dip_buy' if 'dip_buys' in store.metadata(name) else 'backtest')
+                for name in store.strategies]
+
+    strategies = []
+    for path in sorted(Path(results_dir).glob('*_metadata.json')):
+        with open(path, 'r') as f:
+            metadata = json.load(f)
+        name = path.name[:-len('_metadata.json')]
+        strategies.append((name, 'dip_buy' if 'dip_buys' in metadata else 'backtest'))
+    return strategies
+
+
+def validate_strategy(job):
+    """
+    Run one validator over one strategy with its console output discarded
+
+    Args:
+        job: (results_dir, strategy_name, validator name)
+
+    Returns:
+        JSON-ready dict: strategy, results_dir, validator, passed, errors,
+        warnings and timings (seconds per check, load and total)
+    """
+    results_dir, name, kind = job
+    cls, errors_attr, warnings_attr = VALIDATORS[kind]
+    validator = cls(results_dir, strategy_name=name)
+    errors = getattr(validator, errors_attr)
+    timings = {}
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for check in ('load_data',) + cls.CHECKS:
+            check_start = time.perf_counter()
+            try:
+                ok = getattr(validator, check)()
+            except Exception as e:
+                errors.append(f"{check} raised {type(e).__name__}: {e}")
+                ok = False
+            timings[check] = time.perf_counter() - check_start
+            # Nothing else can run without the data
+            if check == 'load_data' and ok is False:
+                break
+    timings['total'] = time.perf_counter() - start
+
+    return {
+        'strategy': name,
+        'results_dir': str(results_dir),
+        'validator': kind,
+        'passed': len(errors) == 0,
+        'num_errors': len(errors),
+        'num_warnings': len(getattr(validator, warnings_attr)),
+        'errors': errors,
+        'warnings': getattr(validator, warnings_attr),
+        'timings': timings,
+    }
+
+
+def summarize(results, wall_seconds, workers):
+    """Aggregate the per-strategy results into one summary dict"""
+    failed = [r for r in results if not r['passed']]
+    check_seconds = sum(r['timings']['total'] for r in results)
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'results_dirs': sorted({r['results_dir'] for r in results}),
+        'strategies': len(results),
+        'passed': len(results) - len(failed),
+        'failed': len(failed),
+        'errors': sum(r['num_errors'] for r in results),
+        'warnings': sum(r['num_warnings'] for r in results),
+        'by_validator': {kind: sum(1 for r in results if r['validator'] == kind) for kind in VALIDATORS},
+        'failed_strategies': [f"{r['results_dir']}:{r['strategy']}" for r in failed],
+        'workers': workers,
+        'wall_seconds': wall_seconds,
+        'check_seconds': check_seconds,
+        'slowest': [{'strategy': r['strategy'], 'seconds': r['timings']['total']}
+                    for r in sorted(results, key=lambda r: -r['timings']['total'])[:5]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate every strategy of one or more backtest runs')
+    parser.add_argument('results_dirs', nargs='*', default=['results'],
+                        help='results directories (with a results store or CSV exports)')
+    parser.add_argument('--strategy', default='*', help='only strategies matching this glob')
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--output-dir', default=None,
+                        help='where the JSON lines and summary go (default: the first results directory)')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("VALIDATING ALL STRATEGIES")
+    print("=" * 80)
+
+    jobs = []
+    for results_dir in args.results_dirs:
+        if not os.path.isdir(results_dir):
+            print(f"\n❌ ERROR: Directory '{results_dir}/' not found!")
+            return 1
+        found = [(results_dir, name, kind) for name, kind in discover_strategies(results_dir)
+                 if fnmatch.fnmatchcase(name, args.strategy)]
+        print(f"  {results_dir}/: {len(found)} strategies")
+        jobs.extend(found)
+
+    if not jobs:
+        print("\n❌ No strategies found (run a backtest first)")
+        return 1
+
+    output_dir = args.output_dir or args.results_dirs[0]
+    os.makedirs(output_dir, exist_ok=True)
+    jsonl_path = os.path.join(output_dir, 'validation_results.jsonl')
+    summary_path = os.path.join(output_dir, 'validation_summary.json')
+
+    workers = min(args.workers, len(jobs)) if can_fork() else 1
+    print(f"\n🔄 Validating {len(jobs)} strategies on {workers} worker process(es)...\n")
+
+    results = [None] * len(jobs)
+    start = time.perf_counter()
+    with open(jsonl_path, 'w') as f:
+        done = iter_parallel(validate_strategy, jobs, max_workers=args.workers)
+        for count, (index, result) in enumerate(done, start=1):
+            f.write(json.dumps(result, default=str) + "\n")
+            f.flush()
+            results[index] = result
+            status = '✓' if result['passed'] else '✗'
+            print(f"  {status} [{count}/{len(jobs)}] {result['strategy']}: {result['num_errors']} errors, "
+                  f"{result['num_warnings']} warnings ({result['timings']['total']:.2f}s)")
+    wall_seconds = time.perf_counter() - start
+
+    summary = summarize(results, wall_seconds, workers)
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    print("\n" + "=" * 80)
+    print("VALIDATION SUMMARY")
+    print("=" * 80)
+    print(f"\n  Strategies: {summary['strategies']} ({summary['passed']} passed, {summary['failed']} failed)")
+    print(f"  Errors:     {summary['errors']}")
+    print(f"  Warnings:   {summary['warnings']}")
+    print(f"  Time:       {wall_seconds:.2f}s wall, {summary['check_seconds']:.2f}s of checks "
+          f"on {workers} worker(s)")
+    if summary['failed_strategies']:
+        print(f"\n  Failed:")
+        for name in summary['failed_strategies']:
+            print(f"    ✗ {name}")
+
+    print(f"\n✓ Per-strategy results: {jsonl_path}")
+    print(f"✓ Summary: {summary_path}")
+
+    if summary['failed'] == 0:
+        print("\n✓✓✓ ALL STRATEGIES PASSED ✓✓✓")
+        return 0
+    print("\n✗✗✗ VALIDATION FAILED ✗✗✗")
+    return 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,22 +1,37 @@
 #!/usr/bin/env python3
 """
-Independent Backtest Validator for trim_50pct_spy Strategy
-Validates all aspects of the backtest results
+Independent Backtest Validator (trim_50pct_spy by default)
+Validates all aspects of one strategy's backtest results
+
+validate_all.py runs it over every strategy of a results directory.
 """
 
+import argparse
+import os
+import sys
 import pandas as pd
 import numpy as np
-import json
 from datetime import datetime
 from pathlib import Path
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest.io import TRADE_COLUMNS
+from backtest.metrics import metrics_table
+from backtest.results_store import load_strategy
+
 class BacktestValidator:
-    def __init__(self, results_dir="results"):
+    # Checks that add to the errors/warnings lists, in run order
+    CHECKS = ('validate_data_integrity', 'recalculate_metrics', 'validate_trim_logic',
+              'validate_strategy_logic')
+
+    def __init__(self, results_dir="results", trade_details=False, strategy_name="trim_50pct_spy"):
         self.results_dir = Path(results_dir)
-        self.strategy_name = "trim_50pct_spy"
+        self.strategy_name = strategy_name
         self.validation_errors = []
         self.validation_warnings = []
         self.validation_info = []
+        # Per-trade lines, written to a separate report only when asked for
+        self.trade_details = [] if trade_details else None
 
     def load_data(self):
         """Load all backtest data files"""
@@ -25,30 +40,31 @@ class BacktestValidator:
         print("=" * 80)
 
         try:
-            # Load portfolio values
-            portfolio_file = self.results_dir / f"{self.strategy_name}_portfolio_value.csv"
-            self.portfolio_df = pd.read_csv(portfolio_file, index_col=0, parse_dates=True)
+            # Results store if the run wrote one, else the CSV exports
+            data = load_strategy(self.results_dir, self.strategy_name)
+
+            self.portfolio_df = data['portfolio']
             print(f"✓ Loaded portfolio values: {len(self.portfolio_df)} rows")
 
-            # Load trades
-            trades_file = self.results_dir / f"{self.strategy_name}_trades.csv"
-            self.trades_df = pd.read_csv(trades_file, parse_dates=['date'])
+            self.trades_df = data['trades']
+            if self.trades_df.empty:
+                # Strategies without trades may be exported with no columns at all
+                self.trades_df = self.trades_df.reindex(
+                    columns=list(dict.fromkeys(TRADE_COLUMNS + list(self.trades_df.columns))))
+                self.trades_df['date'] = pd.to_datetime(self.trades_df['date'])
             print(f"✓ Loaded trades: {len(self.trades_df)} trades")
 
-            # Load weights
-            weights_file = self.results_dir / f"{self.strategy_name}_weights.csv"
-            self.weights_df = pd.read_csv(weights_file, index_col=0, parse_dates=True)
-            print(f"✓ Loaded weights: {len(self.weights_df)} rows")
+            self.weights_df = data['weights']
+            if self.weights_df is None:
+                self.validation_warnings.append(f"No weights exported for {self.strategy_name}; weight checks skipped")
+                print(f"⚠ No weights exported (weight checks skipped)")
+            else:
+                print(f"✓ Loaded weights: {len(self.weights_df)} rows")
 
-            # Load metrics
-            metrics_file = self.results_dir / f"{self.strategy_name}_metrics.csv"
-            self.metrics_df = pd.read_csv(metrics_file)
+            self.metrics_df = data['metrics']
             print(f"✓ Loaded metrics")
 
-            # Load metadata
-            metadata_file = self.results_dir / f"{self.strategy_name}_metadata.json"
-            with open(metadata_file, 'r') as f:
-                self.metadata = json.load(f)
+            self.metadata = data['metadata']
             print(f"✓ Loaded metadata")
 
             self.validation_info.append("All data files loaded successfully")
@@ -104,14 +120,15 @@ class BacktestValidator:
                 print("✓ No negative cash values")
 
         # Check weights sum to 1 (or close to it)
-        ticker_cols = [col for col in self.weights_df.columns if col != 'Cash']
-        weights_sum = self.weights_df[ticker_cols].sum(axis=1)
-        weights_off = weights_sum[(weights_sum < 0.99) | (weights_sum > 1.01)]
-        if len(weights_off) > 0:
-            self.validation_warnings.append(f"{len(weights_off)} rows where weights don't sum to ~1.0")
-            print(f"⚠ Warning: {len(weights_off)} rows with weights sum ≠ 1.0 (range: {weights_sum.min():.4f} - {weights_sum.max():.4f})")
-        else:
-            print(f"✓ Weights sum to 1.0 (range: {weights_sum.min():.4f} - {weights_sum.max():.4f})")
+        if self.weights_df is not None:
+            ticker_cols = [col for col in self.weights_df.columns if col != 'Cash']
+            weights_sum = self.weights_df[ticker_cols].sum(axis=1)
+            weights_off = weights_sum[(weights_sum < 0.99) | (weights_sum > 1.01)]
+            if len(weights_off) > 0:
+                self.validation_warnings.append(f"{len(weights_off)} rows where weights don't sum to ~1.0")
+                print(f"⚠ Warning: {len(weights_off)} rows with weights sum ≠ 1.0 (range: {weights_sum.min():.4f} - {weights_sum.max():.4f})")
+            else:
+                print(f"✓ Weights sum to 1.0 (range: {weights_sum.min():.4f} - {weights_sum.max():.4f})")
 
         # Check for duplicate dates
         if self.portfolio_df.index.duplicated().any():
@@ -140,88 +157,112 @@ class BacktestValidator:
         print(f"\nData Integrity Summary: {errors_found} errors, {len(self.validation_warnings)} warnings")
         return errors_found == 0
 
+    def _trade_rows(self):
+        """
+        Join the trade table to the holdings table: the portfolio row of each
+        trade's date (the next row when the date itself is missing, len(portfolio_df)
+        past the end) and the column of its ticker (-1 if unknown)
+        """
+        dates = pd.DatetimeIndex(self.trades_df['date']).normalize()
+        positions = self.portfolio_df.index.searchsorted(dates)
+        columns = self.portfolio_df.columns.get_indexer(self.trades_df['ticker'])
+        return dates, positions, columns
+
     def validate_trim_logic(self):
         """Validate that trims occurred correctly according to strategy rules"""
         print("\n" + "=" * 80)
         print("TRIM LOGIC VALIDATION")
         print("=" * 80)
 
-        trim_threshold = self.metadata['trim_threshold']
-        trim_percentage = self.metadata['trim_percentage']
+        trim_threshold = self.metadata.get('trim_threshold')
+        trim_percentage = self.metadata.get('trim_percentage')
+        if trim_threshold is None or trim_percentage is None:
+            print(f"No gain threshold for {self.strategy_name} - skipped")
+            return True
 
         print(f"Strategy Parameters:")
         print(f"  Trim Threshold: {trim_threshold * 100}% gain")
         print(f"  Trim Amount: {trim_percentage * 100}% of position")
         print(f"\nValidating {len(self.trades_df)} trades...\n")
 
-        errors_found = 0
-
-        for idx, trade in self.trades_df.iterrows():
-            trade_date = trade['date']
-            ticker = trade['ticker']
-            gain_pct = trade['gain_pct']
-
-            print(f"Trade {idx + 1}: {trade_date.strftime('%Y-%m-%d')} - {ticker}")
-            print(f"  Reported Gain: {gain_pct * 100:.2f}%")
-
-            # Validate gain threshold
-            if gain_pct < trim_threshold:
-                error_msg = f"Trade {idx + 1}: Gain {gain_pct*100:.2f}% below threshold {trim_threshold*100}%"
-                self.validation_errors.append(error_msg)
-                errors_found += 1
-                print(f"  ✗ ERROR: Gain below threshold ({trim_threshold * 100}%)")
-            else:
-                print(f"  ✓ Gain exceeds threshold")
-
-            # Find the trade date in portfolio data
-            try:
-                trade_date_normalized = pd.Timestamp(trade_date).normalize()
-
-                # Find closest date if exact match doesn't exist
-                if trade_date_normalized not in self.portfolio_df.index:
-                    closest_idx = self.portfolio_df.index.searchsorted(trade_date_normalized)
-                    if closest_idx < len(self.portfolio_df):
-                        trade_date_normalized = self.portfolio_df.index[closest_idx]
-                        print(f"  Note: Using closest date {trade_date_normalized.strftime('%Y-%m-%d')}")
-
-                # Get position before trade
-                position_before_idx = self.portfolio_df.index.get_loc(trade_date_normalized)
-                if position_before_idx > 0:
-                    position_before = self.portfolio_df.iloc[position_before_idx - 1][ticker]
-                    position_after = self.portfolio_df.iloc[position_before_idx][ticker]
-
-                    shares_change = position_before - position_after
-                    shares_sold = trade['shares_sold']
-
-                    # Allow 1% tolerance for rounding
-                    if abs(shares_change - shares_sold) / shares_sold > 0.01:
-                        warning_msg = f"Trade {idx + 1}: Shares mismatch - Portfolio change: {shares_change:.2f}, Trade: {shares_sold:.2f}"
-                        self.validation_warnings.append(warning_msg)
-                        print(f"  ⚠ Warning: Shares mismatch ({abs(shares_change - shares_sold):.2f} difference)")
-                    else:
-                        print(f"  ✓ Shares sold matches portfolio change ({shares_sold:.2f})")
-
-                    # Validate trim percentage (approximately)
-                    trim_pct = shares_change / position_before
-                    expected_trim = trim_percentage
-                    if abs(trim_pct - expected_trim) / expected_trim > 0.05:  # 5% tolerance
-                        warning_msg = f"Trade {idx + 1}: Trim {trim_pct*100:.2f}% differs from expected {expected_trim*100:.2f}%"
-                        self.validation_warnings.append(warning_msg)
-                        print(f"  ⚠ Warning: Trim percentage {trim_pct*100:.2f}% vs expected {expected_trim*100:.2f}%")
-                    else:
-                        print(f"  ✓ Trim percentage correct ({trim_pct*100:.2f}%)")
-
-            except Exception as e:
-                warning_msg = f"Trade {idx + 1}: Could not validate against portfolio data - {str(e)}"
-                self.validation_warnings.append(warning_msg)
-                print(f"  ⚠ Warning: {str(e)}")
-
-            # Calculate actual gain from price data if we can find initial purchase
-            # This is challenging without purchase history, so we'll skip for now
-
-            print()
-
-        print(f"Trim Logic Summary: {errors_found} errors, {len(self.validation_warnings)} warnings")
+        trades = self.trades_df
+        trade_nums = trades.index.to_numpy() + 1
+        tickers = trades['ticker'].to_numpy()
+        gain_pct = trades['gain_pct'].to_numpy(dtype=np.float64)
+        shares_sold = trades['shares_sold'].to_numpy(dtype=np.float64)
+
+        below_threshold = gain_pct < trim_threshold
+        for n in np.flatnonzero(below_threshold):
+            self.validation_errors.append(
+                f"Trade {trade_nums[n]}: Gain {gain_pct[n]*100:.2f}% below threshold {trim_threshold*100}%")
+        errors_found = int(below_threshold.sum())
+
+        # Holdings the day before and on the trade date
+        index = self.portfolio_df.index
+        dates, positions, columns = self._trade_rows()
+        in_range = positions < len(index)
+        has_before = in_range & (positions > 0)
+        checked = has_before & (columns >= 0)
+
+        holdings = self.portfolio_df.to_numpy(dtype=np.float64)
+        rows = np.where(checked, positions, 1)
+        cols = np.where(checked, columns, 0)
+        position_before = holdings[rows - 1, cols]
+        position_after = holdings[rows, cols]
+        shares_change = position_before - position_after
+
+        # 1% tolerance for rounding on shares, 5% on the trim percentage
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trim_pct = shares_change / position_before
+            shares_mismatch = checked & (np.abs(shares_change - shares_sold) / shares_sold > 0.01)
+            trim_mismatch = checked & (np.abs(trim_pct - trim_percentage) / trim_percentage > 0.05)
+        unresolved = ~in_range | (has_before & (columns < 0))
+
+        for n in np.flatnonzero(shares_mismatch | trim_mismatch | unresolved):
+            if unresolved[n]:
+                missing = dates[n] if not in_range[n] else tickers[n]
+                self.validation_warnings.append(
+                    f"Trade {trade_nums[n]}: Could not validate against portfolio data - {str(KeyError(missing))}")
+                continue
+            if shares_mismatch[n]:
+                self.validation_warnings.append(
+                    f"Trade {trade_nums[n]}: Shares mismatch - Portfolio change: {shares_change[n]:.2f}, "
+                    f"Trade: {shares_sold[n]:.2f}")
+            if trim_mismatch[n]:
+                self.validation_warnings.append(
+                    f"Trade {trade_nums[n]}: Trim {trim_pct[n]*100:.2f}% differs from expected {trim_percentage*100:.2f}%")
+
+        num_checked = int(checked.sum())
+        print(f"  {'✓' if errors_found == 0 else '✗'} Gain above threshold: {len(trades) - errors_found}/{len(trades)} trades")
+        print(f"  {'✓' if not shares_mismatch.any() else '⚠'} Shares sold match portfolio change: "
+              f"{num_checked - int(shares_mismatch.sum())}/{num_checked} trades")
+        print(f"  {'✓' if not trim_mismatch.any() else '⚠'} Trim percentage within 5% of "
+              f"{trim_percentage*100:.2f}%: {num_checked - int(trim_mismatch.sum())}/{num_checked} trades")
+        if unresolved.any():
+            print(f"  ⚠ {int(unresolved.sum())} trades could not be matched to portfolio data")
+
+        if self.trade_details is not None:
+            exact = np.zeros(len(trades), dtype=bool)
+            exact[in_range] = index[positions[in_range]] == dates[in_range]
+            for n in range(len(trades)):
+                lines = [f"Trade {trade_nums[n]}: {trades['date'].iloc[n].strftime('%Y-%m-%d')} - {tickers[n]}",
+                         f"  Reported Gain: {gain_pct[n] * 100:.2f}%",
+                         f"  ✗ ERROR: Gain below threshold ({trim_threshold * 100}%)" if below_threshold[n]
+                         else f"  ✓ Gain exceeds threshold"]
+                if in_range[n] and not exact[n]:
+                    lines.append(f"  Note: Using closest date {index[positions[n]].strftime('%Y-%m-%d')}")
+                if unresolved[n]:
+                    lines.append(f"  ⚠ Warning: {str(KeyError(dates[n] if not in_range[n] else tickers[n]))}")
+                elif checked[n]:
+                    lines.append(f"  ⚠ Warning: Shares mismatch ({abs(shares_change[n] - shares_sold[n]):.2f} difference)"
+                                 if shares_mismatch[n] else
+                                 f"  ✓ Shares sold matches portfolio change ({shares_sold[n]:.2f})")
+                    lines.append(f"  ⚠ Warning: Trim percentage {trim_pct[n]*100:.2f}% vs expected {trim_percentage*100:.2f}%"
+                                 if trim_mismatch[n] else
+                                 f"  ✓ Trim percentage correct ({trim_pct[n]*100:.2f}%)")
+                self.trade_details.extend(lines + [''])
+
+        print(f"\nTrim Logic Summary: {errors_found} errors, {len(self.validation_warnings)} warnings")
         return errors_found == 0
 
     def recalculate_metrics(self):
@@ -329,6 +370,25 @@ class BacktestValidator:
         else:
             print(f"  ✓ Values match")
 
+        # The shared metrics kernel (backtest.metrics) against the formulas above,
+        # so a kernel bug cannot pass just because the engine used it too
+        kernel = metrics_table(portfolio_values.to_numpy(dtype=np.float64), initial_capital, years=years)
+        reference = {
+            'final_value': final_value, 'total_return': total_return, 'cagr': cagr,
+            'volatility': volatility, 'sharpe_ratio': sharpe_ratio,
+            'sortino_ratio': sortino_ratio, 'max_drawdown': max_drawdown,
+        }
+        disagreements = [column for column, expected in reference.items()
+                         if not np.isclose(kernel[column], expected, rtol=1e-9, atol=1e-12, equal_nan=True)]
+        print(f"\nMetrics Kernel vs Reference Formulas:")
+        if disagreements:
+            for column in disagreements:
+                self.validation_errors.append(f"Metrics kernel {column} disagrees with the reference: "
+                                              f"{kernel[column]} vs {reference[column]}")
+            print(f"  ✗ ERROR: {', '.join(disagreements)} disagree")
+        else:
+            print(f"  ✓ All {len(reference)} metrics agree")
+
         # Number of trades
         num_trades = len(self.trades_df)
         print(f"\nNumber of Trades:")
@@ -349,58 +409,82 @@ class BacktestValidator:
         print("STRATEGY LOGIC VALIDATION")
         print("=" * 80)
 
-        reinvest_mode = self.metadata['reinvest_mode']
+        reinvest_mode = self.metadata.get('reinvest_mode')
         print(f"\nReinvestment Mode: {reinvest_mode}")
 
         if reinvest_mode == 'spy':
             print("Validating that trim proceeds were reinvested in SPY...")
 
-            # Check if SPY position increased after each trim
-            for idx, trade in self.trades_df.iterrows():
-                trade_date = pd.Timestamp(trade['date']).normalize()
-                ticker = trade['ticker']
-
-                # Only check non-SPY trades
-                if ticker != 'SPY':
-                    try:
-                        # Find trade date in portfolio
-                        if trade_date not in self.portfolio_df.index:
-                            trade_date = self.portfolio_df.index[self.portfolio_df.index.searchsorted(trade_date)]
-
-                        trade_idx = self.portfolio_df.index.get_loc(trade_date)
-
-                        if trade_idx > 0:
-                            spy_before = self.portfolio_df.iloc[trade_idx - 1]['SPY']
-                            spy_after = self.portfolio_df.iloc[trade_idx]['SPY']
-
-                            if spy_after <= spy_before:
-                                self.validation_warnings.append(
-                                    f"SPY didn't increase after {ticker} trim on {trade_date.strftime('%Y-%m-%d')}"
-                                )
-                                print(f"  ⚠ {trade_date.strftime('%Y-%m-%d')}: SPY didn't increase after {ticker} trim")
-                            else:
-                                print(f"  ✓ {trade_date.strftime('%Y-%m-%d')}: SPY increased after {ticker} trim")
-                    except Exception as e:
-                        print(f"  ⚠ Could not validate SPY reinvestment for {ticker} on {trade_date}: {str(e)}")
-
-        # Validate equal-weight rebalancing at start
-        print("\nValidating initial equal-weight allocation...")
+            # Check if SPY position increased after each trim (only non-SPY trades)
+            dates, positions, _ = self._trade_rows()
+            index = self.portfolio_df.index
+            tickers = self.trades_df['ticker'].to_numpy()
+            checked = (tickers != 'SPY') & (positions < len(index)) & (positions > 0)
+
+            if 'SPY' in self.portfolio_df.columns:
+                spy = self.portfolio_df['SPY'].to_numpy(dtype=np.float64)
+                rows = np.where(checked, positions, 1)
+                not_increased = checked & (spy[rows] <= spy[rows - 1])
+            else:
+                print(f"  ⚠ Could not validate SPY reinvestment: no SPY holdings column")
+                checked = np.zeros(len(tickers), dtype=bool)
+                not_increased = checked
+
+            for n in np.flatnonzero(not_increased):
+                self.validation_warnings.append(
+                    f"SPY didn't increase after {tickers[n]} trim on {index[positions[n]].strftime('%Y-%m-%d')}"
+                )
+
+            num_checked = int(checked.sum())
+            skipped = int(((tickers != 'SPY') & (positions >= len(index))).sum())
+            print(f"  {'✓' if not not_increased.any() else '⚠'} SPY increased after "
+                  f"{num_checked - int(not_increased.sum())}/{num_checked} non-SPY trims")
+            if skipped:
+                print(f"  ⚠ {skipped} trims dated after the last portfolio row were not checked")
+
+            if self.trade_details is not None:
+                self.trade_details.append("SPY reinvestment after non-SPY trims:")
+                for n in np.flatnonzero(checked):
+                    date = index[positions[n]].strftime('%Y-%m-%d')
+                    self.trade_details.append(f"  ⚠ {date}: SPY didn't increase after {tickers[n]} trim"
+                                              if not_increased[n] else
+                                              f"  ✓ {date}: SPY increased after {tickers[n]} trim")
+                self.trade_details.append('')
+
+        # Validate the starting allocation (equal weight unless the metadata lists target weights)
         tickers = self.metadata['tickers']
-        initial_weights = self.weights_df.iloc[0][tickers]
-        expected_weight = 1.0 / len(tickers)
-
-        weight_errors = []
-        for ticker, weight in initial_weights.items():
-            if abs(weight - expected_weight) > 0.01:  # 1% tolerance
-                weight_errors.append(f"{ticker}: {weight:.4f} vs {expected_weight:.4f}")
-
-        if weight_errors:
-            self.validation_warnings.append(f"Initial weights not equal: {', '.join(weight_errors)}")
-            print(f"  ⚠ Warning: Initial weights not perfectly equal")
-            for error in weight_errors:
-                print(f"    {error}")
-        else:
-            print(f"  ✓ All tickers started with equal weight ({expected_weight:.4f})")
+        target_weights = self.metadata.get('initial_weights')
+        if self.weights_df is not None and target_weights:
+            print("\nValidating initial target-weight allocation...")
+            initial_weights = self.weights_df.iloc[0][list(target_weights)]
+            weight_errors = [f"{ticker}: {weight:.4f} vs {target_weights[ticker]:.4f}"
+                             for ticker, weight in initial_weights.items()
+                             if abs(weight - target_weights[ticker]) > 0.01]  # 1% tolerance
+
+            if weight_errors:
+                self.validation_warnings.append(f"Initial weights differ from targets: {', '.join(weight_errors)}")
+                print(f"  ⚠ Warning: Initial weights differ from the targets")
+                for error in weight_errors:
+                    print(f"    {error}")
+            else:
+                print(f"  ✓ All tickers started at their target weight")
+        elif self.weights_df is not None:
+            print("\nValidating initial equal-weight allocation...")
+            initial_weights = self.weights_df.iloc[0][tickers]
+            expected_weight = 1.0 / len(tickers)
+
+            weight_errors = []
+            for ticker, weight in initial_weights.items():
+                if abs(weight - expected_weight) > 0.01:  # 1% tolerance
+                    weight_errors.append(f"{ticker}: {weight:.4f} vs {expected_weight:.4f}")
+
+            if weight_errors:
+                self.validation_warnings.append(f"Initial weights not equal: {', '.join(weight_errors)}")
+                print(f"  ⚠ Warning: Initial weights not perfectly equal")
+                for error in weight_errors:
+                    print(f"    {error}")
+            else:
+                print(f"  ✓ All tickers started with equal weight ({expected_weight:.4f})")
 
         # Check that positions never go negative
         print("\nValidating that no positions went negative...")
@@ -575,10 +659,19 @@ class BacktestValidator:
         print(f"\n✓ Validation report saved to: {report_file}")
         return report_file
 
+    def save_trade_details(self):
+        """Write the per-trade check lines (trade_details=True) to their own report"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        details_file = self.results_dir / f"trade_details_{self.strategy_name}_{timestamp}.txt"
+        with open(details_file, 'w') as f:
+            f.write("\n".join(self.trade_details) + "\n")
+        print(f"✓ Per-trade details saved to: {details_file}")
+        return details_file
+
     def run_full_validation(self):
         """Run complete validation workflow"""
         print("\n" + "=" * 80)
-        print("BACKTEST VALIDATOR - TRIM@+50% (SPY) STRATEGY")
+        print(f"BACKTEST VALIDATOR - {self.strategy_name}")
         print("=" * 80)
         print()
 
@@ -588,14 +681,14 @@ class BacktestValidator:
             return False
 
         # Run validation steps
-        self.validate_data_integrity()
-        self.recalculate_metrics()
-        self.validate_trim_logic()
-        self.validate_strategy_logic()
+        for check in self.CHECKS:
+            getattr(self, check)()
         self.analyze_trade_distribution()
 
         # Generate report
         report_file = self.generate_report()
+        if self.trade_details is not None:
+            self.save_trade_details()
 
         # Print summary
         print("\n" + "=" * 80)
@@ -613,7 +706,18 @@ class BacktestValidator:
             print("\nPlease review the errors above and the detailed report.")
             return False
 
-if __name__ == "__main__":
-    validator = BacktestValidator()
+def main():
+    parser = argparse.ArgumentParser(description='Validate one strategy of a backtest run')
+    parser.add_argument('--results-dir', default='results')
+    parser.add_argument('--strategy', default='trim_50pct_spy', help='strategy name in the results')
+    parser.add_argument('--trade-details', action='store_true',
+                        help='also write every per-trade check to a trade_details report')
+    args = parser.parse_args()
+
+    validator = BacktestValidator(args.results_dir, trade_details=args.trade_details,
+                                  strategy_name=args.strategy)
     success = validator.run_full_validation()
-    exit(0 if success else 1)
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    exit(main())
@@ -11,15 +11,26 @@ This script independently validates the backtest results by:
 6. Comparing calculated vs reported metrics
 """
 
+import argparse
+import os
+import sys
 import pandas as pd
 import numpy as np
-import json
 from datetime import datetime
 from pathlib import Path
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest.results_store import load_strategy
+
 class DipBuyStrategyValidator:
-    def __init__(self, results_dir):
+    # Checks that add to the errors/warnings lists, in run order
+    CHECKS = ('validate_basic_metrics', 'validate_trim_events', 'validate_dip_buy_events',
+              'validate_event_timing', 'validate_data_integrity')
+
+    def __init__(self, results_dir, trade_details=False, strategy_name='trim_50pct_dip_buy_5pct'):
         self.results_dir = Path(results_dir)
+        self.strategy_name = strategy_name
+        self.trade_details = trade_details  # print and save every trim event, not just the summary
         self.validation_results = {}
         self.errors = []
         self.warnings = []
@@ -30,26 +41,19 @@ class DipBuyStrategyValidator:
         print("LOADING DATA FILES")
         print("=" * 80)
 
-        # Load metadata
-        with open(self.results_dir / 'trim_50pct_dip_buy_5pct_metadata.json', 'r') as f:
-            self.metadata = json.load(f)
+        # Results store if the run wrote one, else the CSV exports
+        data = load_strategy(self.results_dir, self.strategy_name)
+
+        self.metadata = data['metadata']
         print(f"✓ Loaded metadata: {len(self.metadata['dip_buys'])} dip-buy events recorded")
 
-        # Load metrics
-        self.metrics = pd.read_csv(self.results_dir / 'trim_50pct_dip_buy_5pct_metrics.csv')
-        print(f"✓ Loaded metrics CSV")
+        self.metrics = data['metrics']
+        print(f"✓ Loaded metrics")
 
-        # Load trades
-        self.trades = pd.read_csv(self.results_dir / 'trim_50pct_dip_buy_5pct_trades.csv')
-        self.trades['date'] = pd.to_datetime(self.trades['date'])
+        self.trades = data['trades']
         print(f"✓ Loaded {len(self.trades)} trade records")
 
-        # Load portfolio values
-        self.portfolio = pd.read_csv(
-            self.results_dir / 'trim_50pct_dip_buy_5pct_portfolio_value.csv',
-            index_col=0
-        )
-        self.portfolio.index = pd.to_datetime(self.portfolio.index)
+        self.portfolio = data['portfolio']
         print(f"✓ Loaded portfolio time series: {len(self.portfolio)} days")
         print()
 
@@ -178,39 +182,38 @@ class DipBuyStrategyValidator:
         print(f"Trim percentage: {self.metadata['trim_percentage']*100}%")
         print()
 
-        trim_validation = []
-        for idx, trade in self.trades.iterrows():
-            gain_pct = trade['gain_pct']
-            ticker = trade['ticker']
-
-            # Check if gain is at or above 50%
-            if gain_pct >= 0.50:
-                status = "✓ PASS"
-                passed = True
-            else:
-                status = f"✗ FAIL (only {gain_pct*100:.2f}% gain)"
-                passed = False
-                self.errors.append(f"Trim event {idx+1} for {ticker} triggered at {gain_pct*100:.2f}% < 50%")
-
-            trim_validation.append({
-                'trade_num': idx + 1,
-                'date': trade['date'].strftime('%Y-%m-%d'),
-                'ticker': ticker,
-                'gain_pct': gain_pct,
-                'shares_sold': trade['shares_sold'],
-                'price': trade['price'],
-                'proceeds': trade['proceeds'],
-                'status': status,
-                'passed': passed
-            })
-
-            print(f"Trim #{idx+1}: {trade['date'].strftime('%Y-%m-%d')} - {ticker}")
-            print(f"  Gain: {gain_pct*100:.2f}% | Price: ${trade['price']:.2f} | Proceeds: ${trade['proceeds']:,.2f}")
-            print(f"  {status}")
-            print()
-
-        passed_trims = sum(1 for t in trim_validation if t['passed'])
-        print(f"Trim Events Summary: {passed_trims}/{len(trim_validation)} passed validation")
+        trades = self.trades
+        trade_nums = trades.index.to_numpy() + 1
+        gain_pct = trades['gain_pct'].to_numpy(dtype=np.float64)
+        tickers = trades['ticker'].to_numpy()
+
+        # Check if gain is at or above 50%
+        passed = gain_pct >= 0.50
+        status = np.full(len(trades), "✓ PASS", dtype=object)
+        for n in np.flatnonzero(~passed):
+            status[n] = f"✗ FAIL (only {gain_pct[n]*100:.2f}% gain)"
+            self.errors.append(f"Trim event {trade_nums[n]} for {tickers[n]} triggered at {gain_pct[n]*100:.2f}% < 50%")
+
+        trim_validation = pd.DataFrame({
+            'trade_num': trade_nums,
+            'date': trades['date'].dt.strftime('%Y-%m-%d').to_numpy(),
+            'ticker': tickers,
+            'gain_pct': gain_pct,
+            'shares_sold': trades['shares_sold'].to_numpy(),
+            'price': trades['price'].to_numpy(),
+            'proceeds': trades['proceeds'].to_numpy(),
+            'status': status,
+            'passed': passed
+        })
+
+        if self.trade_details:
+            for trim in trim_validation.itertuples(index=False):
+                print(f"Trim #{trim.trade_num}: {trim.date} - {trim.ticker}")
+                print(f"  Gain: {trim.gain_pct*100:.2f}% | Price: ${trim.price:.2f} | Proceeds: ${trim.proceeds:,.2f}")
+                print(f"  {trim.status}")
+                print()
+
+        print(f"Trim Events Summary: {int(passed.sum())}/{len(trim_validation)} passed validation")
         print()
 
         self.validation_results['trim_events'] = trim_validation
@@ -328,19 +331,21 @@ class DipBuyStrategyValidator:
 
         # Check timing: each dip-buy should occur after its corresponding trim
         print("Checking event sequence:")
-        for idx in range(min(num_trims, num_dip_buys)):
-            trim_date = self.trades.iloc[idx]['date']
-            dip_buy_date = pd.to_datetime(self.metadata['dip_buys'][idx]['date'])
-
-            days_between = (dip_buy_date - trim_date).days
-
-            if dip_buy_date >= trim_date:
-                status = f"✓ Dip-buy {days_between} days after trim"
-            else:
-                status = f"✗ Dip-buy BEFORE trim (impossible)"
-                self.errors.append(f"Event {idx+1}: dip-buy ({dip_buy_date}) before trim ({trim_date})")
-
-            print(f"  Event pair #{idx+1}: {status}")
+        num_pairs = min(num_trims, num_dip_buys)
+        trim_dates = pd.DatetimeIndex(self.trades['date'].iloc[:num_pairs])
+        dip_buy_dates = pd.DatetimeIndex(pd.to_datetime([d['date'] for d in self.metadata['dip_buys'][:num_pairs]]))
+        days_between = (dip_buy_dates - trim_dates).days
+        in_order = np.asarray(dip_buy_dates >= trim_dates)
+
+        for idx in np.flatnonzero(~in_order):
+            self.errors.append(f"Event {idx+1}: dip-buy ({dip_buy_dates[idx]}) before trim ({trim_dates[idx]})")
+
+        if self.trade_details:
+            for idx in range(num_pairs):
+                status = (f"✓ Dip-buy {days_between[idx]} days after trim" if in_order[idx]
+                          else f"✗ Dip-buy BEFORE trim (impossible)")
+                print(f"  Event pair #{idx+1}: {status}")
+        print(f"  {'✓' if in_order.all() else '✗'} {int(in_order.sum())}/{num_pairs} dip-buys on or after their trim")
         print()
 
         # Check cash management: cash should never accumulate for long periods
@@ -410,7 +415,7 @@ class DipBuyStrategyValidator:
 
         # Check that shares remain constant between events
         print("Share Stability Between Events:")
-        tickers = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'SPY', 'QQQ']
+        tickers = [t for t in self.metadata['tickers'] if t in self.portfolio.columns]
         stable = True
 
         for ticker in tickers:
@@ -525,7 +530,7 @@ class DipBuyStrategyValidator:
         with open(report_path, 'w') as f:
             f.write("=" * 80 + "\n")
             f.write("BACKTEST VALIDATION REPORT\n")
-            f.write("Strategy: Trim@+50% (dip-buy-5pct)\n")
+            f.write(f"Strategy: {self.metadata.get('strategy_name', self.strategy_name)}\n")
             f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write("=" * 80 + "\n\n")
 
@@ -549,10 +554,13 @@ class DipBuyStrategyValidator:
             # Trim Events
             f.write("TRIM EVENT VALIDATION\n")
             f.write("-" * 80 + "\n")
-            for trim in self.validation_results['trim_events']:
-                f.write(f"Trim #{trim['trade_num']}: {trim['date']} - {trim['ticker']}\n")
-                f.write(f"  Gain: {trim['gain_pct']*100:.2f}%\n")
-                f.write(f"  Status: {trim['status']}\n\n")
+            trim_events = self.validation_results['trim_events']
+            f.write(f"{int(trim_events['passed'].sum())}/{len(trim_events)} trim events passed\n\n")
+            if self.trade_details:
+                for trim in trim_events.itertuples(index=False):
+                    f.write(f"Trim #{trim.trade_num}: {trim.date} - {trim.ticker}\n")
+                    f.write(f"  Gain: {trim.gain_pct*100:.2f}%\n")
+                    f.write(f"  Status: {trim.status}\n\n")
 
             # Dip-Buy Events
             f.write("DIP-BUY EVENT VALIDATION\n")
@@ -596,11 +604,8 @@ class DipBuyStrategyValidator:
         print("\n")
 
         self.load_data()
-        self.validate_basic_metrics()
-        self.validate_trim_events()
-        self.validate_dip_buy_events()
-        self.validate_event_timing()
-        self.validate_data_integrity()
+        for check in self.CHECKS:
+            getattr(self, check)()
         self.generate_summary_statistics()
         self.generate_report()
         report_path = self.save_report()
@@ -614,7 +619,15 @@ class DipBuyStrategyValidator:
 def main():
     results_dir = '/Users/austinwallace/sandbox/stock_strategies/trim_strat_test/results'
 
-    validator = DipBuyStrategyValidator(results_dir)
+    parser = argparse.ArgumentParser(description='Validate a dip-buy strategy of a backtest run')
+    parser.add_argument('--results-dir', default=results_dir)
+    parser.add_argument('--strategy', default='trim_50pct_dip_buy_5pct', help='strategy name in the results')
+    parser.add_argument('--trade-details', action='store_true',
+                        help='print and save every trim event, not just the summary')
+    args = parser.parse_args()
+
+    validator = DipBuyStrategyValidator(args.results_dir, trade_details=args.trade_details,
+                                        strategy_name=args.strategy)
     success = validator.run_full_validation()
 
     return 0 if success else 1
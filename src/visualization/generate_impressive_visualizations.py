@@ -17,6 +17,12 @@ from matplotlib.patches import FancyBboxPatch, Polygon
 import seaborn as sns
 from datetime import datetime
 import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.price_store import open_price_store
 
 # ============================================================================
 # PROFESSIONAL STYLING CONFIGURATION
@@ -71,9 +77,7 @@ results = pd.read_csv(f'{RESULTS_DIR}/index_focus_results.csv', index_col=0)
 print(f"  Loaded {len(results)} strategy results")
 
 # Load price data
-spy_df = pd.read_csv(f'{MANUAL_DATA_DIR}/SPY.csv')
-spy_df['Date'] = pd.to_datetime(spy_df['Date'], utc=True).dt.tz_localize(None)
-spy_df.set_index('Date', inplace=True)
+spy_df = open_price_store(MANUAL_DATA_DIR).load(['SPY']).rename(columns={'SPY': 'Close'})
 
 # ============================================================================
 # CHART 1: PERFORMANCE WATERFALL
@@ -12,6 +12,12 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.price_store import open_price_store
 
 # Set professional styling
 sns.set_style('whitegrid')
@@ -52,13 +58,9 @@ phase3_results = pd.read_csv(f'{RESULTS_DIR_PHASE3}/index_focus_results.csv', in
 print(f"  ✓ Phase 3 results: {len(phase3_results)} strategies")
 
 # Load historical price data for NVDA and SPY
-nvda_df = pd.read_csv(f'{MANUAL_DATA_DIR}/NVDA.csv')
-nvda_df['Date'] = pd.to_datetime(nvda_df['Date'], utc=True).dt.tz_localize(None)
-nvda_df.set_index('Date', inplace=True)
-
-spy_df = pd.read_csv(f'{MANUAL_DATA_DIR}/SPY.csv')
-spy_df['Date'] = pd.to_datetime(spy_df['Date'], utc=True).dt.tz_localize(None)
-spy_df.set_index('Date', inplace=True)
+price_store = open_price_store(MANUAL_DATA_DIR)
+nvda_df = price_store.load(['NVDA']).rename(columns={'NVDA': 'Close'})
+spy_df = price_store.load(['SPY']).rename(columns={'SPY': 'Close'})
 
 print(f"  ✓ NVDA price data: {len(nvda_df)} days")
 print(f"  ✓ SPY price data: {len(spy_df)} days")
@@ -519,10 +521,9 @@ tickers = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'SPY', 'QQQ']
 ticker_returns = {}
 
 for ticker in tickers:
-    df = pd.read_csv(f'{MANUAL_DATA_DIR}/{ticker}.csv')
-    df['Date'] = pd.to_datetime(df['Date'], utc=True).dt.tz_localize(None)
-    start_price = df['Close'].iloc[0]
-    end_price = df['Close'].iloc[-1]
+    close = price_store.load([ticker])[ticker]
+    start_price = close.iloc[0]
+    end_price = close.iloc[-1]
     total_return = ((end_price / start_price) - 1) * 100
     ticker_returns[ticker] = total_return
 